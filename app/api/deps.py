@@ -5,6 +5,8 @@ from typing import Annotated
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_session
+from app.db.session import get_read_session, get_session
 
 DbSessionDep = Annotated[AsyncSession, Depends(get_session)]
+# Read-only endpoints: served by DATABASE_READ_URL when configured
+ReadDbSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
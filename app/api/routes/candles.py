@@ -1,16 +1,35 @@
 from __future__ import annotations
 
+from collections.abc import Sequence
 from datetime import datetime
+from typing import Any, Literal
 
-from fastapi import APIRouter
+from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from app.api.deps import DbSessionDep
-from app.services.market_data.ccxt_adapter import CcxtAdapter
+from app.api.deps import DbSessionDep, ReadDbSessionDep
+from app.core.config import settings
+from app.db.cursors import InvalidCursor
+from app.db.repositories.coverage import MINUTE
+from app.db.repositories.instruments import InstrumentsRepository
+from app.db.repositories.ohlcv import CANDLE_COLUMNS, OhlcvRepository
+from app.db.rows import epoch_ms, to_columns
+from app.db.session import get_read_session_factory, get_session_factory
+from app.services.market_data.candles import AGG_TIMEFRAMES, unfolded_buckets
+from app.services.market_data.ccxt_adapter import get_ccxt_adapter
+from app.services.market_data.export import MEDIA_TYPES, ExportFormat, encode_chunks
+from app.services.market_data.gaps import candle_window, find_gaps, repair_gaps
 
 router = APIRouter(prefix="/candles", tags=["candles"])
 
 
+def _ccxt_row(r: Any) -> list[float]:
+    # Same [ts_ms, open, high, low, close, volume] shape as the CCXT fallback
+    ts, o, h, low, c, v = r
+    return [epoch_ms(ts), o, h, low, c, v]
+
+
 class BackfillRequest(BaseModel):
     symbol: str
     interval: str
@@ -18,37 +37,201 @@ class BackfillRequest(BaseModel):
     end: datetime
 
 
+async def _instrument_id(db: Any, symbol: str) -> int:
+    inst = await InstrumentsRepository(db).get_by_symbol(symbol)
+    if inst is None:
+        raise HTTPException(status_code=404, detail=f"unknown symbol {symbol}")
+    return inst.id
+
+
+async def _repair(instrument_id: int, symbol: str, start: datetime, end: datetime) -> None:
+    async with get_session_factory()() as db:
+        await repair_gaps(db, get_ccxt_adapter(), instrument_id, symbol, start, end)
+
+
 @router.post("/backfill")
-async def backfill(_: BackfillRequest) -> dict[str, str]:
-    return {"status": "enqueued"}
+async def backfill(
+    req: BackfillRequest,
+    background: BackgroundTasks,
+    db: DbSessionDep,
+) -> dict[str, Any]:
+    """Fetch the 1m candles missing in [start, end) in the background.
+
+    Only uncovered minutes are requested from the exchange; higher timeframes are
+    rebuilt from them, so `interval` must be `1m`.
+    """
+    if req.interval != "1m":
+        raise HTTPException(status_code=422, detail="only 1m candles are backfilled")
+    inst_id = await _instrument_id(db, req.symbol)
+    missing = await find_gaps(db, inst_id, req.start, req.end)
+    if missing:
+        background.add_task(_repair, inst_id, req.symbol, req.start, req.end)
+    return {
+        "status": "enqueued" if missing else "complete",
+        "missing": [[s, e] for s, e in missing],
+    }
+
+
+@router.get("/gaps")
+async def gaps(
+    symbol: str, start: datetime, end: datetime, db: ReadDbSessionDep
+) -> list[list[datetime]]:
+    """Missing [start, end) 1m ranges in the window, from the coverage index."""
+    return [[s, e] for s, e in await find_gaps(db, await _instrument_id(db, symbol), start, end)]
+
+
+@router.get("/history")
+async def history(
+    symbol: str,
+    db: ReadDbSessionDep,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int = 1000,
+    cursor: str | None = None,
+) -> dict[str, Any]:
+    """Stored 1m candles by ts in keyset pages; pass `next_cursor` back until it is null."""
+    try:
+        rows, next_cursor = await OhlcvRepository(db).fetch_ohlcv_1m_page(
+            symbol,
+            start,
+            end,
+            min(limit, 10_000),
+            cursor,
+            as_float=True,
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    return {"data": [_ccxt_row(r) for r in rows], "next_cursor": next_cursor}
+
+
+@router.get("/export")
+async def export(
+    symbol: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    format: ExportFormat = "ndjson",
+) -> StreamingResponse:
+    """Stream stored 1m candles in [start, end] as NDJSON or CSV, in constant memory."""
+
+    async def body() -> Any:
+        # Owns its session: the response outlives request-scoped dependencies
+        async with get_read_session_factory()() as db:
+            parts = OhlcvRepository(db).stream_ohlcv_1m_rows(
+                symbol,
+                start,
+                end,
+                settings.export_chunk_rows,
+            )
+            async for chunk in encode_chunks(parts, CANDLE_COLUMNS, format):
+                yield chunk
+
+    return StreamingResponse(body(), media_type=MEDIA_TYPES[format])
 
 
-@router.get("/")
+def _candle_tuple(c: dict[str, Any]) -> tuple[Any, ...]:
+    # Candle dicts (folded buckets, CCXT candles) in the shape of the stored float rows
+    return (c["ts"], *(float(c[k]) for k in CANDLE_COLUMNS[1:]))
+
+
+async def _read_candles(
+    db: Any,
+    instrument_id: int,
+    symbol: str,
+    timeframe: str,
+    start: datetime,
+    end: datetime,
+    limit: int,
+) -> Sequence[Any] | None:
+    # Each timeframe has its own table rows, so a 1d chart reads one row per candle.
+    # Column tuples with floats computed by the database: no ORM objects or Decimals
+    repo = OhlcvRepository(db)
+    last = end - MINUTE
+    if timeframe == "1m":
+        return await repo.fetch_ohlcv_1m_rows(symbol, start, last, limit, as_float=True)
+    rows = await repo.fetch_aggregate_rows(symbol, timeframe, start, last, limit, as_float=True)
+    # The newest buckets may not have been refreshed yet; fold those from ohlcv_1m
+    tail = await unfolded_buckets(
+        db, instrument_id, timeframe, start, end, settings.candles_tail_max_min
+    )
+    if not tail:
+        return None if tail is None else rows
+    folded_from = epoch_ms(tail[0]["ts"])
+    head = [r for r in rows if epoch_ms(r[0]) < folded_from]
+    return [*head, *map(_candle_tuple, tail)][:limit]
+
+
+async def _stored_candles(
+    db: Any,
+    symbol: str,
+    timeframe: str,
+    since: datetime | None,
+    limit: int,
+) -> Sequence[Any] | None:
+    """Candles from the database once the window's missing minutes are fetched and stored.
+
+    None when the symbol is unknown or more than CANDLES_TAIL_MAX_MIN minutes are missing
+    or not yet aggregated.
+    """
+    inst = await InstrumentsRepository(db).get_by_symbol(symbol)
+    if inst is None:
+        return None
+    start, end = candle_window(timeframe, since, limit)
+    missing = await find_gaps(db, inst.id, start, end)
+    if not missing:
+        return await _read_candles(db, inst.id, symbol, timeframe, start, end, limit)
+    if sum((e - s) / MINUTE for s, e in missing) > settings.candles_tail_max_min:
+        return None
+    async with get_session_factory()() as wdb:
+        # Also rebuilds aggregate buckets behind the watermark; newer ones are folded on read
+        await repair_gaps(wdb, get_ccxt_adapter(), inst.id, symbol, start, end)
+        # Read back from the primary: a replica may not have the new rows yet
+        return await _read_candles(wdb, inst.id, symbol, timeframe, start, end, limit)
+
+
+async def _exchange_candles(
+    symbol: str,
+    timeframe: str,
+    since: datetime | None,
+    limit: int,
+) -> list[tuple[Any, ...]]:
+    fetched = await get_ccxt_adapter().fetch_ohlcv(symbol, timeframe, since, limit)
+    return [_candle_tuple(c) for c in fetched]
+
+
+@router.get("/", response_model=None)
 async def candles(
     symbol: str,
     timeframe: str,
     limit: int = 100,
     since: datetime | None = None,
-    db: DbSessionDep = None,  # type: ignore[assignment]
-):
-    # FastAPI injects DbSessionDep; ignore typing default for linter.
+    format: Literal["rows", "columns"] = "rows",
+    db: ReadDbSessionDep = None,  # type: ignore[assignment]
+) -> list[list[float]] | dict[str, list[Any]]:
+    # FastAPI injects ReadDbSessionDep; ignore typing default for linter.
     """
     ## OHLCV Candles
 
     This endpoint retrieves historical OHLCV (Open, High, Low, Close, Volume) data
     for a given symbol and timeframe.
 
+    Stored candles are served from the database; minutes missing from the requested
+    window are fetched from the exchange and stored first. Unknown symbols, other
+    timeframes and large holes are passed through to the exchange.
+
     - **symbol**: Trading pair symbol (e.g., 'BTC/USDT').
     - **timeframe**: Chart timeframe (e.g., '1m', '5m', '1h', '1d').
     - **limit**: Number of candles to retrieve.
-    - **since**: Start time for candles.
+    - **since**: Start time for candles; the newest candles when omitted.
+    - **format**: `rows` ([ts_ms, o, h, l, c, v] per candle) or `columns` (one list per
+      field).
     - **db**: Database session.
     """
-    # if db:
-    #     repo = OHLCVRepository(db)
-    #     candles = await repo.get_candles(symbol, timeframe, limit, since)
-    #     if candles:
-    #         return candles
-    # Fallback to CCXT if not in DB or DB not available
-    adapter = CcxtAdapter()
-    return await adapter.fetch_ohlcv(symbol, timeframe, since, limit)
+    limit = max(1, min(limit, 10_000))
+    rows: Sequence[Any] | None = None
+    if db is not None and (timeframe == "1m" or timeframe in AGG_TIMEFRAMES):
+        rows = await _stored_candles(db, symbol, timeframe, since, limit)
+    if rows is None:
+        rows = await _exchange_candles(symbol, timeframe, since, limit)
+    if format == "columns":
+        return {k: list(v) for k, v in to_columns(rows, CANDLE_COLUMNS).items()}
+    return [_ccxt_row(r) for r in rows]
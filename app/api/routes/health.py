@@ -3,10 +3,14 @@ from __future__ import annotations
 from typing import Any
 
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
 from sqlalchemy import text
 
 from app.api.deps import DbSessionDep
 from app.core.config import settings
+from app.core.metrics import DB_POOL_CONNECTIONS, registry
+from app.db.session import pool_stats
+from app.services.market_data.heartbeat import read_heartbeat
 
 router = APIRouter()
 
@@ -32,7 +36,24 @@ async def ready(db: DbSessionDep) -> dict[str, Any]:
     """Readiness check.
 
     Verifies the DB connection is usable.
+    `ingestion` is the ingest process's last heartbeat: the worst shard's
+    exchange-to-ingest lag, its age and whether it is stale (null when no ingester
+    ever ran); `db_pools` the usage of each engine's pool.
     """
 
     await db.execute(text("SELECT 1"))
-    return {"status": "ok"}
+    ingestion = await read_heartbeat(db, 3 * settings.ingest_heartbeat_sec)
+    return {"status": "ok", "ingestion": ingestion, "db_pools": pool_stats()}
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> str:
+    """This process's counters and histograms in the Prometheus text format.
+
+    The ingest process serves its own on INGEST_METRICS_PORT.
+    """
+
+    for engine, stats in pool_stats().items():
+        for state, value in stats.items():
+            DB_POOL_CONNECTIONS.set(engine, state, value=value)
+    return registry.render()
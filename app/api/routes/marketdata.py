@@ -1,35 +1,106 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import UTC, datetime, timedelta
 from typing import Any
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
-from app.api.deps import DbSessionDep
-from app.services.market_data.ccxt_adapter import CcxtAdapter
+from app.api.deps import ReadDbSessionDep
+from app.core.config import settings
+from app.db.cursors import InvalidCursor
+from app.db.models import TickerLatest
+from app.db.repositories.orderbook import OrderBookRepository
+from app.db.repositories.tickers import TickersRepository
+from app.db.repositories.trades import TRADE_COLUMNS, TradesRepository
+from app.db.rows import epoch_ms
+from app.db.session import get_read_session_factory
+from app.services.market_data.ccxt_adapter import get_ccxt_adapter
+from app.services.market_data.export import MEDIA_TYPES, ExportFormat, encode_chunks
+from app.services.market_data.heartbeat import read_heartbeat
 
 # router = APIRouter(prefix="/marketdata", tags=["Market Data"])
 router = APIRouter(prefix="/marketdata", tags=["Market Data"])
 
 
-# @router.get("/ticker/latest")
-# async def ticker_latest(symbol: str, db: DbSessionDep) -> dict[str, Any] | None:
-#     """Fetch the latest ticker for a symbol."""
-#     repo = TickerRepository(db)
-#     return await repo.get_latest_ticker(symbol)
+# One indexed lookup serves a whole dashboard; keep the IN list bounded
+MAX_LATEST_SYMBOLS = 500
+
+
+def _symbols(symbols: str) -> list[str]:
+    out = [s.strip() for s in symbols.split(",") if s.strip()]
+    if len(out) > MAX_LATEST_SYMBOLS:
+        raise HTTPException(status_code=422, detail=f"at most {MAX_LATEST_SYMBOLS} symbols")
+    return out
+
+
+def _ticker(t: TickerLatest) -> dict[str, Any]:
+    return {
+        "ts": t.ts,
+        "last": t.last,
+        "bid": t.bid,
+        "ask": t.ask,
+        "mid": t.mid,
+        "spread_bps": t.spread_bps,
+        "day_vol_quote": t.day_vol_quote,
+    }
+
+
+async def _fresh(db: Any, ts: datetime) -> bool:
+    max_age = settings.ob_latest_max_age_ms
+    if max_age <= 0:
+        return True
+    # SQLite hands back naive datetimes; everything stored is UTC
+    ts = ts if ts.tzinfo is not None else ts.replace(tzinfo=UTC)
+    if datetime.now(UTC) - ts <= timedelta(milliseconds=max_age):
+        return True
+    # Books are only republished when they change, so a quiet one is still current
+    # while the ingester is alive and every shard is receiving frames
+    beat = await read_heartbeat(db, 3 * settings.ingest_heartbeat_sec)
+    if beat is None or beat["stale"]:
+        return False
+    frame_age = beat.get("last_frame_age_s")
+    return frame_age is not None and frame_age * 1000 <= max_age
+
+
+@router.get("/ticker/latest")
+async def ticker_latest(symbol: str, db: ReadDbSessionDep) -> dict[str, Any] | None:
+    """Fetch the latest persisted ticker for a symbol."""
+    ticker = await TickersRepository(db).get_latest(symbol)
+    return _ticker(ticker) if ticker is not None else None
+
+
+@router.get("/tickers/latest")
+async def tickers_latest(symbols: str, db: ReadDbSessionDep) -> dict[str, dict[str, Any]]:
+    """Latest persisted ticker for each comma-separated symbol; unknown symbols are omitted."""
+    latest = await TickersRepository(db).get_latest_many(_symbols(symbols))
+    return {symbol: _ticker(t) for symbol, t in latest.items()}
+
+
+@router.get("/orderbooks/latest")
+async def orderbooks_latest(
+    symbols: str,
+    db: ReadDbSessionDep,
+    limit: int = 20,
+) -> dict[str, dict[str, Any]]:
+    """Latest published book for each comma-separated symbol; unknown symbols are omitted."""
+    return await OrderBookRepository(db).get_latest_many(_symbols(symbols), limit)
 
 
 @router.get("/orderbook")
-async def orderbook_l2(symbol: str, limit: int = 50, db: DbSessionDep = None) -> dict[str, Any]:  # type: ignore[assignment]
-    """Fetch the latest L2 order book for a symbol."""
-    # if db:
-    #     repo = OrderBookRepository(db)
-    #     # Attempt to fetch from DB first
-    #     orderbook = await repo.get_latest_orderbook(symbol)
-    #     if orderbook:
-    #         return orderbook
-    # Fallback to CCXT if not in DB or DB not available
-    return await CcxtAdapter().fetch_l2_orderbook(symbol, limit)
+async def orderbook_l2(symbol: str, limit: int = 50, db: ReadDbSessionDep = None) -> dict[str, Any]:  # type: ignore[assignment]
+    """Fetch the latest L2 order book for a symbol.
+
+    The stored book is served while it changed within OB_LATEST_MAX_AGE_MS or the
+    ingester's heartbeat shows its shards received frames that recently; otherwise
+    (ingester down or behind) it is replaced by a fresh exchange fetch.
+    """
+    if db is not None:
+        book = (await OrderBookRepository(db).get_latest_many([symbol], limit)).get(symbol)
+        if book is not None and await _fresh(db, book["ts"]):
+            return book
+    # Fallback to CCXT if not in DB, stale, or DB not available
+    return await get_ccxt_adapter().fetch_l2_orderbook(symbol, limit)
 
 
 @router.get("/trades")
@@ -37,13 +108,75 @@ async def trades(
     symbol: str,
     limit: int = 200,
     since: datetime | None = None,
-    db: DbSessionDep = None,
+    db: ReadDbSessionDep = None,
 ):  # type: ignore[assignment]
-    """Fetch recent trades for a symbol."""
-    # if db:
-    #     repo = TradesRepository(db)
-    #     trades_data = await repo.get_trades(symbol, limit, since)
-    #     if trades_data:
-    #         return trades_data
+    """Fetch recent trades for a symbol, newest first."""
+    if db is not None:
+        rows = await TradesRepository(db).get_recent_rows(symbol, limit, since, as_float=True)
+        if rows:
+            return [
+                {
+                    "ts": epoch_ms(r.ts),
+                    "price": r.px,
+                    "amount": r.qty,
+                    "side": r.side,
+                    "id": r.trade_id,
+                }
+                for r in rows
+            ]
     # Fallback to CCXT
-    return await CcxtAdapter().fetch_trades(symbol, since, limit)
+    return await get_ccxt_adapter().fetch_trades(symbol, since, limit)
+
+
+@router.get("/trades/history")
+async def trades_history(
+    symbol: str,
+    db: ReadDbSessionDep,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int = 1000,
+    cursor: str | None = None,
+) -> dict[str, Any]:
+    """Stored trades oldest first in keyset pages; pass `next_cursor` back until it is null."""
+    try:
+        rows, next_cursor = await TradesRepository(db).get_trades_page(
+            symbol,
+            start,
+            end,
+            min(limit, 10_000),
+            cursor,
+            as_float=True,
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    return {
+        "data": [
+            {"ts": epoch_ms(r.ts), "price": r.px, "amount": r.qty, "side": r.side, "id": r.trade_id}
+            for r in rows
+        ],
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/trades/export")
+async def trades_export(
+    symbol: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    format: ExportFormat = "ndjson",
+) -> StreamingResponse:
+    """Stream stored trades in [start, end] as NDJSON or CSV, in constant memory."""
+
+    async def body() -> Any:
+        # Owns its session: the response outlives request-scoped dependencies
+        async with get_read_session_factory()() as db:
+            parts = TradesRepository(db).stream_trade_rows(
+                symbol,
+                start,
+                end,
+                settings.export_chunk_rows,
+            )
+            async for chunk in encode_chunks(parts, TRADE_COLUMNS, format):
+                yield chunk
+
+    return StreamingResponse(body(), media_type=MEDIA_TYPES[format])
@@ -20,13 +20,26 @@ class Settings(BaseSettings):
     # Default to in-memory SQLite for local dev/tests to avoid requiring Postgres at import time
     database_url: str = Field(default="sqlite+aiosqlite:///:memory:", alias="DATABASE_URL")
 
+    # Optional read replica for history/latest-state reads; empty routes reads to the primary
+    database_read_url: str = Field(default="", alias="DATABASE_READ_URL")
+
     # Database pool configuration (tuned for serverless Postgres like Supabase)
     db_pool_size: int = Field(default=5, alias="DB_POOL_SIZE")
     db_max_overflow: int = Field(default=5, alias="DB_MAX_OVERFLOW")
     db_pool_timeout: int = Field(default=30, alias="DB_POOL_TIMEOUT")
     db_pool_recycle_seconds: int = Field(default=1800, alias="DB_POOL_RECYCLE_SECONDS")
+    db_read_pool_size: int = Field(default=5, alias="DB_READ_POOL_SIZE")
+    db_read_max_overflow: int = Field(default=5, alias="DB_READ_MAX_OVERFLOW")
+    # Postgres bulk loads: batches of at least DB_COPY_MIN_ROWS use COPY. Opt-in (0 =
+    # disabled) until scripts/bench_bulk_load.py shows a win on the target database
+    db_copy_min_rows: int = Field(default=0, alias="DB_COPY_MIN_ROWS")
+    db_copy_chunk_rows: int = Field(default=50_000, alias="DB_COPY_CHUNK_ROWS")
+    # History exports stream server-side cursor chunks of this many rows
+    export_chunk_rows: int = Field(default=5_000, alias="EXPORT_CHUNK_ROWS")
 
     ccxt_rate_limit: bool = Field(default=True, alias="CCXT_RATE_LIMIT")
+    # Market metadata is shared by every caller and reloaded after this many seconds
+    ccxt_markets_ttl_sec: int = Field(default=3600, alias="CCXT_MARKETS_TTL_SEC")
 
     bybit_api_key: str | None = Field(default=None, alias="BYBIT_API_KEY")
     bybit_api_secret: str | None = Field(default=None, alias="BYBIT_API_SECRET")
@@ -43,10 +56,52 @@ class Settings(BaseSettings):
     ws_orderbook_levels: int = Field(default=50, alias="WS_ORDERBOOK_LEVELS")
     ws_snapshot_interval_sec: int = Field(default=30, alias="WS_SNAPSHOT_INTERVAL_SEC")
     backfill_lookback_days: int = Field(default=120, alias="BACKFILL_LOOKBACK_DAYS")
+    # Market metadata is re-upserted and the instrument registry reloaded this often
+    # (0 disables), so symbols listed after startup are resolved
+    instrument_sync_interval_sec: int = Field(default=3600, alias="INSTRUMENT_SYNC_INTERVAL_SEC")
     ws_public_url: str = Field(
         default="wss://stream.bybit.com/v5/public/spot", alias="WS_PUBLIC_URL"
     )
 
+    # WS sharding: WS_SHARDS=0 derives the connection count from WS_SYMBOLS_PER_SHARD
+    ws_shards: int = Field(default=0, alias="WS_SHARDS")
+    ws_symbols_per_shard: int = Field(default=30, alias="WS_SYMBOLS_PER_SHARD")
+    ws_shard_queue_max: int = Field(default=10_000, alias="WS_SHARD_QUEUE_MAX")
+
+    # WS frame decoding: auto uses orjson when installed
+    ws_json_decoder: Literal["auto", "orjson", "json"] = Field(
+        default="auto",
+        alias="WS_JSON_DECODER",
+    )
+
+    # Ticker persistence: all | interval (latest per TICKER_CONFLATE_MS) | change (only diffs)
+    ticker_persist_mode: Literal["all", "interval", "change"] = Field(
+        default="change",
+        alias="TICKER_PERSIST_MODE",
+    )
+    ticker_conflate_ms: int = Field(default=1000, alias="TICKER_CONFLATE_MS")
+
+    # Order book history: rows (one orderbook_l2 row per level) | packed (one blob row per message)
+    ob_storage_mode: Literal["rows", "packed"] = Field(default="rows", alias="OB_STORAGE_MODE")
+    # orderbook_latest: top OB_LATEST_DEPTH levels per changed book every OB_LATEST_INTERVAL_MS
+    # (depth 0 disables)
+    ob_latest_depth: int = Field(default=50, alias="OB_LATEST_DEPTH")
+    ob_latest_interval_ms: int = Field(default=250, alias="OB_LATEST_INTERVAL_MS")
+    # GET /marketdata/orderbook serves the stored book while it changed at most this long
+    # ago, or the ingest heartbeat shows frames that recent; otherwise it asks the
+    # exchange (0 disables the check)
+    ob_latest_max_age_ms: int = Field(default=5_000, alias="OB_LATEST_MAX_AGE_MS")
+
+    # Raw WS frame capture for scripts/replay_ws.py; empty disables recording
+    ws_record_dir: str = Field(default="", alias="WS_RECORD_DIR")
+    ws_record_segment_frames: int = Field(default=100_000, alias="WS_RECORD_SEGMENT_FRAMES")
+
+    # Write-behind batching for WS persistence (flush at N rows or T ms, whichever first)
+    ws_write_batch_rows: int = Field(default=500, alias="WS_WRITE_BATCH_ROWS")
+    ws_write_flush_ms: int = Field(default=250, alias="WS_WRITE_FLUSH_MS")
+    ws_write_queue_max: int = Field(default=20_000, alias="WS_WRITE_QUEUE_MAX")
+    ws_write_overflow: Literal["block", "drop"] = Field(default="block", alias="WS_WRITE_OVERFLOW")
+
     # DEX / on-chain providers (one env var per chain)
     ethereum_rpc_url: str | None = Field(default=None, alias="ETHEREUM_RPC_URL")
     base_rpc_url: str | None = Field(default=None, alias="BASE_RPC_URL")
@@ -58,11 +113,52 @@ class Settings(BaseSettings):
     # Ingestion/worker feature flags
     enable_market_data_tasks: bool = Field(default=False, alias="ENABLE_MARKET_DATA_TASKS")
     enable_backfill_on_startup: bool = Field(default=False, alias="ENABLE_BACKFILL_ON_STARTUP")
+    # Ingestion normally runs as `python -m app.workers.ingest`; INGEST_IN_API=true makes
+    # the API workers compete for the same leader lock instead
+    ingest_in_api: bool = Field(default=False, alias="INGEST_IN_API")
+    ingest_lock_key: int = Field(default=0x43435F494E47, alias="INGEST_LOCK_KEY")
+    ingest_lock_file: str = Field(default="", alias="INGEST_LOCK_FILE")
+    ingest_leader_poll_sec: float = Field(default=5.0, alias="INGEST_LEADER_POLL_SEC")
+    # The ingester publishes its status to the DB for `/ready` (stale after 3 missed
+    # beats) and serves its own /metrics and /health on INGEST_METRICS_PORT (0 disables)
+    ingest_heartbeat_sec: int = Field(default=10, alias="INGEST_HEARTBEAT_SEC")
+    ingest_metrics_host: str = Field(default="0.0.0.0", alias="INGEST_METRICS_HOST")
+    ingest_metrics_port: int = Field(default=9100, alias="INGEST_METRICS_PORT")
+
+    # Time-series retention, "table=days,..." (unlisted or 0 = keep forever); the ticker
+    # rollup intervals expire separately as ticker_rollup_1s / ticker_rollup_1m. On Postgres
+    # partitioned tables expired partitions are dropped PARTITION_AHEAD_DAYS ahead of need
+    retention: str = Field(default="", alias="RETENTION_DAYS")
+    partition_ahead_days: int = Field(default=7, alias="PARTITION_AHEAD_DAYS")
+    partition_maintenance_sec: int = Field(default=3600, alias="PARTITION_MAINTENANCE_SEC")
+    # Ticker rollups (1s/1m) and batched retention deletes for unpartitioned tables
+    retention_interval_sec: int = Field(default=300, alias="RETENTION_INTERVAL_SEC")
+    retention_batch_rows: int = Field(default=5_000, alias="RETENTION_BATCH_ROWS")
+    rollup_window_sec: int = Field(default=3600, alias="ROLLUP_WINDOW_SEC")
+    rollup_lateness_sec: int = Field(default=10, alias="ROLLUP_LATENESS_SEC")
+    # 5m..1d candles folded from ohlcv_1m past a per-instrument watermark
+    ohlcv_agg_interval_sec: int = Field(default=60, alias="OHLCV_AGG_INTERVAL_SEC")
+    # Missing 1m minutes over the trailing lookback are fetched from the exchange
+    # every OHLCV_REPAIR_INTERVAL_SEC (0 disables)
+    ohlcv_repair_interval_sec: int = Field(default=300, alias="OHLCV_REPAIR_INTERVAL_SEC")
+    ohlcv_repair_lookback_min: int = Field(default=1440, alias="OHLCV_REPAIR_LOOKBACK_MIN")
+    # GET /candles fetches up to this many missing 1m minutes inline and stores them;
+    # larger holes are passed through to the exchange unstored
+    candles_tail_max_min: int = Field(default=3000, alias="CANDLES_TAIL_MAX_MIN")
 
     @property
     def symbols_list(self) -> list[str]:
         return [s.strip() for s in self.symbols.split(",") if s.strip()]
 
+    @property
+    def retention_days(self) -> dict[str, int]:
+        out: dict[str, int] = {}
+        for item in self.retention.split(","):
+            table, sep, days = item.partition("=")
+            if sep and table.strip():
+                out[table.strip()] = int(days)
+        return out
+
     def rpc_for_chain(self, chain: str) -> str | None:
         c = chain.lower().strip()
         if c in {"ethereum", "mainnet", "eth"}:
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import math
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from threading import Lock
+
+# Latency buckets in seconds: sub-millisecond handlers up to multi-second DB stalls
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+    @abstractmethod
+    def render(self) -> list[str]: ...
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, doc, labelnames)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for labels, v in sorted(self._values.items()):
+            lines.append(f"{self.name}{_fmt_labels(self.labelnames, labels)} {_fmt_value(v)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (+Inf last), sum, count
+        self._series: dict[Labels, tuple[list[int], list[float]]] = {}
+
+    def observe(self, *labels: str, value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+                self._series[labels] = series
+            counts, totals = series
+            i = 0
+            while i < len(self.buckets) and value > self.buckets[i]:
+                i += 1
+            counts[i] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(series[1][1]) if series else 0
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for labels, (counts, (total, n)) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, c in zip((*self.buckets, math.inf), counts, strict=True):
+                cumulative += c
+                le = f'le="{_fmt_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_fmt_labels(self.labelnames, labels, le)} {cumulative}",
+                )
+            lbl = _fmt_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{lbl} {_fmt_value(total)}")
+            lines.append(f"{self.name}_count{lbl} {_fmt_value(n)}")
+        return lines
+
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text exposition format."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def _add(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, doc, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, doc, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        doc: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, doc, labelnames, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Market data ingestion
+WS_MESSAGES = registry.counter(
+    "ws_messages_total",
+    "WS data frames handled",
+    ("topic", "symbol"),
+)
+WS_HANDLER_SECONDS = registry.histogram(
+    "ws_handler_seconds",
+    "Time spent decoding and handling one WS frame",
+    ("topic",),
+)
+WS_INGEST_LAG_SECONDS = registry.histogram(
+    "ws_ingest_lag_seconds",
+    "Exchange event time (T/ts) to local receive time",
+    ("topic", "symbol"),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+WS_RECONNECTS = registry.counter("ws_reconnects_total", "WS reconnects", ("shard",))
+WS_HANDLER_ERRORS = registry.counter(
+    "ws_handler_errors_total",
+    "WS frames whose handler raised",
+    ("topic",),
+)
+WS_QUEUE_DEPTH = registry.gauge("ws_frame_queue_depth", "Frames waiting per shard", ("shard",))
+DB_FLUSH_SECONDS = registry.histogram(
+    "db_flush_seconds",
+    "Write-behind batch flush duration",
+    ("writer",),
+)
+DB_FLUSH_ROWS = registry.counter("db_flush_rows_total", "Rows written by write-behind", ("writer",))
+DB_DROPPED_ROWS = registry.counter(
+    "db_dropped_rows_total",
+    "Rows dropped by write-behind (overflow or failed flush)",
+    ("writer",),
+)
+JOB_FAILURES = registry.counter(
+    "job_failures_total",
+    "Periodic worker jobs (retention, partitions, aggregates, gap repair, ...) that raised",
+    ("job",),
+)
+# Updated from app.db.session.pool_stats() on each scrape
+DB_POOL_CONNECTIONS = registry.gauge(
+    "db_pool_connections",
+    "Connection pool usage per engine (size, checked_out, overflow, max_overflow)",
+    ("engine", "state"),
+)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import sqlite3
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import and_, insert, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logging import get_logger
+from app.db.base import Base
+from app.db.copy import copy_merge, copy_supported
+from app.db.partitions import PARTITIONED_TABLES, ensure_partitions
+
+logger = get_logger(__name__)
+
+# Bound-parameter caps per statement: asyncpg/psycopg use an int16 count; SQLite
+# raised SQLITE_MAX_VARIABLE_NUMBER from 999 to 32766 in 3.32
+_PG_MAX_PARAMS = 32_767
+_SQLITE_MAX_PARAMS = 32_766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+
+@dataclass
+class BulkResult:
+    # Rows inserted, or updated by ON CONFLICT DO UPDATE (drivers cannot portably tell
+    # the two apart)
+    written: int = 0
+    # Rows that hit the conflict target and were left alone
+    skipped: int = 0
+
+    def __iadd__(self, other: BulkResult) -> BulkResult:
+        self.written += other.written
+        self.skipped += other.skipped
+        return self
+
+
+def max_params(dialect_name: str) -> int:
+    return _SQLITE_MAX_PARAMS if dialect_name == "sqlite" else _PG_MAX_PARAMS
+
+
+def chunk_size(dialect_name: str, n_columns: int) -> int:
+    """Rows per multi-row INSERT that stay under the dialect's parameter cap."""
+    return max(1, max_params(dialect_name) // max(1, n_columns))
+
+
+def latest_per_instrument(rows: Sequence[dict[str, Any]]) -> list[dict[str, Any]]:
+    """The newest row (by `ts`) per `instrument_id`, for latest-state upserts; a
+    statement may not touch the same conflict key twice. Ties go to the later row."""
+    latest: dict[int, dict[str, Any]] = {}
+    for r in rows:
+        prev = latest.get(r["instrument_id"])
+        if prev is None or r["ts"] >= prev["ts"]:
+            latest[r["instrument_id"]] = r
+    return list(latest.values())
+
+
+async def bulk_upsert(
+    db: AsyncSession,
+    model: type[Base],
+    rows: Sequence[dict[str, Any]],
+    conflict_cols: Sequence[str] | None = None,
+    update_cols: Sequence[str] | None = None,
+    *,
+    only_changed: bool = False,
+    only_newer: bool = False,
+) -> BulkResult:
+    """Insert `rows` into `model`'s table in parameter-capped chunks on SQLite or Postgres.
+
+    - No `conflict_cols`: plain append.
+    - `conflict_cols` only: `ON CONFLICT (...) DO NOTHING`; conflicting rows are skipped.
+    - With `update_cols`: `ON CONFLICT (...) DO UPDATE` of those columns from the new row.
+      `only_changed` adds `WHERE (...) IS DISTINCT FROM excluded`, so rows whose supplied
+      values are unchanged are counted as skipped and not rewritten; the rest count as
+      written. `only_newer` adds `WHERE excluded.ts >= ts`, so a late row never replaces
+      a newer one (latest-state tables); it is counted as skipped.
+
+    Every row must carry the same keys. On Postgres, missing `ts` partitions of
+    partitioned tables are created first, in their own transaction (see
+    app.db.partitions). Large append / DO NOTHING batches on asyncpg go through COPY
+    (see app.db.copy). The caller commits.
+    """
+    result = BulkResult()
+    if not rows:
+        return result
+    columns = list(rows[0])
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql" and model.__tablename__ in PARTITIONED_TABLES:
+        stamps = [r["ts"] for r in rows]
+        engine = (await db.connection()).engine
+        try:
+            await ensure_partitions(engine, model.__tablename__, min(stamps), max(stamps))
+        except SQLAlchemyError:
+            # The insert below fails on its own if a partition it needs is really missing
+            logger.warning("creating %s partitions failed", model.__tablename__, exc_info=True)
+    if not update_cols and copy_supported(db, len(rows)):
+        written = await copy_merge(db, model.__tablename__, rows, columns, conflict_cols)
+        return BulkResult(written=written, skipped=len(rows) - written)
+
+    table = model.__table__
+    stmt: Any = None
+    if conflict_cols:
+        # Parameters are bound per row (insertmanyvalues), so the compiled statement is cached
+        # instead of rebuilding a multi-row VALUES clause per chunk
+        ins: Any = (postgresql if dialect == "postgresql" else sqlite).insert(model)
+        if update_cols:
+            guards = []
+            if only_changed:
+                # Columns not supplied by the rows (e.g. updated_at) are set but not compared
+                guards.append(
+                    or_(
+                        *(
+                            table.c[c].is_distinct_from(ins.excluded[c])
+                            for c in update_cols
+                            if c in columns
+                        )
+                    ),
+                )
+            if only_newer:
+                guards.append(ins.excluded["ts"] >= table.c.ts)
+            stmt = ins.on_conflict_do_update(
+                index_elements=list(conflict_cols),
+                set_={c: ins.excluded[c] for c in update_cols},
+                where=and_(*guards) if guards else None,
+            )
+        else:
+            stmt = ins.on_conflict_do_nothing(index_elements=list(conflict_cols))
+        # RETURNING yields only rows actually inserted or updated; executemany rowcount
+        # is not reliable across drivers
+        stmt = stmt.returning(table.c[conflict_cols[0]])
+    step = chunk_size(dialect, len(columns))
+    for i in range(0, len(rows), step):
+        chunk = rows[i : i + step]
+        if not conflict_cols:
+            # executemany: drivers batch this efficiently and rowcount is not needed
+            await db.execute(insert(model), list(chunk))
+            result.written += len(chunk)
+            continue
+        res = await db.execute(stmt, list(chunk))
+        written = len(res.all())
+        result += BulkResult(written=written, skipped=len(chunk) - written)
+    return result
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import enum
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+
+def copy_supported(db: AsyncSession, n_rows: int) -> bool:
+    """True when `n_rows` should go through COPY: asyncpg and a batch big enough to pay
+    for the staging round trips (DB_COPY_MIN_ROWS; 0 disables COPY)."""
+    bind = db.get_bind()
+    return (
+        settings.db_copy_min_rows > 0
+        and n_rows >= settings.db_copy_min_rows
+        and bind.dialect.name == "postgresql"
+        and bind.dialect.driver == "asyncpg"
+    )
+
+
+def _records(rows: Sequence[dict[str, Any]], columns: Sequence[str]) -> list[tuple[Any, ...]]:
+    # asyncpg's binary COPY wants plain values; non-native enums are stored as their value
+    return [
+        tuple(v.value if isinstance(v := r.get(c), enum.Enum) else v for c in columns) for r in rows
+    ]
+
+
+async def _driver_connection(db: AsyncSession) -> Any:
+    conn = await db.connection()
+    # The asyncpg adapter opens its transaction lazily; start it so COPY and the merge
+    # run inside the session's transaction and commit/roll back with it
+    await conn.exec_driver_sql("SELECT 1")
+    raw = await conn.get_raw_connection()
+    return raw.driver_connection
+
+
+async def copy_merge(
+    db: AsyncSession,
+    table: str,
+    rows: Sequence[dict[str, Any]],
+    columns: Sequence[str],
+    conflict_cols: Sequence[str] | None = None,
+    chunk_rows: int | None = None,
+) -> int:
+    """Bulk-load `rows` with the COPY protocol inside the session's transaction.
+
+    Without `conflict_cols` rows are copied straight into `table`. With them, each
+    chunk is copied into a temp staging table and merged with
+    `INSERT ... SELECT ... ON CONFLICT (conflict_cols) DO NOTHING`. Returns the number
+    of rows inserted; the caller commits.
+    """
+    chunk = max(1, chunk_rows or settings.db_copy_chunk_rows)
+    apg = await _driver_connection(db)
+    cols = ", ".join(f'"{c}"' for c in columns)
+    inserted = 0
+
+    if not conflict_cols:
+        for i in range(0, len(rows), chunk):
+            batch = _records(rows[i : i + chunk], columns)
+            await apg.copy_records_to_table(table, records=batch, columns=list(columns))
+            inserted += len(batch)
+        return inserted
+
+    stage = f"_stage_{table}"
+    # CREATE ... AS ... WITH NO DATA copies column types only, no NOT NULL/defaults/indexes
+    await apg.execute(
+        f'CREATE TEMP TABLE IF NOT EXISTS "{stage}" ON COMMIT DROP AS '
+        f'SELECT {cols} FROM "{table}" WITH NO DATA',
+    )
+    conflict = ", ".join(f'"{c}"' for c in conflict_cols)
+    merge = (
+        f'INSERT INTO "{table}" ({cols}) SELECT {cols} FROM "{stage}" '
+        f"ON CONFLICT ({conflict}) DO NOTHING"
+    )
+    for i in range(0, len(rows), chunk):
+        batch = _records(rows[i : i + chunk], columns)
+        await apg.copy_records_to_table(stage, records=batch, columns=list(columns))
+        status = await apg.execute(merge)
+        # Status is "INSERT 0 <n>"
+        inserted += int(status.rsplit(" ", 1)[-1])
+        await apg.execute(f'TRUNCATE "{stage}"')
+    return inserted
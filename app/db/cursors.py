@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*key: Any) -> str:
+    """Opaque keyset cursor for the last row of a page (e.g. its `ts`, or `ts` and `id`)."""
+    raw = [{"t": v.isoformat()} if isinstance(v, datetime) else v for v in key]
+    data = json.dumps(raw, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, size: int) -> tuple[Any, ...]:
+    """Inverse of `encode_cursor`; raises InvalidCursor unless it holds `size` values."""
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        raw = json.loads(data)
+        key = tuple(datetime.fromisoformat(v["t"]) if isinstance(v, dict) else v for v in raw)
+    except (ValueError, TypeError, KeyError) as exc:
+        raise InvalidCursor(f"invalid cursor: {cursor!r}") from exc
+    if len(key) != size:
+        raise InvalidCursor(f"invalid cursor: {cursor!r}")
+    return key
@@ -15,6 +15,7 @@ from sqlalchemy import (
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
     Numeric,
     String,
     Text,
@@ -70,7 +71,8 @@ class Instrument(TimestampMixin, Base):
     base_asset: Mapped[str] = mapped_column(String(20), nullable=False)
     quote_asset: Mapped[str] = mapped_column(String(20), nullable=False)
     exchange: Mapped[Exchange] = mapped_column(
-        Enum(Exchange, name="exchange_enum", native_enum=False), nullable=False,
+        Enum(Exchange, name="exchange_enum", native_enum=False),
+        nullable=False,
     )
     status: Mapped[str] = mapped_column(String(20), nullable=False, default="TRADING")
     tick_size: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
@@ -103,7 +105,23 @@ class Candle(TimestampMixin, Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     instrument_id: Mapped[int] = mapped_column(
-        ForeignKey("instruments.id", ondelete="CASCADE"), nullable=False,
+        ForeignKey("instruments.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    interval: Mapped[CandleInterval] = mapped_column(
+        Enum(CandleInterval, name="candle_interval_enum", native_enum=False),
+        nullable=False,
+    )
+    ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    open: Mapped[float] = mapped_column(Float, nullable=False)
+    high: Mapped[float] = mapped_column(Float, nullable=False)
+    low: Mapped[float] = mapped_column(Float, nullable=False)
+    close: Mapped[float] = mapped_column(Float, nullable=False)
+    volume: Mapped[float] = mapped_column(Float, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("instrument_id", "interval", "ts", name="uq_candle_unique"),
+        Index("ix_candles_ts", "ts"),
     )
 
 
@@ -115,7 +133,8 @@ class OHLCV1m(TimestampMixin, Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     instrument_id: Mapped[int] = mapped_column(
-        ForeignKey("instruments.id", ondelete="CASCADE"), nullable=False,
+        ForeignKey("instruments.id", ondelete="CASCADE"),
+        nullable=False,
     )
     ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     open: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
@@ -131,12 +150,59 @@ class OHLCV1m(TimestampMixin, Base):
     )
 
 
+class OHLCVAgg(TimestampMixin, Base):
+    """Higher-timeframe candles folded from `ohlcv_1m`; ts is the UTC-aligned bucket start."""
+
+    __tablename__ = "ohlcv_agg"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    instrument_id: Mapped[int] = mapped_column(
+        ForeignKey("instruments.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    # "5m" | "15m" | "1h" | "4h" | "1d"
+    timeframe: Mapped[str] = mapped_column(String(4), nullable=False)
+    ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    open: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
+    high: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
+    low: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
+    close: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
+    volume_base: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
+    turnover_quote: Mapped[Decimal | None] = mapped_column(Numeric(38, 18), nullable=True)
+    # 1m candles folded in; < bucket width while the bucket is still open or has gaps
+    minutes: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("instrument_id", "timeframe", "ts", name="uq_ohlcv_agg_unique"),
+    )
+
+
+class OHLCVCoverage(TimestampMixin, Base):
+    """Contiguous [start, end) minute ranges per instrument known to be complete in `ohlcv_1m`.
+
+    Maintained on insert; minutes the exchange confirmed have no candle count as covered.
+    """
+
+    __tablename__ = "ohlcv_coverage"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    instrument_id: Mapped[int] = mapped_column(
+        ForeignKey("instruments.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    start: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    end: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (Index("ix_ohlcv_coverage_instr_start", "instrument_id", "start"),)
+
+
 class TickerRT(TimestampMixin, Base):
     __tablename__ = "ticker_rt"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     instrument_id: Mapped[int] = mapped_column(
-        ForeignKey("instruments.id", ondelete="CASCADE"), nullable=False,
+        ForeignKey("instruments.id", ondelete="CASCADE"),
+        nullable=False,
     )
     ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     last: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
@@ -148,7 +214,58 @@ class TickerRT(TimestampMixin, Base):
     mark: Mapped[Decimal | None] = mapped_column(Numeric(38, 18), nullable=True)
     index: Mapped[Decimal | None] = mapped_column(Numeric(38, 18), nullable=True)
 
-    __table_args__ = (Index("ix_tickerrt_ts", "ts"),)
+    __table_args__ = (
+        Index("ix_tickerrt_ts", "ts"),
+        Index("ix_tickerrt_instr_ts", "instrument_id", "ts"),
+    )
+
+
+class TickerRollup(TimestampMixin, Base):
+    """Per-bucket ticker summary kept after raw `ticker_rt` rows expire."""
+
+    __tablename__ = "ticker_rollup"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    instrument_id: Mapped[int] = mapped_column(
+        ForeignKey("instruments.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    # "1s" | "1m"; ts is the bucket start
+    interval: Mapped[str] = mapped_column(String(4), nullable=False)
+    ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    open: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
+    high: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
+    low: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
+    close: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
+    bid: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
+    ask: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
+    spread_bps_avg: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
+    samples: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("instrument_id", "interval", "ts", name="uq_ticker_rollup_unique"),
+        Index("ix_ticker_rollup_ts", "ts"),
+    )
+
+
+class TickerLatest(TimestampMixin, Base):
+    """Last ticker per instrument, upserted by the ingest path alongside `ticker_rt`."""
+
+    __tablename__ = "ticker_latest"
+
+    instrument_id: Mapped[int] = mapped_column(
+        ForeignKey("instruments.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
+    bid: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
+    ask: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
+    mid: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
+    spread_bps: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
+    day_vol_quote: Mapped[Decimal | None] = mapped_column(Numeric(38, 18), nullable=True)
+    mark: Mapped[Decimal | None] = mapped_column(Numeric(38, 18), nullable=True)
+    index: Mapped[Decimal | None] = mapped_column(Numeric(38, 18), nullable=True)
 
 
 class OBSide(str, enum.Enum):
@@ -161,18 +278,68 @@ class OrderBookL2(TimestampMixin, Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     instrument_id: Mapped[int] = mapped_column(
-        ForeignKey("instruments.id", ondelete="CASCADE"), nullable=False,
+        ForeignKey("instruments.id", ondelete="CASCADE"),
+        nullable=False,
     )
     ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     side: Mapped[OBSide] = mapped_column(
-        Enum(OBSide, name="ob_side_enum", native_enum=False), nullable=False,
+        Enum(OBSide, name="ob_side_enum", native_enum=False),
+        nullable=False,
     )
     px: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
     qty: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
     snapshot_id: Mapped[str | None] = mapped_column(String(36), nullable=True)
     update_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # Delta rows point at the snapshot/checkpoint they apply on top of
+    checkpoint_id: Mapped[str | None] = mapped_column(String(36), nullable=True)
+
+    __table_args__ = (
+        Index("ix_ob_l2_instr_ts_side", "instrument_id", "ts", "side"),
+        Index("ix_ob_l2_snapshot_id", "snapshot_id"),
+        Index("ix_ob_l2_checkpoint_id", "checkpoint_id"),
+    )
+
+
+class OrderBookPacked(TimestampMixin, Base):
+    """One row per WS book message; each side is a blob of scaled int64 (px, qty) pairs."""
+
+    __tablename__ = "orderbook_l2_packed"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    instrument_id: Mapped[int] = mapped_column(
+        ForeignKey("instruments.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    snapshot_id: Mapped[str | None] = mapped_column(String(36), nullable=True)
+    checkpoint_id: Mapped[str | None] = mapped_column(String(36), nullable=True)
+    update_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    price_scale: Mapped[int] = mapped_column(Integer, nullable=False)
+    qty_scale: Mapped[int] = mapped_column(Integer, nullable=False)
+    bids: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    asks: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
 
-    __table_args__ = (Index("ix_ob_l2_instr_ts_side", "instrument_id", "ts", "side"),)
+    __table_args__ = (
+        Index("ix_ob_packed_instr_ts", "instrument_id", "ts"),
+        Index("ix_ob_packed_snapshot_id", "snapshot_id"),
+        Index("ix_ob_packed_checkpoint_id", "checkpoint_id"),
+    )
+
+
+class OrderBookLatest(TimestampMixin, Base):
+    """Top OB_LATEST_DEPTH levels of the local book per instrument, refreshed while it syncs."""
+
+    __tablename__ = "orderbook_latest"
+
+    instrument_id: Mapped[int] = mapped_column(
+        ForeignKey("instruments.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    update_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # [[px, qty], ...] as exchange decimal strings, best level first
+    bids: Mapped[list[Any]] = mapped_column(JSONB().with_variant(JSON, "sqlite"), nullable=False)
+    asks: Mapped[list[Any]] = mapped_column(JSONB().with_variant(JSON, "sqlite"), nullable=False)
 
 
 class TradeSide(str, enum.Enum):
@@ -185,33 +352,23 @@ class TradeRT(TimestampMixin, Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     instrument_id: Mapped[int] = mapped_column(
-        ForeignKey("instruments.id", ondelete="CASCADE"), nullable=False,
+        ForeignKey("instruments.id", ondelete="CASCADE"),
+        nullable=False,
     )
     ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     px: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
     qty: Mapped[Decimal] = mapped_column(Numeric(38, 18), nullable=False)
     side: Mapped[TradeSide] = mapped_column(
-        Enum(TradeSide, name="trade_side_enum", native_enum=False), nullable=False,
+        Enum(TradeSide, name="trade_side_enum", native_enum=False),
+        nullable=False,
     )
     trade_id: Mapped[str] = mapped_column(String(100), nullable=False)
 
     __table_args__ = (
-        UniqueConstraint("instrument_id", "trade_id", name="uq_trade_rt_unique"),
+        # Partitioned on Postgres by ts, which every unique key must include
+        UniqueConstraint("instrument_id", "trade_id", "ts", name="uq_trade_rt_unique"),
         Index("ix_tradert_ts", "ts"),
-    )
-    interval: Mapped[CandleInterval] = mapped_column(
-        Enum(CandleInterval, name="candle_interval_enum", native_enum=False), nullable=False,
-    )
-    ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
-    open: Mapped[float] = mapped_column(Float, nullable=False)
-    high: Mapped[float] = mapped_column(Float, nullable=False)
-    low: Mapped[float] = mapped_column(Float, nullable=False)
-    close: Mapped[float] = mapped_column(Float, nullable=False)
-    volume: Mapped[float] = mapped_column(Float, nullable=False)
-
-    __table_args__ = (
-        UniqueConstraint("instrument_id", "interval", "ts", name="uq_candle_unique"),
-        Index("ix_candles_ts", "ts"),
+        Index("ix_tradert_instr_ts", "instrument_id", "ts"),
     )
 
 
@@ -221,13 +378,16 @@ class Order(TimestampMixin, Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     client_order_id: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
     instrument_id: Mapped[int] = mapped_column(
-        ForeignKey("instruments.id", ondelete="RESTRICT"), nullable=False,
+        ForeignKey("instruments.id", ondelete="RESTRICT"),
+        nullable=False,
     )
     side: Mapped[OrderSide] = mapped_column(
-        Enum(OrderSide, name="order_side_enum", native_enum=False), nullable=False,
+        Enum(OrderSide, name="order_side_enum", native_enum=False),
+        nullable=False,
     )
     type: Mapped[OrderType] = mapped_column(
-        Enum(OrderType, name="order_type_enum", native_enum=False), nullable=False,
+        Enum(OrderType, name="order_type_enum", native_enum=False),
+        nullable=False,
     )
     qty: Mapped[float] = mapped_column(Float, nullable=False)
     price: Mapped[float | None] = mapped_column(Float, nullable=True)
@@ -238,11 +398,14 @@ class Order(TimestampMixin, Base):
     )
     exchange_order_id: Mapped[str | None] = mapped_column(String(64), nullable=True)
     meta: Mapped[dict[str, Any] | None] = mapped_column(
-        JSONB().with_variant(JSON, "sqlite"), nullable=True,
+        JSONB().with_variant(JSON, "sqlite"),
+        nullable=True,
     )
 
     fills: Mapped[list[Fill]] = relationship(
-        "Fill", back_populates="order", cascade="all, delete-orphan",
+        "Fill",
+        back_populates="order",
+        cascade="all, delete-orphan",
     )
 
 
@@ -251,7 +414,8 @@ class Fill(TimestampMixin, Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     order_id: Mapped[int] = mapped_column(
-        ForeignKey("orders.id", ondelete="CASCADE"), nullable=False,
+        ForeignKey("orders.id", ondelete="CASCADE"),
+        nullable=False,
     )
     price: Mapped[float] = mapped_column(Float, nullable=False)
     qty: Mapped[float] = mapped_column(Float, nullable=False)
@@ -267,10 +431,12 @@ class Position(TimestampMixin, Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     instrument_id: Mapped[int] = mapped_column(
-        ForeignKey("instruments.id", ondelete="RESTRICT"), nullable=False,
+        ForeignKey("instruments.id", ondelete="RESTRICT"),
+        nullable=False,
     )
     side: Mapped[PositionSide] = mapped_column(
-        Enum(PositionSide, name="position_side_enum", native_enum=False), nullable=False,
+        Enum(PositionSide, name="position_side_enum", native_enum=False),
+        nullable=False,
     )
     qty: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
     avg_price: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
@@ -286,7 +452,8 @@ class Config(TimestampMixin, Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     key: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
     value: Mapped[dict[str, Any] | None] = mapped_column(
-        JSONB().with_variant(JSON, "sqlite"), nullable=True,
+        JSONB().with_variant(JSON, "sqlite"),
+        nullable=True,
     )
 
 
@@ -295,12 +462,15 @@ class ModelDecision(TimestampMixin, Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     ts: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), nullable=False, default=datetime.utcnow,
+        DateTime(timezone=True),
+        nullable=False,
+        default=datetime.utcnow,
     )
     request_id: Mapped[str] = mapped_column(String(36), nullable=False)
     input_context_hash: Mapped[str] = mapped_column(String(64), nullable=False)
     decision_json: Mapped[dict[str, Any] | None] = mapped_column(
-        JSONB().with_variant(JSON, "sqlite"), nullable=True,
+        JSONB().with_variant(JSON, "sqlite"),
+        nullable=True,
     )
     valid: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
     rejection_reason: Mapped[str | None] = mapped_column(Text, nullable=True)
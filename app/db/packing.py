@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import struct
+from collections.abc import Sequence
+from decimal import Decimal
+from typing import Any
+
+# One level = (price, qty) as little-endian int64s scaled by 10**scale
+_PAIR = struct.Struct("<qq")
+DEFAULT_SCALE = 8
+_INT64_MAX = 2**63 - 1
+
+
+def _dec(value: Any) -> Decimal:
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def required_scale(values: Sequence[Any], floor: int | None) -> int:
+    """Smallest scale >= `floor` that represents every value exactly."""
+    scale = DEFAULT_SCALE if floor is None else floor
+    for v in values:
+        exp = _dec(v).normalize().as_tuple().exponent
+        if isinstance(exp, int) and -exp > scale:
+            scale = -exp
+    return scale
+
+
+def _scaled(value: Any, scale: int) -> int:
+    n = _dec(value).scaleb(scale)
+    i = int(n)
+    if i != n or abs(i) > _INT64_MAX:
+        raise ValueError(f"{value} does not fit an int64 at scale {scale}")
+    return i
+
+
+def pack_levels(levels: Sequence[Sequence[Any]], price_scale: int, qty_scale: int) -> bytes:
+    buf = bytearray(_PAIR.size * len(levels))
+    for i, (px, qty) in enumerate(levels):
+        _PAIR.pack_into(buf, i * _PAIR.size, _scaled(px, price_scale), _scaled(qty, qty_scale))
+    return bytes(buf)
+
+
+def unpack_levels(blob: bytes, price_scale: int, qty_scale: int) -> list[tuple[Decimal, Decimal]]:
+    return [
+        (Decimal(px).scaleb(-price_scale), Decimal(qty).scaleb(-qty_scale))
+        for px, qty in _PAIR.iter_unpack(blob)
+    ]
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, time, timedelta
+from time import monotonic
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+# Range-partitioned by `ts` on Postgres (migration 0005); period per table
+PARTITIONED_TABLES: dict[str, str] = {
+    "ohlcv_1m": "month",
+    "ticker_rt": "day",
+    "trade_rt": "day",
+    "orderbook_l2": "day",
+    "orderbook_l2_packed": "day",
+}
+
+_SUFFIX = re.compile(r"_p(\d{6}|\d{8})$")
+
+
+@dataclass(frozen=True)
+class Partition:
+    table: str
+    name: str
+    start: date
+    end: date
+
+
+def period_start(period: str, d: date) -> date:
+    return d.replace(day=1) if period == "month" else d
+
+
+def period_next(period: str, d: date) -> date:
+    if period == "month":
+        return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return d + timedelta(days=1)
+
+
+def partition_for(table: str, period: str, d: date) -> Partition:
+    start = period_start(period, d)
+    suffix = f"{start:%Y%m}" if period == "month" else f"{start:%Y%m%d}"
+    return Partition(table, f"{table}_p{suffix}", start, period_next(period, start))
+
+
+def parse_partition(table: str, period: str, name: str) -> Partition | None:
+    """Inverse of `partition_for`; None for partitions this module did not name."""
+    m = _SUFFIX.search(name)
+    if m is None or name[: m.start()] != table:
+        return None
+    raw = m.group(1)
+    try:
+        d = datetime.strptime(raw, "%Y%m" if len(raw) == 6 else "%Y%m%d").date()
+    except ValueError:
+        return None
+    p = partition_for(table, period, d)
+    return p if p.name == name else None
+
+
+def partitions_between(table: str, period: str, first: date, last: date) -> list[Partition]:
+    """Partitions covering every day from `first` through `last` inclusive."""
+    out: list[Partition] = []
+    d = period_start(period, first)
+    while d <= last:
+        p = partition_for(table, period, d)
+        out.append(p)
+        d = p.end
+    return out
+
+
+def wanted_partitions(table: str, period: str, today: date, ahead_days: int) -> list[Partition]:
+    return partitions_between(table, period, today, today + timedelta(days=ahead_days))
+
+
+def expired_partitions(parts: list[Partition], today: date, retain_days: int) -> list[Partition]:
+    """Partitions whose whole range is older than the retention window."""
+    if retain_days <= 0:
+        return []
+    cutoff = today - timedelta(days=retain_days)
+    return [p for p in parts if p.end <= cutoff]
+
+
+def partitions_before(parts: list[Partition], ts: datetime | None) -> list[Partition]:
+    """Partitions whose whole range ends at or before `ts` (none when `ts` is None)."""
+    if ts is None:
+        return []
+    return [p for p in parts if datetime.combine(p.end, time(), UTC) <= ts]
+
+
+async def is_partitioned(conn: AsyncConnection, table: str) -> bool:
+    res = await conn.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = :t AND relkind IN ('r', 'p')"),
+        {"t": table},
+    )
+    return res.scalar() == "p"
+
+
+async def list_partitions(conn: AsyncConnection, table: str, period: str) -> list[Partition]:
+    res = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :t",
+        ),
+        {"t": table},
+    )
+    parts = [parse_partition(table, period, name) for (name,) in res.all()]
+    return sorted((p for p in parts if p is not None), key=lambda p: p.start)
+
+
+def partition_ddl(p: Partition) -> str:
+    """CREATE statement for `p`; shared with migration 0005, which runs synchronously."""
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{p.name}" PARTITION OF "{p.table}" '
+        f"FOR VALUES FROM ('{p.start.isoformat()} 00:00:00+00') "
+        f"TO ('{p.end.isoformat()} 00:00:00+00')"
+    )
+
+
+async def create_partition(conn: AsyncConnection, p: Partition) -> None:
+    await conn.execute(text(partition_ddl(p)))
+
+
+async def drop_partition(conn: AsyncConnection, p: Partition) -> None:
+    await conn.execute(text(f'DROP TABLE IF EXISTS "{p.name}"'))
+    _seen.pop(p.name, None)
+
+
+# Partitions known to exist -> when that was last confirmed, so inserts into current
+# ranges skip the catalog. Entries expire: maintenance in another process may drop one
+SEEN_TTL_SEC = 300.0
+_seen: dict[str, float] = {}
+# Bounds the wait when an open transaction locks the parent table against DDL
+_DDL_LOCK_TIMEOUT = "2s"
+
+
+def _utc_date(ts: datetime) -> date:
+    return (ts.astimezone(UTC) if ts.tzinfo else ts).date()
+
+
+async def ensure_partitions(
+    engine: AsyncEngine,
+    table: str,
+    first: datetime,
+    last: datetime,
+) -> int:
+    """Create any missing partitions of `table` covering [first, last]; returns how many.
+
+    Maintenance only keeps partitions from the oldest row up to PARTITION_AHEAD_DAYS
+    ahead, so backfills and repairs of older history call this before inserting. The
+    DDL runs in its own short transaction, so a failure or lock wait here never rolls
+    back the caller's insert.
+    """
+    period = PARTITIONED_TABLES[table]
+    now = monotonic()
+    wanted = [
+        p
+        for p in partitions_between(table, period, _utc_date(first), _utc_date(last))
+        if p.name not in _seen or now - _seen[p.name] >= SEEN_TTL_SEC
+    ]
+    if not wanted:
+        return 0
+    created = 0
+    async with engine.begin() as conn:
+        if await is_partitioned(conn, table):
+            await conn.execute(text(f"SET LOCAL lock_timeout = '{_DDL_LOCK_TIMEOUT}'"))
+            existing = {p.name for p in await list_partitions(conn, table, period)}
+            for p in wanted:
+                if p.name not in existing:
+                    await create_partition(conn, p)
+                    created += 1
+    # Committed (or not partitioned at all): nothing to do for these until they expire
+    for p in wanted:
+        _seen[p.name] = now
+    return created
+
+
+def today_utc() -> date:
+    return datetime.now(UTC).date()
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.bulk import bulk_upsert
+from app.db.models import Config
+
+
+class ConfigsRepository:
+    """Small JSON key/value state (e.g. job watermarks) in the `configs` table."""
+
+    def __init__(self, db: AsyncSession) -> None:
+        self._db = db
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        res = await self._db.execute(select(Config.value).where(Config.key == key))
+        return res.scalar_one_or_none()
+
+    async def put(self, key: str, value: dict[str, Any]) -> None:
+        """Upsert `key`; the caller commits so state moves together with the data."""
+        await bulk_upsert(self._db, Config, [{"key": key, "value": value}], ["key"], ["value"])
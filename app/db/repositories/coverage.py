@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.db.models import OHLCV1m, OHLCVCoverage
+
+MINUTE = timedelta(minutes=1)
+
+Range = tuple[datetime, datetime]
+
+
+def _utc(ts: datetime) -> datetime:
+    # SQLite hands back naive datetimes; everything stored is UTC
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=UTC)
+
+
+def minute_runs(timestamps: Iterable[datetime]) -> list[Range]:
+    """Collapse 1m candle timestamps into contiguous [start, end) ranges."""
+    runs: list[Range] = []
+    for ts in sorted({_utc(t) for t in timestamps}):
+        if runs and runs[-1][1] == ts:
+            runs[-1] = (runs[-1][0], ts + MINUTE)
+        else:
+            runs.append((ts, ts + MINUTE))
+    return runs
+
+
+def merge_ranges(ranges: Iterable[Range]) -> list[Range]:
+    """Union of [start, end) ranges; touching ranges are joined."""
+    out: list[Range] = []
+    for start, end in sorted((_utc(s), _utc(e)) for s, e in ranges):
+        if out and start <= out[-1][1]:
+            out[-1] = (out[-1][0], max(out[-1][1], end))
+        else:
+            out.append((start, end))
+    return out
+
+
+def subtract_ranges(window: Range, covered: Sequence[Range]) -> list[Range]:
+    """Parts of `window` not in `covered` (sorted by start; overlaps allowed)."""
+    cursor, end = window
+    gaps: list[Range] = []
+    for s, e in covered:
+        if s > cursor:
+            gaps.append((cursor, min(s, end)))
+        cursor = max(cursor, e)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, end))
+    return [(s, e) for s, e in gaps if s < e]
+
+
+class CoverageRepository:
+    """Per-instrument `ohlcv_coverage` ranges, so gaps are found without scanning candles."""
+
+    def __init__(self, db: AsyncSession | AsyncConnection) -> None:
+        self._db = db
+
+    async def ranges(self, instrument_id: int, start: datetime, end: datetime) -> list[Range]:
+        """Stored ranges touching [start, end], by start."""
+        res = await self._db.execute(
+            select(OHLCVCoverage.start, OHLCVCoverage.end)
+            .where(
+                OHLCVCoverage.instrument_id == instrument_id,
+                OHLCVCoverage.start <= end,
+                OHLCVCoverage.end >= start,
+            )
+            .order_by(OHLCVCoverage.start.asc()),
+        )
+        return [(_utc(s), _utc(e)) for s, e in res.all()]
+
+    async def add(self, instrument_id: int, ranges: Sequence[Range]) -> None:
+        """Mark `ranges` covered, merging them with the stored ranges they touch.
+
+        The caller commits, normally in the same transaction as the candles.
+        """
+        if not ranges:
+            return
+        lo = min(_utc(s) for s, _ in ranges)
+        hi = max(_utc(e) for _, e in ranges)
+        res = await self._db.execute(
+            select(OHLCVCoverage.id, OHLCVCoverage.start, OHLCVCoverage.end).where(
+                OHLCVCoverage.instrument_id == instrument_id,
+                OHLCVCoverage.start <= hi,
+                OHLCVCoverage.end >= lo,
+            ),
+        )
+        existing = res.all()
+        merged = merge_ranges([*ranges, *((s, e) for _, s, e in existing)])
+        if existing:
+            await self._db.execute(
+                delete(OHLCVCoverage).where(OHLCVCoverage.id.in_([i for i, _, _ in existing])),
+            )
+        await self._db.execute(
+            insert(OHLCVCoverage),
+            [{"instrument_id": instrument_id, "start": s, "end": e} for s, e in merged],
+        )
+
+    async def missing(self, instrument_id: int, start: datetime, end: datetime) -> list[Range]:
+        """Uncovered [start, end) ranges inside the window, widened to whole minutes."""
+        start = _utc(start).replace(second=0, microsecond=0)
+        end = _utc(end)
+        if end.second or end.microsecond:
+            end = end.replace(second=0, microsecond=0) + MINUTE
+        if start >= end:
+            return []
+        return subtract_ranges((start, end), await self.ranges(instrument_id, start, end))
+
+    async def trim(self, before: datetime) -> None:
+        """Forget coverage before `before` for every instrument, once candles there expire.
+
+        The caller commits, in the same transaction as the delete or partition drop.
+        """
+        before = _utc(before)
+        await self._db.execute(delete(OHLCVCoverage).where(OHLCVCoverage.end <= before))
+        await self._db.execute(
+            update(OHLCVCoverage).where(OHLCVCoverage.start < before).values(start=before),
+        )
+
+    async def is_empty(self, instrument_id: int) -> bool:
+        found = await self._db.scalar(
+            select(OHLCVCoverage.id).where(OHLCVCoverage.instrument_id == instrument_id).limit(1),
+        )
+        return found is None
+
+    async def rebuild(self, instrument_id: int) -> int:
+        """Recompute the instrument's ranges from `ohlcv_1m` (one full scan); returns ranges.
+
+        For candles stored before coverage tracking (see `seed_coverage`); the Postgres
+        migration seeds existing databases itself. Minutes the exchange confirmed empty
+        are not candles, so they become gaps again.
+        """
+        result = await self._db.stream_scalars(
+            select(OHLCV1m.ts)
+            .where(OHLCV1m.instrument_id == instrument_id)
+            .order_by(OHLCV1m.ts.asc())
+            .execution_options(yield_per=10_000),
+        )
+        runs: list[Range] = []
+        async for ts in result:
+            ts = _utc(ts)
+            if runs and runs[-1][1] == ts:
+                runs[-1] = (runs[-1][0], ts + MINUTE)
+            else:
+                runs.append((ts, ts + MINUTE))
+        await self._db.execute(
+            delete(OHLCVCoverage).where(OHLCVCoverage.instrument_id == instrument_id),
+        )
+        if runs:
+            await self._db.execute(
+                insert(OHLCVCoverage),
+                [{"instrument_id": instrument_id, "start": s, "end": e} for s, e in runs],
+            )
+        await self._db.commit()
+        return len(runs)
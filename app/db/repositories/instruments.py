@@ -3,66 +3,76 @@ from __future__ import annotations
 from collections.abc import Iterable
 from typing import Any
 
-from sqlalchemy import select, update
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db.bulk import BulkResult, bulk_upsert
 from app.db.models import Instrument
 
+# Refreshed on every sync; identity columns (symbol, assets, exchange, type) are not
+_METADATA_COLUMNS = [
+    "settlement",
+    "tick_size_num",
+    "lot_size_num",
+    "min_notional_num",
+    "contract_size",
+    "price_scale",
+    "qty_scale",
+    "maker_fee_bps",
+    "taker_fee_bps",
+    "max_leverage",
+]
+
 
 class InstrumentsRepository:
     def __init__(self, db: AsyncSession) -> None:
         self._db = db
 
-    async def upsert_many(self, market_rows: Iterable[dict[str, Any]]) -> None:
+    async def upsert_many(self, market_rows: Iterable[dict[str, Any]]) -> BulkResult:
+        """Insert new markets and refresh tick/lot/fee metadata of known ones in one commit.
+
+        One `INSERT ... ON CONFLICT (venue, symbol) DO UPDATE` per chunk; markets whose
+        metadata is unchanged are left untouched and counted as skipped.
+        """
+        values: dict[tuple[str, str], dict[str, Any]] = {}
         for row in market_rows:
             venue = row.get("venue", "bybit")
             symbol = row["symbol"]
-            result = await self._db.execute(
-                select(Instrument).where(Instrument.venue == venue, Instrument.symbol == symbol),
-            )
-            inst = result.scalar_one_or_none()
-            if inst is None:
-                inst = Instrument(
-                    symbol=symbol,
-                    base_asset=row.get("base_asset") or symbol.split("/")[0],
-                    quote_asset=row.get("settlement") or symbol.split("/")[-1],
-                    exchange=row.get("exchange") or inst_exchange_default(),
-                    status="TRADING",
-                    tick_size=0.0,
-                    step_size=0.0,
-                    min_notional=0.0,
-                    venue=venue,
-                    type=row.get("type", "spot"),
-                    settlement=row.get("settlement"),
-                    tick_size_num=row.get("tick_size"),
-                    lot_size_num=row.get("lot_size"),
-                    min_notional_num=row.get("min_notional"),
-                    contract_size=row.get("contract_size"),
-                    price_scale=row.get("price_scale"),
-                    qty_scale=row.get("qty_scale"),
-                    maker_fee_bps=row.get("maker_fee_bps"),
-                    taker_fee_bps=row.get("taker_fee_bps"),
-                    max_leverage=row.get("max_leverage"),
-                )
-                self._db.add(inst)
-            else:
-                await self._db.execute(
-                    update(Instrument)
-                    .where(Instrument.id == inst.id)
-                    .values(
-                        settlement=row.get("settlement"),
-                        tick_size_num=row.get("tick_size"),
-                        lot_size_num=row.get("lot_size"),
-                        min_notional_num=row.get("min_notional"),
-                        contract_size=row.get("contract_size"),
-                        price_scale=row.get("price_scale"),
-                        qty_scale=row.get("qty_scale"),
-                        maker_fee_bps=row.get("maker_fee_bps"),
-                        taker_fee_bps=row.get("taker_fee_bps"),
-                        max_leverage=row.get("max_leverage"),
-                    ),
-                )
+            # Later rows win; one statement may not touch the same key twice
+            values[(venue, symbol)] = {
+                "symbol": symbol,
+                "base_asset": row.get("base_asset") or symbol.split("/")[0],
+                "quote_asset": row.get("settlement") or symbol.split("/")[-1],
+                "exchange": row.get("exchange") or inst_exchange_default(),
+                "status": "TRADING",
+                "tick_size": 0.0,
+                "step_size": 0.0,
+                "min_notional": 0.0,
+                "venue": venue,
+                "type": row.get("type", "spot"),
+                "settlement": row.get("settlement"),
+                "tick_size_num": row.get("tick_size"),
+                "lot_size_num": row.get("lot_size"),
+                "min_notional_num": row.get("min_notional"),
+                "contract_size": row.get("contract_size"),
+                "price_scale": row.get("price_scale"),
+                "qty_scale": row.get("qty_scale"),
+                "maker_fee_bps": row.get("maker_fee_bps"),
+                "taker_fee_bps": row.get("taker_fee_bps"),
+                "max_leverage": row.get("max_leverage"),
+            }
+        if not values:
+            return BulkResult()
+        result = await bulk_upsert(
+            self._db,
+            Instrument,
+            list(values.values()),
+            ["venue", "symbol"],
+            [*_METADATA_COLUMNS, "updated_at"],
+            only_changed=True,
+        )
         await self._db.commit()
+        return result
 
     async def get_all_spot(self) -> list[Instrument]:
         res = await self._db.execute(select(Instrument).where(Instrument.type == "spot"))
@@ -78,5 +88,3 @@ def inst_exchange_default():
     from app.db.models import Exchange
 
     return Exchange.BYBIT
-
-
@@ -1,20 +1,37 @@
 from __future__ import annotations
 
-from collections.abc import Iterable
+from collections.abc import AsyncIterator, Iterable, Sequence
 from datetime import datetime
+from typing import Any
 
-from sqlalchemy import select
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import Float, Row, Select, and_, cast, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import Instrument, OHLCV1m
+from app.db.bulk import BulkResult, bulk_upsert
+from app.db.cursors import decode_cursor, encode_cursor
+from app.db.models import Instrument, OHLCV1m, OHLCVAgg
+from app.db.repositories.coverage import CoverageRepository, minute_runs
+
+# Column order of the tuple paths (`fetch_ohlcv_1m_rows`, `fetch_aggregate_rows`)
+CANDLE_COLUMNS = ("ts", "open", "high", "low", "close", "volume_base")
+# Column order of `fetch_1m_rows`, the input of the higher-timeframe fold
+_AGGREGATE_INPUT = (*CANDLE_COLUMNS, "turnover_quote")
+
+
+def _candle_cols(model: Any, as_float: bool) -> list[Any]:
+    cols = [getattr(model, name) for name in CANDLE_COLUMNS]
+    if not as_float:
+        return cols
+    # Converted by the database, so the driver never builds Decimals
+    return [cols[0], *(cast(c, Float).label(c.key) for c in cols[1:])]
 
 
 class OhlcvRepository:
     def __init__(self, db: AsyncSession) -> None:
         self._db = db
 
-    async def insert_ohlcv_rows(self, instrument_id: int, rows: Iterable[dict]) -> None:
+    async def insert_ohlcv_rows(self, instrument_id: int, rows: Iterable[dict]) -> BulkResult:
+        """Insert 1m candles (existing minutes are kept) and extend `ohlcv_coverage` with them."""
         values = [
             {
                 "instrument_id": instrument_id,
@@ -29,11 +46,29 @@ class OhlcvRepository:
             for r in rows
         ]
         if not values:
-            return
-        stmt = insert(OHLCV1m).values(values)
-        stmt = stmt.on_conflict_do_nothing(index_elements=["instrument_id", "ts"])  # type: ignore[attr-defined]
-        await self._db.execute(stmt)
+            return BulkResult()
+        result = await bulk_upsert(self._db, OHLCV1m, values, ["instrument_id", "ts"])
+        # Every minute in the batch is stored now, whether inserted or already present
+        await CoverageRepository(self._db).add(instrument_id, minute_runs(v["ts"] for v in values))
         await self._db.commit()
+        return result
+
+    @staticmethod
+    def _range(
+        q: Select[Any],
+        model: Any,
+        symbol: str,
+        start: datetime | None,
+        end: datetime | None,
+        limit: int | None,
+    ) -> Select[Any]:
+        sub = select(Instrument.id).where(Instrument.symbol == symbol).scalar_subquery()
+        q = q.where(model.instrument_id == sub)
+        if start is not None:
+            q = q.where(model.ts >= start)
+        if end is not None:
+            q = q.where(model.ts <= end)
+        return q.order_by(model.ts.asc()).limit(limit)
 
     async def fetch_ohlcv_1m(
         self,
@@ -42,12 +77,181 @@ class OhlcvRepository:
         end: datetime | None,
         limit: int = 1000,
     ) -> list[OHLCV1m]:
-        sub = select(Instrument.id).where(Instrument.symbol == symbol).scalar_subquery()
-        q = select(OHLCV1m).where(OHLCV1m.instrument_id == sub)
-        if start is not None:
-            q = q.where(OHLCV1m.ts >= start)
-        if end is not None:
-            q = q.where(OHLCV1m.ts <= end)
-        q = q.order_by(OHLCV1m.ts.asc()).limit(limit)
-        res = await self._db.execute(q)
+        res = await self._db.execute(
+            self._range(select(OHLCV1m), OHLCV1m, symbol, start, end, limit),
+        )
+        return list(res.scalars().all())
+
+    async def fetch_ohlcv_1m_rows(
+        self,
+        symbol: str,
+        start: datetime | None,
+        end: datetime | None,
+        limit: int = 1000,
+        *,
+        as_float: bool = False,
+    ) -> Sequence[Row[Any]]:
+        """CANDLE_COLUMNS tuples by ts, skipping ORM identity-map and instrumentation cost.
+
+        `as_float` has the database return floats instead of Decimals.
+        """
+        q = select(*_candle_cols(OHLCV1m, as_float))
+        res = await self._db.execute(self._range(q, OHLCV1m, symbol, start, end, limit))
+        return res.all()
+
+    async def fetch_ohlcv_1m_page(
+        self,
+        symbol: str,
+        start: datetime | None,
+        end: datetime | None,
+        limit: int = 1000,
+        cursor: str | None = None,
+        *,
+        as_float: bool = False,
+    ) -> tuple[Sequence[Row[Any]], str | None]:
+        """One keyset page of `fetch_ohlcv_1m_rows` and the cursor for the next (None at the end).
+
+        Pages continue strictly after the cursor's ts, so the cost of a page does not grow
+        with its position the way OFFSET does. Raises InvalidCursor for a malformed cursor.
+        """
+        q = select(*_candle_cols(OHLCV1m, as_float))
+        if cursor is not None:
+            (after,) = decode_cursor(cursor, 1)
+            q = q.where(OHLCV1m.ts > after)
+        # One extra row tells whether another page exists
+        res = await self._db.execute(self._range(q, OHLCV1m, symbol, start, end, limit + 1))
+        rows = res.all()
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].ts)
+
+    async def stream_ohlcv_1m_rows(
+        self,
+        symbol: str,
+        start: datetime | None,
+        end: datetime | None,
+        chunk_rows: int = 5000,
+        *,
+        as_float: bool = False,
+    ) -> AsyncIterator[Sequence[Row[Any]]]:
+        """Yield `fetch_ohlcv_1m_rows` tuples in chunks from a server-side cursor.
+
+        Memory stays at one chunk however long the range is. The session stays busy until
+        the iterator is exhausted or closed.
+        """
+        q = self._range(
+            select(*_candle_cols(OHLCV1m, as_float)),
+            OHLCV1m,
+            symbol,
+            start,
+            end,
+            None,
+        )
+        result = await self._db.stream(q.execution_options(yield_per=chunk_rows))
+        try:
+            async for part in result.partitions():
+                yield part
+        finally:
+            await result.close()
+
+    async def latest_ts(self, instrument_id: int) -> datetime | None:
+        return await self._db.scalar(
+            select(func.max(OHLCV1m.ts)).where(OHLCV1m.instrument_id == instrument_id),
+        )
+
+    async def fetch_1m_rows(
+        self,
+        instrument_id: int,
+        start: datetime,
+        end: datetime,
+    ) -> Sequence[Row[Any]]:
+        """(ts, open, high, low, close, volume_base, turnover_quote) in [start, end), by ts."""
+        res = await self._db.execute(
+            select(*(getattr(OHLCV1m, name) for name in _AGGREGATE_INPUT))
+            .where(
+                OHLCV1m.instrument_id == instrument_id,
+                OHLCV1m.ts >= start,
+                OHLCV1m.ts < end,
+            )
+            .order_by(OHLCV1m.ts.asc()),
+        )
+        return res.all()
+
+    async def upsert_aggregates(self, rows: Sequence[dict[str, Any]]) -> BulkResult:
+        """Write higher-timeframe buckets, replacing any previously computed values.
+
+        The caller commits, together with the aggregate watermark the buckets match.
+        """
+        if not rows:
+            return BulkResult()
+        return await bulk_upsert(
+            self._db,
+            OHLCVAgg,
+            rows,
+            ["instrument_id", "timeframe", "ts"],
+            ["open", "high", "low", "close", "volume_base", "turnover_quote", "minutes"],
+        )
+
+    async def fetch_aggregate_buckets(
+        self,
+        instrument_id: int,
+        starts: dict[str, datetime],
+    ) -> dict[str, dict[str, Any]]:
+        """Stored {timeframe: bucket} for each timeframe's bucket starting at `starts[tf]`,
+        keyed like `upsert_aggregates` rows; missing buckets are left out."""
+        if not starts:
+            return {}
+        res = await self._db.execute(
+            select(OHLCVAgg).where(
+                OHLCVAgg.instrument_id == instrument_id,
+                or_(
+                    *(
+                        and_(OHLCVAgg.timeframe == tf, OHLCVAgg.ts == ts)
+                        for tf, ts in starts.items()
+                    )
+                ),
+            ),
+        )
+        return {
+            b.timeframe: {
+                "instrument_id": b.instrument_id,
+                "timeframe": b.timeframe,
+                "ts": starts[b.timeframe],
+                "open": b.open,
+                "high": b.high,
+                "low": b.low,
+                "close": b.close,
+                "volume_base": b.volume_base,
+                "turnover_quote": b.turnover_quote,
+                "minutes": b.minutes,
+            }
+            for b in res.scalars()
+        }
+
+    async def fetch_aggregates(
+        self,
+        symbol: str,
+        timeframe: str,
+        start: datetime | None,
+        end: datetime | None,
+        limit: int = 1000,
+    ) -> list[OHLCVAgg]:
+        q = select(OHLCVAgg).where(OHLCVAgg.timeframe == timeframe)
+        res = await self._db.execute(self._range(q, OHLCVAgg, symbol, start, end, limit))
         return list(res.scalars().all())
+
+    async def fetch_aggregate_rows(
+        self,
+        symbol: str,
+        timeframe: str,
+        start: datetime | None,
+        end: datetime | None,
+        limit: int = 1000,
+        *,
+        as_float: bool = False,
+    ) -> Sequence[Row[Any]]:
+        """Tuple counterpart of `fetch_aggregates`; same columns as `fetch_ohlcv_1m_rows`."""
+        q = select(*_candle_cols(OHLCVAgg, as_float)).where(OHLCVAgg.timeframe == timeframe)
+        res = await self._db.execute(self._range(q, OHLCVAgg, symbol, start, end, limit))
+        return res.all()
@@ -1,49 +1,62 @@
 from __future__ import annotations
 
+from collections.abc import Sequence
 from datetime import datetime
+from decimal import Decimal
+from typing import Any
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import Instrument, OBSide, OrderBookL2
+from app.core.config import settings
+from app.db.bulk import BulkResult, bulk_upsert, latest_per_instrument
+from app.db.models import Instrument, OBSide, OrderBookL2, OrderBookLatest, OrderBookPacked
+from app.db.packing import pack_levels, required_scale, unpack_levels
+
+
+def _level_rows(
+    instrument_id: int,
+    ts: datetime,
+    bids: Sequence[tuple[Any, Any]],
+    asks: Sequence[tuple[Any, Any]],
+    **tags: Any,
+) -> list[dict[str, Any]]:
+    return [
+        {"instrument_id": instrument_id, "ts": ts, "side": side, "px": px, "qty": qty, **tags}
+        for side, levels in ((OBSide.bid, bids), (OBSide.ask, asks))
+        for px, qty in levels
+    ]
+
+
+def _json_levels(levels: Sequence[Sequence[Any]]) -> list[list[str]]:
+    return [[str(px), str(qty)] for px, qty in levels]
+
+
+def _decimal_levels(
+    levels: Sequence[Sequence[str]],
+    limit: int | None,
+) -> list[tuple[Decimal, Decimal]]:
+    return [(Decimal(px), Decimal(qty)) for px, qty in levels[:limit]]
 
 
 class OrderBookRepository:
-    def __init__(self, db: AsyncSession) -> None:
+    def __init__(self, db: AsyncSession, storage_mode: str | None = None) -> None:
         self._db = db
+        # "rows": one orderbook_l2 row per level; "packed": one orderbook_l2_packed row per message
+        self._storage_mode = storage_mode or settings.ob_storage_mode
 
     async def write_snapshot(
         self,
         instrument_id: int,
         snapshot_id: str,
-        bids: list[tuple],
-        asks: list[tuple],
+        bids: list[tuple[Any, Any]],
+        asks: list[tuple[Any, Any]],
         ts: datetime,
     ) -> None:
-        # Remove previous levels at the same snapshot? We keep append-only rows for history.
-        for px, qty in bids:
-            self._db.add(
-                OrderBookL2(
-                    instrument_id=instrument_id,
-                    ts=ts,
-                    side=OBSide.bid,
-                    px=px,
-                    qty=qty,
-                    snapshot_id=snapshot_id,
-                ),
-            )
-        for px, qty in asks:
-            self._db.add(
-                OrderBookL2(
-                    instrument_id=instrument_id,
-                    ts=ts,
-                    side=OBSide.ask,
-                    px=px,
-                    qty=qty,
-                    snapshot_id=snapshot_id,
-                ),
-            )
-        await self._db.commit()
+        # Append-only rows for history
+        await self.write_levels_batch(
+            _level_rows(instrument_id, ts, bids, asks, snapshot_id=snapshot_id),
+        )
 
     async def write_delta(
         self,
@@ -71,69 +84,245 @@ class OrderBookRepository:
         instrument_id: int,
         update_id: int | None,
         *,
-        bids: list[tuple],
-        asks: list[tuple],
+        bids: list[tuple[Any, Any]],
+        asks: list[tuple[Any, Any]],
         ts: datetime,
     ) -> None:
-        for px, qty in bids:
-            self._db.add(
-                OrderBookL2(
-                    instrument_id=instrument_id,
-                    ts=ts,
-                    side=OBSide.bid,
-                    px=px,
-                    qty=qty,
-                    update_id=update_id,
-                ),
+        await self.write_levels_batch(
+            _level_rows(instrument_id, ts, bids, asks, update_id=update_id),
+        )
+
+    async def write_levels_batch(self, rows: Sequence[dict[str, Any]]) -> BulkResult:
+        """Insert pre-flattened level rows from many WS messages in one commit.
+
+        Each row carries `instrument_id`, `ts`, `side`, `px`, `qty` and optionally
+        `snapshot_id` / `update_id` / `checkpoint_id`, matching the `orderbook_l2` columns.
+        """
+        if not rows:
+            return BulkResult()
+        values = [
+            {
+                "instrument_id": r["instrument_id"],
+                "ts": r["ts"],
+                "side": OBSide(r["side"]),
+                "px": r["px"],
+                "qty": r["qty"],
+                "snapshot_id": r.get("snapshot_id"),
+                "update_id": r.get("update_id"),
+                "checkpoint_id": r.get("checkpoint_id"),
+            }
+            for r in rows
+        ]
+        # Append-only history: no conflict target
+        result = await bulk_upsert(self._db, OrderBookL2, values)
+        await self._db.commit()
+        return result
+
+    async def upsert_latest_batch(self, rows: Sequence[dict[str, Any]]) -> BulkResult:
+        """Replace `orderbook_latest` for each row's instrument in one commit.
+
+        Each row carries `instrument_id`, `ts`, optional `update_id`, and `bids`/`asks`
+        as (px, qty) sequences, best level first. Only the newest row per instrument is
+        kept, and never one older than the stored book.
+        """
+        if not rows:
+            return BulkResult()
+        values = [
+            {
+                "instrument_id": r["instrument_id"],
+                "ts": r["ts"],
+                "update_id": r.get("update_id"),
+                "bids": _json_levels(r["bids"]),
+                "asks": _json_levels(r["asks"]),
+            }
+            for r in latest_per_instrument(rows)
+        ]
+        result = await bulk_upsert(
+            self._db,
+            OrderBookLatest,
+            values,
+            ["instrument_id"],
+            ["ts", "update_id", "bids", "asks", "updated_at"],
+            only_newer=True,
+        )
+        await self._db.commit()
+        return result
+
+    async def get_latest_many(
+        self,
+        symbols: Sequence[str],
+        limit_per_side: int | None = None,
+    ) -> dict[str, dict[str, Any]]:
+        """Latest stored book per symbol in one primary-key lookup; symbols without one are absent."""
+        if not symbols:
+            return {}
+        res = await self._db.execute(
+            select(
+                Instrument.symbol,
+                OrderBookLatest.ts,
+                OrderBookLatest.bids,
+                OrderBookLatest.asks,
             )
-        for px, qty in asks:
-            self._db.add(
-                OrderBookL2(
-                    instrument_id=instrument_id,
-                    ts=ts,
-                    side=OBSide.ask,
-                    px=px,
-                    qty=qty,
-                    update_id=update_id,
-                ),
+            .join(OrderBookLatest, OrderBookLatest.instrument_id == Instrument.id)
+            .where(Instrument.symbol.in_(list(symbols))),
+        )
+        return {
+            symbol: {
+                "bids": _decimal_levels(bids, limit_per_side),
+                "asks": _decimal_levels(asks, limit_per_side),
+                "ts": ts,
+            }
+            for symbol, ts, bids, asks in res.all()
+        }
+
+    async def get_latest_snapshot(self, symbol: str, limit_per_side: int) -> dict[str, Any]:
+        book = (await self.get_latest_many([symbol], limit_per_side)).get(symbol)
+        if book is not None:
+            return book
+        # Nothing published yet (ingester not running); rebuild from history instead
+        return await self.get_book_at(symbol, None, limit_per_side)
+
+    async def write_packed_batch(self, rows: Sequence[dict[str, Any]]) -> BulkResult:
+        """Insert one packed row per WS message in one commit.
+
+        Each row carries `instrument_id`, `ts`, `bids`/`asks` as (px, qty) sequences,
+        optional `snapshot_id` / `update_id` / `checkpoint_id`, and the instrument's
+        `price_scale` / `qty_scale`, which are widened per message when a level needs
+        more digits so encoding is always exact.
+        """
+        if not rows:
+            return BulkResult()
+        values = []
+        for r in rows:
+            bids, asks = r["bids"], r["asks"]
+            price_scale = required_scale(
+                [px for px, _ in bids] + [px for px, _ in asks],
+                r.get("price_scale"),
             )
+            qty_scale = required_scale(
+                [qty for _, qty in bids] + [qty for _, qty in asks],
+                r.get("qty_scale"),
+            )
+            values.append(
+                {
+                    "instrument_id": r["instrument_id"],
+                    "ts": r["ts"],
+                    "snapshot_id": r.get("snapshot_id"),
+                    "checkpoint_id": r.get("checkpoint_id"),
+                    "update_id": r.get("update_id"),
+                    "price_scale": price_scale,
+                    "qty_scale": qty_scale,
+                    "bids": pack_levels(bids, price_scale, qty_scale),
+                    "asks": pack_levels(asks, price_scale, qty_scale),
+                },
+            )
+        result = await bulk_upsert(self._db, OrderBookPacked, values)
         await self._db.commit()
+        return result
+
+    async def get_book_at(
+        self,
+        symbol: str,
+        at: datetime | None = None,
+        limit_per_side: int | None = None,
+    ) -> dict[str, Any]:
+        """Rebuild the book as of `at` (latest when None).
 
-    async def get_latest_snapshot(self, symbol: str, limit_per_side: int) -> dict:
+        Reads the last snapshot/checkpoint at or before `at` plus only the deltas tagged
+        with that checkpoint, so the cost is bounded by WS_SNAPSHOT_INTERVAL_SEC. Both
+        layouts are searched, so history written before an OB_STORAGE_MODE switch stays
+        readable; a checkpoint's deltas are always in its own layout.
+        """
         sub = select(Instrument.id).where(Instrument.symbol == symbol).scalar_subquery()
-        # Find latest snapshot timestamp for this instrument
-        res = await self._db.execute(
-            select(OrderBookL2.ts)
-            .where(OrderBookL2.instrument_id == sub, OrderBookL2.snapshot_id.is_not(None))
-            .order_by(OrderBookL2.ts.desc())
-            .limit(1),
-        )
-        latest_ts = res.scalar_one_or_none()
-        if latest_ts is None:
+        found: list[tuple[datetime, str, str]] = []
+        for mode, table in (("rows", OrderBookL2), ("packed", OrderBookPacked)):
+            q = select(table.snapshot_id, table.ts).where(
+                table.instrument_id == sub,
+                table.snapshot_id.is_not(None),
+            )
+            if at is not None:
+                q = q.where(table.ts <= at)
+            res = await self._db.execute(q.order_by(table.ts.desc()).limit(1))
+            row = res.first()
+            if row is not None:
+                found.append((row.ts, row.snapshot_id, mode))
+        if not found:
             return {"bids": [], "asks": [], "ts": None}
+        # Latest checkpoint wins; on a tie, the configured layout
+        ts, checkpoint_id, mode = max(found, key=lambda f: (f[0], f[2] == self._storage_mode))
 
-        bids = await self._db.execute(
-            select(OrderBookL2)
-            .where(
-                OrderBookL2.instrument_id == sub,
-                OrderBookL2.ts == latest_ts,
-                OrderBookL2.side == OBSide.bid,
-            )
-            .order_by(OrderBookL2.px.desc())
-            .limit(limit_per_side),
+        if mode == "packed":
+            updates, ts = await self._packed_updates(checkpoint_id, at, ts)
+        else:
+            updates, ts = await self._row_updates(checkpoint_id, at, ts)
+
+        levels: dict[OBSide, dict[Any, Any]] = {OBSide.bid: {}, OBSide.ask: {}}
+        for side, px, qty in updates:
+            if qty:
+                levels[side][px] = qty
+            else:
+                levels[side].pop(px, None)
+
+        bids = sorted(levels[OBSide.bid].items(), reverse=True)
+        asks = sorted(levels[OBSide.ask].items())
+        if limit_per_side is not None:
+            bids, asks = bids[:limit_per_side], asks[:limit_per_side]
+        return {"bids": bids, "asks": asks, "ts": ts}
+
+    async def _row_updates(
+        self,
+        checkpoint_id: str,
+        at: datetime | None,
+        ts: datetime,
+    ) -> tuple[list[tuple[OBSide, Any, Any]], datetime]:
+        base = await self._db.execute(
+            select(OrderBookL2.side, OrderBookL2.px, OrderBookL2.qty).where(
+                OrderBookL2.snapshot_id == checkpoint_id,
+            ),
         )
-        asks = await self._db.execute(
-            select(OrderBookL2)
-            .where(
-                OrderBookL2.instrument_id == sub,
-                OrderBookL2.ts == latest_ts,
-                OrderBookL2.side == OBSide.ask,
-            )
-            .order_by(OrderBookL2.px.asc())
-            .limit(limit_per_side),
+        updates = [(side, px, qty) for side, px, qty in base.all()]
+        dq = select(OrderBookL2.side, OrderBookL2.px, OrderBookL2.qty, OrderBookL2.ts).where(
+            OrderBookL2.checkpoint_id == checkpoint_id,
         )
-        return {
-            "bids": [(r.px, r.qty) for r in bids.scalars().all()],
-            "asks": [(r.px, r.qty) for r in asks.scalars().all()],
-            "ts": latest_ts,
-        }
+        if at is not None:
+            dq = dq.where(OrderBookL2.ts <= at)
+        deltas = await self._db.execute(
+            dq.order_by(OrderBookL2.update_id.asc(), OrderBookL2.id.asc()),
+        )
+        for side, px, qty, delta_ts in deltas.all():
+            updates.append((side, px, qty))
+            ts = max(ts, delta_ts)
+        return updates, ts
+
+    async def _packed_updates(
+        self,
+        checkpoint_id: str,
+        at: datetime | None,
+        ts: datetime,
+    ) -> tuple[list[tuple[OBSide, Any, Any]], datetime]:
+        cols = (
+            OrderBookPacked.bids,
+            OrderBookPacked.asks,
+            OrderBookPacked.price_scale,
+            OrderBookPacked.qty_scale,
+            OrderBookPacked.ts,
+        )
+        dq = select(*cols).where(OrderBookPacked.checkpoint_id == checkpoint_id)
+        if at is not None:
+            dq = dq.where(OrderBookPacked.ts <= at)
+        base = await self._db.execute(
+            select(*cols).where(OrderBookPacked.snapshot_id == checkpoint_id),
+        )
+        deltas = await self._db.execute(
+            dq.order_by(OrderBookPacked.update_id.asc(), OrderBookPacked.id.asc()),
+        )
+        updates: list[tuple[OBSide, Any, Any]] = []
+        for bids, asks, price_scale, qty_scale, row_ts in [*base.all(), *deltas.all()]:
+            updates.extend(
+                (OBSide.bid, px, qty) for px, qty in unpack_levels(bids, price_scale, qty_scale)
+            )
+            updates.extend(
+                (OBSide.ask, px, qty) for px, qty in unpack_levels(asks, price_scale, qty_scale)
+            )
+            ts = max(ts, row_ts)
+        return updates, ts
@@ -1,9 +1,26 @@
 from __future__ import annotations
 
+from collections.abc import Sequence
+from typing import Any
+
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import Instrument, TickerRT
+from app.db.bulk import BulkResult, bulk_upsert, latest_per_instrument
+from app.db.models import Instrument, TickerLatest, TickerRT
+
+_LATEST_UPDATE = [
+    "ts",
+    "last",
+    "bid",
+    "ask",
+    "mid",
+    "spread_bps",
+    "day_vol_quote",
+    "mark",
+    "index",
+    "updated_at",
+]
 
 
 class TickersRepository:
@@ -24,13 +41,73 @@ class TickersRepository:
             index=row.get("index"),
         )
         self._db.add(rec)
+        await self._upsert_latest([{"instrument_id": instrument_id, **row}])
         await self._db.commit()
 
-    async def get_latest(self, symbol: str) -> TickerRT | None:
-        sub = select(Instrument.id).where(Instrument.symbol == symbol).scalar_subquery()
-        res = await self._db.execute(
-            select(TickerRT).where(TickerRT.instrument_id == sub).order_by(TickerRT.ts.desc()).limit(1),
+    async def insert_tickers_batch(self, rows: Sequence[dict[str, Any]]) -> BulkResult:
+        """Insert many ticker rows (each carrying `instrument_id`) in one commit.
+
+        `ticker_latest` is upserted in the same transaction.
+        """
+        if not rows:
+            return BulkResult()
+        values = [
+            {
+                "instrument_id": r["instrument_id"],
+                "ts": r["ts"],
+                "last": r["last"],
+                "bid": r["bid"],
+                "ask": r["ask"],
+                "mid": r["mid"],
+                "spread_bps": r["spread_bps"],
+                "day_vol_quote": r.get("day_vol_quote"),
+                "mark": r.get("mark"),
+                "index": r.get("index"),
+            }
+            for r in rows
+        ]
+        result = await bulk_upsert(self._db, TickerRT, values)
+        await self._upsert_latest(values)
+        await self._db.commit()
+        return result
+
+    async def _upsert_latest(self, rows: Sequence[dict[str, Any]]) -> None:
+        # Single inserts and write-behind batches may interleave; an older ticker never
+        # replaces a newer one
+        values = [
+            {
+                "instrument_id": r["instrument_id"],
+                "ts": r["ts"],
+                "last": r["last"],
+                "bid": r["bid"],
+                "ask": r["ask"],
+                "mid": r["mid"],
+                "spread_bps": r["spread_bps"],
+                "day_vol_quote": r.get("day_vol_quote"),
+                "mark": r.get("mark"),
+                "index": r.get("index"),
+            }
+            for r in latest_per_instrument(rows)
+        ]
+        await bulk_upsert(
+            self._db,
+            TickerLatest,
+            values,
+            ["instrument_id"],
+            _LATEST_UPDATE,
+            only_newer=True,
         )
-        return res.scalar_one_or_none()
 
+    async def get_latest(self, symbol: str) -> TickerLatest | None:
+        return (await self.get_latest_many([symbol])).get(symbol)
 
+    async def get_latest_many(self, symbols: Sequence[str]) -> dict[str, TickerLatest]:
+        """Latest ticker per symbol in one primary-key lookup; symbols without one are absent."""
+        if not symbols:
+            return {}
+        res = await self._db.execute(
+            select(Instrument.symbol, TickerLatest)
+            .join(TickerLatest, TickerLatest.instrument_id == Instrument.id)
+            .where(Instrument.symbol.in_(list(symbols))),
+        )
+        return {symbol: ticker for symbol, ticker in res.all()}
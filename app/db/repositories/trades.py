@@ -1,23 +1,43 @@
 from __future__ import annotations
 
-from collections.abc import Iterable
+from collections.abc import AsyncIterator, Iterable, Sequence
 from datetime import datetime
+from typing import Any
 
-from sqlalchemy import select
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import Float, Row, Select, cast, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db.bulk import BulkResult, bulk_upsert
+from app.db.cursors import decode_cursor, encode_cursor
 from app.db.models import Instrument, TradeRT
 
+# Column order of `get_recent_rows` and the history paths
+TRADE_COLUMNS = ("ts", "px", "qty", "side", "trade_id")
+
+
+def _trade_cols(as_float: bool) -> list[Any]:
+    px: Any = cast(TradeRT.px, Float).label("px") if as_float else TradeRT.px
+    qty: Any = cast(TradeRT.qty, Float).label("qty") if as_float else TradeRT.qty
+    return [TradeRT.ts, px, qty, TradeRT.side, TradeRT.trade_id]
+
 
 class TradesRepository:
     def __init__(self, db: AsyncSession) -> None:
         self._db = db
 
-    async def insert_trades(self, instrument_id: int, rows: Iterable[dict]) -> None:
+    async def insert_trades(self, instrument_id: int, rows: Iterable[dict]) -> BulkResult:
+        return await self.insert_trades_batch([{**r, "instrument_id": instrument_id} for r in rows])
+
+    async def insert_trades_batch(self, rows: Sequence[dict[str, Any]]) -> BulkResult:
+        """Insert trades for any number of instruments (rows carry `instrument_id`).
+
+        Trades already stored under the same (instrument_id, trade_id, ts) are skipped.
+        """
+        if not rows:
+            return BulkResult()
         values = [
             {
-                "instrument_id": instrument_id,
+                "instrument_id": r["instrument_id"],
                 "ts": r["ts"],
                 "px": r["px"],
                 "qty": r["qty"],
@@ -26,22 +46,105 @@ class TradesRepository:
             }
             for r in rows
         ]
-        if not values:
-            return
-        stmt = insert(TradeRT).values(values)
-        stmt = stmt.on_conflict_do_nothing(constraint="uq_trade_rt_unique")
-        await self._db.execute(stmt)
+        result = await bulk_upsert(
+            self._db,
+            TradeRT,
+            values,
+            ["instrument_id", "trade_id", "ts"],
+        )
         await self._db.commit()
+        return result
 
-    async def get_recent(
-        self, symbol: str, limit: int = 200, since_ts: datetime | None = None,
-    ) -> list[TradeRT]:
+    @staticmethod
+    def _recent(
+        q: Select[Any],
+        symbol: str,
+        limit: int,
+        since_ts: datetime | None,
+    ) -> Select[Any]:
         sub = select(Instrument.id).where(Instrument.symbol == symbol).scalar_subquery()
-        q = select(TradeRT).where(TradeRT.instrument_id == sub)
+        q = q.where(TradeRT.instrument_id == sub)
         if since_ts is not None:
             q = q.where(TradeRT.ts >= since_ts)
-        q = q.order_by(TradeRT.ts.desc()).limit(limit)
-        res = await self._db.execute(q)
+        return q.order_by(TradeRT.ts.desc()).limit(limit)
+
+    async def get_recent(
+        self,
+        symbol: str,
+        limit: int = 200,
+        since_ts: datetime | None = None,
+    ) -> list[TradeRT]:
+        res = await self._db.execute(self._recent(select(TradeRT), symbol, limit, since_ts))
         return list(res.scalars().all())
 
+    async def get_recent_rows(
+        self,
+        symbol: str,
+        limit: int = 200,
+        since_ts: datetime | None = None,
+        *,
+        as_float: bool = False,
+    ) -> Sequence[Row[Any]]:
+        """TRADE_COLUMNS tuples, newest first; `as_float` returns px/qty as floats."""
+        q = select(*_trade_cols(as_float))
+        res = await self._db.execute(self._recent(q, symbol, limit, since_ts))
+        return res.all()
+
+    @staticmethod
+    def _history(
+        q: Select[Any],
+        symbol: str,
+        start: datetime | None,
+        end: datetime | None,
+    ) -> Select[Any]:
+        sub = select(Instrument.id).where(Instrument.symbol == symbol).scalar_subquery()
+        q = q.where(TradeRT.instrument_id == sub)
+        if start is not None:
+            q = q.where(TradeRT.ts >= start)
+        if end is not None:
+            q = q.where(TradeRT.ts <= end)
+        # Trades share timestamps, so the id breaks ties and keeps the keyset total
+        return q.order_by(TradeRT.ts.asc(), TradeRT.id.asc())
+
+    async def get_trades_page(
+        self,
+        symbol: str,
+        start: datetime | None,
+        end: datetime | None,
+        limit: int = 1000,
+        cursor: str | None = None,
+        *,
+        as_float: bool = False,
+    ) -> tuple[Sequence[Row[Any]], str | None]:
+        """One keyset page of TRADE_COLUMNS + (id,) tuples, oldest first, and the next cursor.
+
+        Raises InvalidCursor for a malformed cursor.
+        """
+        q = select(*_trade_cols(as_float), TradeRT.id)
+        if cursor is not None:
+            after_ts, after_id = decode_cursor(cursor, 2)
+            q = q.where(tuple_(TradeRT.ts, TradeRT.id) > tuple_(after_ts, after_id))
+        res = await self._db.execute(self._history(q, symbol, start, end).limit(limit + 1))
+        rows = res.all()
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].ts, rows[-1].id)
 
+    async def stream_trade_rows(
+        self,
+        symbol: str,
+        start: datetime | None,
+        end: datetime | None,
+        chunk_rows: int = 5000,
+        *,
+        as_float: bool = False,
+    ) -> AsyncIterator[Sequence[Row[Any]]]:
+        """Yield TRADE_COLUMNS tuples, oldest first, in chunks from a server-side cursor."""
+        q = self._history(select(*_trade_cols(as_float)), symbol, start, end)
+        result = await self._db.stream(q.execution_options(yield_per=chunk_rows))
+        try:
+            async for part in result.partitions():
+                yield part
+        finally:
+            await result.close()
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from array import array
+from collections.abc import Sequence
+from datetime import UTC, datetime
+from typing import Any
+
+
+def epoch_ms(ts: datetime) -> int:
+    # SQLite hands back naive datetimes; everything stored is UTC
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=UTC)
+    return int(ts.timestamp() * 1000)
+
+
+def to_columns(
+    rows: Sequence[Sequence[Any]],
+    names: Sequence[str],
+    floats: Sequence[str] = (),
+) -> dict[str, Any]:
+    """Transpose result tuples into one sequence per column.
+
+    Columns named in `floats` become `array("d")` (8 bytes per value instead of a boxed
+    object); `ts` columns become epoch milliseconds.
+    """
+    transposed = list(zip(*rows, strict=True)) if rows else [() for _ in names]
+    out: dict[str, Any] = {}
+    for name, values in zip(names, transposed, strict=True):
+        if name in floats:
+            out[name] = array("d", map(float, values))
+        elif name == "ts":
+            out[name] = [epoch_ms(v) for v in values]
+        else:
+            out[name] = list(values)
+    return out
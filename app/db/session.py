@@ -3,6 +3,7 @@ from __future__ import annotations
 import os
 import ssl
 from collections.abc import AsyncIterator
+from typing import Any
 from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
 
 import certifi
@@ -17,70 +18,151 @@ from app.core.config import settings
 
 _engine: AsyncEngine | None = None
 _session_maker: async_sessionmaker[AsyncSession] | None = None
+# Optional replica (DATABASE_READ_URL) with its own pool; None means reads use the primary
+_read_engine: AsyncEngine | None = None
+_read_session_maker: async_sessionmaker[AsyncSession] | None = None
+
+
+def _create_engine(db_url: str, pool_size: int, max_overflow: int) -> AsyncEngine:
+    # Normalize SSL params for asyncpg: drop sslmode, ensure ssl=true
+    if db_url.startswith("postgresql+asyncpg://"):
+        parsed = urlparse(db_url)
+        q = parse_qs(parsed.query)
+        if "sslmode" in q:
+            q.pop("sslmode", None)
+        if "ssl" not in q:
+            q["ssl"] = ["true"]
+        db_url = urlunparse(
+            (
+                parsed.scheme,
+                parsed.netloc,
+                parsed.path,
+                parsed.params,
+                urlencode(q, doseq=True),
+                parsed.fragment,
+            ),
+        )
+    connect_args: dict[str, object] = {}
+    if db_url.startswith("postgresql+asyncpg://"):
+        # Prefer user-provided root cert; fallback to certifi bundle
+        cafile = os.getenv("PGSSLROOTCERT") or os.getenv("DB_SSL_ROOT_CERT") or certifi.where()
+        verify = os.getenv("DB_SSL_VERIFY", "true").lower() != "false"
+        if verify:
+            ssl_context = ssl.create_default_context(cafile=cafile)
+            ssl_context.check_hostname = True
+        else:
+            # Insecure: disable verification (dev only)
+            ssl_context = ssl._create_unverified_context()
+            ssl_context.check_hostname = False
+        connect_args["ssl"] = ssl_context
+    engine_kwargs: dict[str, object] = {
+        "pool_pre_ping": True,
+        "connect_args": connect_args,
+    }
+    if "sqlite" not in db_url:
+        engine_kwargs["pool_size"] = pool_size
+        engine_kwargs["max_overflow"] = max_overflow
+        engine_kwargs["pool_timeout"] = settings.db_pool_timeout
+        engine_kwargs["pool_recycle"] = settings.db_pool_recycle_seconds
+
+    return create_async_engine(db_url, **engine_kwargs)
+
+
+def _make_session_maker(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        engine,
+        expire_on_commit=False,
+        autoflush=False,
+        autocommit=False,
+    )
 
 
 def _ensure_session_factory() -> async_sessionmaker[AsyncSession]:
     global _engine, _session_maker
     if _engine is None:
-        db_url = settings.database_url
-        # Normalize SSL params for asyncpg: drop sslmode, ensure ssl=true
-        if db_url.startswith("postgresql+asyncpg://"):
-            parsed = urlparse(db_url)
-            q = parse_qs(parsed.query)
-            if "sslmode" in q:
-                q.pop("sslmode", None)
-            if "ssl" not in q:
-                q["ssl"] = ["true"]
-            db_url = urlunparse(
-                (
-                    parsed.scheme,
-                    parsed.netloc,
-                    parsed.path,
-                    parsed.params,
-                    urlencode(q, doseq=True),
-                    parsed.fragment,
-                ),
-            )
-        connect_args: dict[str, object] = {}
-        if db_url.startswith("postgresql+asyncpg://"):
-            # Prefer user-provided root cert; fallback to certifi bundle
-            cafile = os.getenv("PGSSLROOTCERT") or os.getenv("DB_SSL_ROOT_CERT") or certifi.where()
-            verify = os.getenv("DB_SSL_VERIFY", "true").lower() != "false"
-            if verify:
-                ssl_context = ssl.create_default_context(cafile=cafile)
-                ssl_context.check_hostname = True
-            else:
-                # Insecure: disable verification (dev only)
-                ssl_context = ssl._create_unverified_context()
-                ssl_context.check_hostname = False
-            connect_args["ssl"] = ssl_context
-        engine_kwargs: dict[str, object] = {
-            "pool_pre_ping": True,
-            "connect_args": connect_args,
-        }
-        if "sqlite" not in db_url:
-            engine_kwargs["pool_size"] = settings.db_pool_size
-            engine_kwargs["max_overflow"] = settings.db_max_overflow
-            engine_kwargs["pool_timeout"] = settings.db_pool_timeout
-            engine_kwargs["pool_recycle"] = settings.db_pool_recycle_seconds
-
-        _engine = create_async_engine(db_url, **engine_kwargs)
-    if _session_maker is None:
-        _session_maker = async_sessionmaker(
-            _engine,
-            expire_on_commit=False,
-            autoflush=False,
-            autocommit=False,
+        _engine = _create_engine(
+            settings.database_url,
+            settings.db_pool_size,
+            settings.db_max_overflow,
         )
+    if _session_maker is None:
+        _session_maker = _make_session_maker(_engine)
     return _session_maker
 
 
+def _ensure_read_session_factory() -> async_sessionmaker[AsyncSession]:
+    global _read_engine, _read_session_maker
+    if not settings.database_read_url:
+        return _ensure_session_factory()
+    if _read_engine is None:
+        _read_engine = _create_engine(
+            settings.database_read_url,
+            settings.db_read_pool_size,
+            settings.db_read_max_overflow,
+        )
+    if _read_session_maker is None:
+        _read_session_maker = _make_session_maker(_read_engine)
+    return _read_session_maker
+
+
 async def get_session() -> AsyncIterator[AsyncSession]:
     session_factory = _ensure_session_factory()
     async with session_factory() as session:
         yield session
 
 
+async def get_read_session() -> AsyncIterator[AsyncSession]:
+    """Session for read-only endpoints: the replica when DATABASE_READ_URL is set.
+
+    Replicas lag the primary, so anything that must see its own writes uses `get_session`.
+    """
+    session_factory = _ensure_read_session_factory()
+    async with session_factory() as session:
+        yield session
+
+
 def get_session_factory() -> async_sessionmaker[AsyncSession]:
     """Return the async sessionmaker for background tasks."""
     return _ensure_session_factory()
+
+
+def get_read_session_factory() -> async_sessionmaker[AsyncSession]:
+    return _ensure_read_session_factory()
+
+
+def get_engine() -> AsyncEngine:
+    """Return the process-wide engine (e.g. for connection-scoped locks)."""
+    _ensure_session_factory()
+    assert _engine is not None
+    return _engine
+
+
+def engines() -> dict[str, AsyncEngine]:
+    """Engines created so far in this process, by role ("primary", "read")."""
+    out: dict[str, AsyncEngine] = {}
+    if _engine is not None:
+        out["primary"] = _engine
+    if _read_engine is not None:
+        out["read"] = _read_engine
+    return out
+
+
+def pool_stats() -> dict[str, dict[str, int]]:
+    """Connection usage per engine; empty for pools without a fixed size (e.g. SQLite)."""
+    out: dict[str, dict[str, int]] = {}
+    for role, engine in engines().items():
+        pool: Any = engine.pool
+        if not hasattr(pool, "checkedout"):
+            continue
+        out[role] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": getattr(pool, "_max_overflow", 0),
+        }
+    return out
+
+
+async def dispose_engines() -> None:
+    for engine in engines().values():
+        await engine.dispose()
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+
 from fastapi import FastAPI
 
 from app.api.routes.candles import router as candles_router
@@ -15,7 +17,9 @@ from app.core.config import settings
 from app.core.errors import setup_exception_handlers
 from app.core.logging import configure_logging
 from app.core.security import setup_cors
-from app.workers.scheduler import start_market_data_tasks
+from app.db.session import dispose_engines
+from app.services.market_data.ccxt_adapter import close_ccxt_adapters
+from app.workers.ingest import run_ingester
 
 configure_logging(settings.log_level)
 app = FastAPI(title="Crypto Copilot API", version="0.1.0", openapi_url="/openapi.json")
@@ -38,7 +42,23 @@ async def root() -> dict[str, str]:
     return {"status": "ok"}
 
 
+_ingest_stop = asyncio.Event()
+_ingest_task: asyncio.Task[None] | None = None
+
+
 @app.on_event("startup")
 async def _startup() -> None:
-    # Fire-and-forget; tasks manage their own lifecycle
-    await start_market_data_tasks()
+    global _ingest_task
+    # Ingestion normally runs in its own process (python -m app.workers.ingest); in-API
+    # mode still goes through the leader lock so only one uvicorn worker ingests
+    if settings.enable_market_data_tasks and settings.ingest_in_api:
+        _ingest_task = asyncio.create_task(run_ingester(_ingest_stop))
+
+
+@app.on_event("shutdown")
+async def _shutdown() -> None:
+    if _ingest_task is not None:
+        _ingest_stop.set()
+        await _ingest_task
+    await close_ccxt_adapters()
+    await dispose_engines()
@@ -5,30 +5,32 @@ from collections import deque
 from dataclasses import dataclass, field
 from decimal import Decimal
 
-
-@dataclass
-class OrderbookSnapshot:
-    bids: list[tuple[Decimal, Decimal]]  # price, qty
-    asks: list[tuple[Decimal, Decimal]]
+from app.services.market_data.decoding import RawTicker
+from app.services.market_data.orderbook import LocalOrderBook, OrderbookSnapshot
 
 
 @dataclass
 class MarketCache:
-    orderbooks: dict[str, OrderbookSnapshot] = field(default_factory=dict)
+    orderbooks: dict[str, LocalOrderBook] = field(default_factory=dict)
     trades: dict[str, deque[tuple[Decimal, Decimal]]] = field(default_factory=dict)  # (price, qty)
-    tickers: dict[str, dict] = field(default_factory=dict)
+    tickers: dict[str, RawTicker] = field(default_factory=dict)
     _lock: asyncio.Lock = field(default_factory=asyncio.Lock)
 
-    async def set_orderbook(self, symbol: str, snapshot: OrderbookSnapshot) -> None:
-        async with self._lock:
-            self.orderbooks[symbol] = snapshot
+    def book(self, symbol: str) -> LocalOrderBook:
+        # Books are mutated in place by the single WS handler for the symbol, so no lock
+        ob = self.orderbooks.get(symbol)
+        if ob is None:
+            ob = self.orderbooks[symbol] = LocalOrderBook(symbol)
+        return ob
 
-    async def append_trade(self, symbol: str, price: Decimal, qty: Decimal, maxlen: int = 1000) -> None:
+    async def append_trade(
+        self, symbol: str, price: Decimal, qty: Decimal, maxlen: int = 1000
+    ) -> None:
         async with self._lock:
             dq = self.trades.setdefault(symbol, deque(maxlen=maxlen))
             dq.append((price, qty))
 
-    async def set_ticker(self, symbol: str, ticker: dict) -> None:
+    async def set_ticker(self, symbol: str, ticker: RawTicker) -> None:
         async with self._lock:
             self.tickers[symbol] = ticker
 
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.logging import get_logger
+from app.db.models import OHLCV1m
+from app.db.repositories.configs import ConfigsRepository
+from app.db.repositories.ohlcv import OhlcvRepository
+
+if TYPE_CHECKING:
+    from app.services.market_data.instrument_registry import InstrumentRegistry
+
+logger = get_logger(__name__)
+
+# Materialized timeframes -> width in minutes; buckets are aligned to UTC midnight
+AGG_TIMEFRAMES: dict[str, int] = {"5m": 5, "15m": 15, "1h": 60, "4h": 240, "1d": 1440}
+_DAY = timedelta(days=1)
+_MINUTE = timedelta(minutes=1)
+_REBUILD_SLICE = timedelta(days=7)
+# pg_advisory_xact_lock(namespace, instrument_id) serialising writers of one instrument's
+# buckets; the single-key ingest leader lock lives in a separate key space
+AGG_LOCK_NAMESPACE = 0x4147
+
+
+def _watermark_key(instrument_id: int) -> str:
+    return f"ohlcv_agg.watermark.{instrument_id}"
+
+
+def _utc(ts: datetime) -> datetime:
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=UTC)
+
+
+def bucket_start(ts: datetime, minutes: int) -> datetime:
+    ts = _utc(ts)
+    day = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    offset = (ts.hour * 60 + ts.minute) // minutes * minutes
+    return day + timedelta(minutes=offset)
+
+
+def aggregate_1m(
+    instrument_id: int,
+    rows: Sequence[Sequence[Any]],
+    timeframe: str,
+) -> list[dict[str, Any]]:
+    """Fold ts-ordered (ts, o, h, l, c, volume, turnover) 1m rows into `timeframe` buckets."""
+    minutes = AGG_TIMEFRAMES[timeframe]
+    out: list[dict[str, Any]] = []
+    cur: dict[str, Any] | None = None
+    for ts, o, h, low, c, vol, turnover in rows:
+        start = bucket_start(ts, minutes)
+        if cur is None or cur["ts"] != start:
+            cur = {
+                "instrument_id": instrument_id,
+                "timeframe": timeframe,
+                "ts": start,
+                "open": o,
+                "high": h,
+                "low": low,
+                "close": c,
+                "volume_base": vol,
+                "turnover_quote": turnover,
+                "minutes": 1,
+            }
+            out.append(cur)
+            continue
+        cur["high"] = max(cur["high"], h)
+        cur["low"] = min(cur["low"], low)
+        cur["close"] = c
+        cur["volume_base"] += vol
+        if turnover is not None:
+            cur["turnover_quote"] = (cur["turnover_quote"] or 0) + turnover
+        cur["minutes"] += 1
+    return out
+
+
+def merge_buckets(head: dict[str, Any], tail: dict[str, Any]) -> dict[str, Any]:
+    """Stored bucket `head` extended by `tail`, the same bucket folded from later minutes."""
+    turnover = head["turnover_quote"]
+    if tail["turnover_quote"] is not None:
+        turnover = (turnover or 0) + tail["turnover_quote"]
+    return {
+        **head,
+        "high": max(head["high"], tail["high"]),
+        "low": min(head["low"], tail["low"]),
+        "close": tail["close"],
+        "volume_base": head["volume_base"] + tail["volume_base"],
+        "turnover_quote": turnover,
+        "minutes": head["minutes"] + tail["minutes"],
+    }
+
+
+async def rebuild_aggregates(
+    db: AsyncSession,
+    instrument_id: int,
+    start: datetime,
+    end: datetime,
+    *,
+    through: datetime | None = None,
+) -> int:
+    """Recompute every timeframe for buckets touching [start, end]; returns buckets written.
+
+    The range is widened to whole UTC days so partially covered buckets are rebuilt
+    from all of their 1m candles, up to `through` (the watermark) when given: later
+    minutes are left to the next refresh, which would otherwise fold them in twice.
+    Call this after a backfill lands; the caller commits.
+    """
+    lo = bucket_start(start, AGG_TIMEFRAMES["1d"])
+    hi = bucket_start(end, AGG_TIMEFRAMES["1d"]) + _DAY
+    if through is not None:
+        hi = min(hi, _utc(through) + _MINUTE)
+    repo = OhlcvRepository(db)
+    written = 0
+    # Whole-day slices bound memory on long backfills (1440 rows per instrument-day)
+    while lo < hi:
+        slice_end = min(lo + _REBUILD_SLICE, hi)
+        rows = await repo.fetch_1m_rows(instrument_id, lo, slice_end)
+        for tf in AGG_TIMEFRAMES:
+            buckets = aggregate_1m(instrument_id, rows, tf)
+            await repo.upsert_aggregates(buckets)
+            written += len(buckets)
+        lo = slice_end
+    return written
+
+
+async def fold_new_minutes(
+    db: AsyncSession,
+    instrument_id: int,
+    since: datetime,
+    until: datetime,
+) -> int:
+    """Fold the 1m candles in [since, until) into the stored buckets; returns buckets written.
+
+    Only minutes from `since` are read. A bucket that was already open at `since` is
+    extended from its stored row instead of being recomputed from all of its minutes,
+    so a refresh costs the new minutes, not the whole day behind the 1d bucket.
+    """
+    repo = OhlcvRepository(db)
+    rows = await repo.fetch_1m_rows(instrument_id, since, until)
+    if not rows:
+        return 0
+    open_starts = {
+        tf: start
+        for tf, minutes in AGG_TIMEFRAMES.items()
+        if (start := bucket_start(since, minutes)) < since
+    }
+    stored = await repo.fetch_aggregate_buckets(instrument_id, open_starts)
+    if stored.keys() != open_starts.keys():
+        # A bucket the watermark sits in is missing; recompute those buckets in full
+        last = until - _MINUTE
+        return await rebuild_aggregates(db, instrument_id, since, last, through=last)
+    written = 0
+    for tf in AGG_TIMEFRAMES:
+        buckets = aggregate_1m(instrument_id, rows, tf)
+        head = stored.get(tf)
+        if head is not None and buckets[0]["ts"] == head["ts"]:
+            buckets[0] = merge_buckets(head, buckets[0])
+        await repo.upsert_aggregates(buckets)
+        written += len(buckets)
+    return written
+
+
+async def lock_aggregates(db: AsyncSession, instrument_id: int) -> None:
+    """Hold the instrument's bucket writer lock until the transaction ends.
+
+    Refreshes and gap-repair rebuilds read stored buckets and the watermark and write
+    them back; unserialized, the last writer drops the other's minutes. A no-op on
+    SQLite, which has a single writer.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        await db.execute(select(func.pg_advisory_xact_lock(AGG_LOCK_NAMESPACE, instrument_id)))
+
+
+async def aggregate_watermark(db: AsyncSession, instrument_id: int) -> datetime | None:
+    """Last 1m minute folded into the instrument's stored buckets; None before the first."""
+    state = await ConfigsRepository(db).get(_watermark_key(instrument_id))
+    return _utc(datetime.fromisoformat(state["ts"])) if state else None
+
+
+async def unfolded_buckets(
+    db: AsyncSession,
+    instrument_id: int,
+    timeframe: str,
+    start: datetime,
+    end: datetime,
+    max_minutes: int,
+) -> list[dict[str, Any]] | None:
+    """`timeframe` buckets in [start, end) that hold minutes past the watermark.
+
+    Stored buckets trail `ohlcv_1m` by up to OHLCV_AGG_INTERVAL_SEC; these are folded
+    from the 1m candles instead and supersede stored rows from the first one on. Empty
+    when the stored buckets are current, None when over `max_minutes` would be read.
+    """
+    watermark = await aggregate_watermark(db, instrument_id)
+    folded = _utc(start) if watermark is None else watermark + _MINUTE
+    if folded >= end:
+        return []
+    since = max(_utc(start), bucket_start(folded, AGG_TIMEFRAMES[timeframe]))
+    if end - since > max_minutes * _MINUTE:
+        return None
+    rows = await OhlcvRepository(db).fetch_1m_rows(instrument_id, since, end)
+    return aggregate_1m(instrument_id, rows, timeframe)
+
+
+async def refresh_aggregates(db: AsyncSession, instrument_id: int) -> int:
+    """Fold 1m candles newer than the instrument's watermark; returns buckets written.
+
+    Every timeframe's buckets are committed with the new watermark in one transaction,
+    so a failure part-way leaves both as they were and the next run folds the same
+    minutes into the same buckets once.
+    """
+    repo = OhlcvRepository(db)
+    configs = ConfigsRepository(db)
+    latest = await repo.latest_ts(instrument_id)
+    if latest is None:
+        return 0
+    await lock_aggregates(db, instrument_id)
+    latest = _utc(latest)
+    watermark = await aggregate_watermark(db, instrument_id)
+    if watermark is not None and latest <= watermark:
+        # Ends the transaction, releasing the lock
+        await db.commit()
+        return 0
+    if watermark is None:
+        first = await db.scalar(
+            select(OHLCV1m.ts)
+            .where(OHLCV1m.instrument_id == instrument_id)
+            .order_by(OHLCV1m.ts.asc())
+            .limit(1),
+        )
+        start = _utc(first) if first is not None else latest
+        written = await rebuild_aggregates(db, instrument_id, start, latest, through=latest)
+    else:
+        # The watermark is the last minute already folded in
+        written = await fold_new_minutes(db, instrument_id, watermark + _MINUTE, latest + _MINUTE)
+    await configs.put(_watermark_key(instrument_id), {"ts": latest.isoformat()})
+    await db.commit()
+    return written
+
+
+async def refresh_all_aggregates(
+    session_factory: async_sessionmaker[AsyncSession],
+    registry: InstrumentRegistry,
+) -> int:
+    """Refresh every registered instrument; those without candles return immediately."""
+    async with session_factory() as db:
+        written = 0
+        for inst_id in registry.ids():
+            written += await refresh_aggregates(db, inst_id)
+    if written:
+        logger.info("ohlcv_agg: refreshed %d buckets", written)
+    return written
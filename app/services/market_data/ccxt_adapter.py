@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+import time
 from datetime import UTC, datetime
 from decimal import Decimal
 from typing import Any
@@ -8,6 +10,9 @@ import ccxt.async_support as ccxt
 
 from app.core.config import settings
 
+# Page size when ccxt does not advertise the exchange's fetchOHLCV limit
+DEFAULT_OHLCV_PAGE = 1000
+
 
 def to_ws_symbol(ccxt_symbol: str) -> str:
     return ccxt_symbol.replace("/", "")
@@ -17,18 +22,60 @@ def to_ccxt_symbol(ws_symbol: str) -> str:
     return ws_symbol[:-4] + "/" + ws_symbol[-4:]
 
 
+def _precision(value: Any, mode: int) -> tuple[Decimal, int]:
+    """(step, decimal places) from a ccxt precision value in either precision mode."""
+    if value is None:
+        return Decimal(1), 0
+    if mode == ccxt.TICK_SIZE:
+        step = Decimal(str(value)).normalize()
+        return step, max(0, -int(step.as_tuple().exponent))
+    places = int(value)
+    return Decimal(10) ** -places, places
+
+
 class CcxtAdapter:
+    """One ccxt client: its HTTP session, rate limiter and market metadata.
+
+    Use `get_ccxt_adapter` rather than constructing one per call, so every caller shares
+    them; `close_ccxt_adapters` closes the pool on shutdown.
+    """
+
     def __init__(self, exchange: str = "bybit") -> None:
         klass = getattr(ccxt, exchange)
         self._client = klass(
             {"enableRateLimit": settings.ccxt_rate_limit, "options": {"defaultType": "spot"}},
         )
+        self._markets_at = 0.0
+        self._markets_lock = asyncio.Lock()
 
     async def close(self) -> None:
         await self._client.close()
 
+    @property
+    def ohlcv_page_limit(self) -> int:
+        """Most 1m candles one `fetch_ohlcv` call returns, per ccxt's exchange features."""
+        try:
+            limit = self._client.features["spot"]["fetchOHLCV"]["limit"]
+        except (AttributeError, KeyError, TypeError):
+            limit = None
+        return int(limit) if limit else DEFAULT_OHLCV_PAGE
+
+    def _markets_fresh(self) -> bool:
+        age = time.monotonic() - self._markets_at
+        return bool(self._client.markets) and age < settings.ccxt_markets_ttl_sec
+
+    async def markets(self) -> dict[str, Any]:
+        """Market metadata, loaded once and reloaded after CCXT_MARKETS_TTL_SEC."""
+        if not self._markets_fresh():
+            async with self._markets_lock:
+                # Concurrent callers wait for the one reload instead of each fetching it
+                if not self._markets_fresh():
+                    await self._client.load_markets(reload=bool(self._client.markets))
+                    self._markets_at = time.monotonic()
+        return self._client.markets
+
     async def list_instruments(self, symbols: list[str] | None = None) -> list[dict[str, Any]]:
-        markets = await self._client.load_markets()
+        markets = await self.markets()
         instruments: list[dict[str, Any]] = []
         for symbol, m in markets.items():
             if symbols and symbol not in symbols:
@@ -49,16 +96,16 @@ class CcxtAdapter:
         return await self._client.fetch_ticker(symbol)
 
     async def fetch_markets_spot(self) -> list[dict[str, Any]]:
-        markets = await self._client.load_markets()
+        markets = await self.markets()
+        mode = self._client.precisionMode
         rows: list[dict[str, Any]] = []
         for symbol, m in markets.items():
             if not m.get("spot"):
                 continue
             precision = m.get("precision", {})
-            price_scale = precision.get("price")
-            qty_scale = precision.get("amount")
-            tick_size = Decimal(10) ** Decimal(-(price_scale or 0))
-            lot_size = Decimal(10) ** Decimal(-(qty_scale or 0))
+            # Bybit reports tick sizes (0.01), not digit counts
+            tick_size, price_scale = _precision(precision.get("price"), mode)
+            lot_size, qty_scale = _precision(precision.get("amount"), mode)
             maker = Decimal(str(m.get("maker", 0))) * Decimal(10_000)
             taker = Decimal(str(m.get("taker", 0))) * Decimal(10_000)
             settlement = m.get("quote")
@@ -122,3 +169,51 @@ class CcxtAdapter:
                 },
             )
         return out
+
+    async def fetch_l2_orderbook(self, symbol: str, limit: int = 50) -> dict[str, Any]:
+        """Same shape as the stored latest book: Decimal (px, qty) levels and a UTC ts."""
+        book = await self._client.fetch_order_book(symbol, limit)
+        ts_ms = book.get("timestamp")
+        return {
+            "bids": [(Decimal(str(px)), Decimal(str(qty))) for px, qty, *_ in book["bids"][:limit]],
+            "asks": [(Decimal(str(px)), Decimal(str(qty))) for px, qty, *_ in book["asks"][:limit]],
+            "ts": datetime.fromtimestamp(ts_ms / 1000, tz=UTC) if ts_ms else datetime.now(UTC),
+        }
+
+    async def fetch_trades(
+        self,
+        symbol: str,
+        since: datetime | None = None,
+        limit: int | None = 200,
+    ) -> list[dict[str, Any]]:
+        """Recent trades newest first, shaped like the stored-trade responses."""
+        since_ms = int(since.timestamp() * 1000) if since else None
+        trades = await self._client.fetch_trades(symbol, since=since_ms, limit=limit)
+        return [
+            {
+                "ts": t["timestamp"],
+                "price": t["price"],
+                "amount": t["amount"],
+                "side": t["side"],
+                "id": t["id"],
+            }
+            for t in reversed(trades)
+        ]
+
+
+_adapters: dict[str, CcxtAdapter] = {}
+
+
+def get_ccxt_adapter(exchange: str | None = None) -> CcxtAdapter:
+    """The process-wide adapter for `exchange` (default EXCHANGE), created on first use."""
+    exchange = exchange or settings.exchange
+    adapter = _adapters.get(exchange)
+    if adapter is None:
+        adapter = _adapters[exchange] = CcxtAdapter(exchange)
+    return adapter
+
+
+async def close_ccxt_adapters() -> None:
+    adapters = list(_adapters.values())
+    _adapters.clear()
+    await asyncio.gather(*(a.close() for a in adapters), return_exceptions=True)
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import uuid
+from datetime import UTC, datetime
+
+from app.services.market_data.cache import MarketCache
+from app.services.market_data.instrument_registry import InstrumentRegistry, instrument_registry
+from app.services.market_data.write_behind import MarketDataWriters
+
+
+async def checkpoint_books(
+    cache: MarketCache,
+    writers: MarketDataWriters,
+    registry: InstrumentRegistry | None = None,
+) -> int:
+    """Persist the full local book of every synced symbol as a new checkpoint.
+
+    Deltas written afterwards carry the new checkpoint id, so rebuilding any book costs
+    one checkpoint plus at most WS_SNAPSHOT_INTERVAL_SEC worth of deltas.
+    """
+    registry = registry or instrument_registry
+    # Capture every book before the first await: a delta applied while an earlier
+    # checkpoint is enqueued would otherwise land in a later snapshot stamped before it
+    captured = []
+    for symbol, book in list(cache.orderbooks.items()):
+        inst_id = registry.get(symbol)
+        if inst_id is None or not book.synced:
+            continue
+        checkpoint_id = str(uuid.uuid4())
+        # Switch before enqueueing so no later delta can reference the previous checkpoint
+        book.checkpoint_id = checkpoint_id
+        update_id = book.update_id if book.update_id and book.update_id > 0 else None
+        captured.append((inst_id, datetime.now(UTC), book.snapshot(), checkpoint_id, update_id))
+    for inst_id, ts, snap, checkpoint_id, update_id in captured:
+        await writers.put_levels(
+            inst_id,
+            ts,
+            snap.bids,
+            snap.asks,
+            snapshot_id=checkpoint_id,
+            update_id=update_id,
+        )
+    return len(captured)
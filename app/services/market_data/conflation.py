@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Any, Literal
+
+from app.services.market_data.decoding import RawTicker
+
+if TYPE_CHECKING:
+    from app.services.market_data.orderbook import LocalOrderBook
+    from app.services.market_data.write_behind import WriteBehindQueue
+
+ConflationMode = Literal["all", "interval", "change"]
+
+
+@dataclass
+class ConflationStats:
+    offered: int = 0
+    persisted: int = 0
+    suppressed: int = 0
+
+
+class TickerConflator:
+    """Decides which ticker pushes are persisted to `ticker_rt`.
+
+    - `all`: every push is written (previous behaviour).
+    - `interval`: only the latest ticker per instrument is written every `interval_ms`.
+    - `change`: a push is written only when last, bid or ask differ from the last write.
+
+    The in-memory cache is updated by the caller for every push regardless of mode.
+    """
+
+    def __init__(
+        self,
+        sink: WriteBehindQueue[tuple[int, RawTicker]],
+        mode: ConflationMode,
+        interval_ms: int,
+    ) -> None:
+        self.mode = mode
+        self.stats = ConflationStats()
+        self._sink = sink
+        self._interval = max(interval_ms, 1) / 1000
+        self._pending: dict[int, RawTicker] = {}
+        self._last_written: dict[int, tuple[str | None, str | None, str | None]] = {}
+        self._task: asyncio.Task[None] | None = None
+        self._closing = asyncio.Event()
+
+    def start(self) -> None:
+        if self.mode == "interval" and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="ticker-conflator")
+
+    async def put(self, row: tuple[int, RawTicker]) -> None:
+        inst_id, ticker = row
+        self.stats.offered += 1
+        if self.mode == "interval":
+            if inst_id in self._pending:
+                self.stats.suppressed += 1
+            self._pending[inst_id] = ticker
+            return
+        if self.mode == "change":
+            key = (ticker.last_raw, ticker.bid_raw, ticker.ask_raw)
+            if self._last_written.get(inst_id) == key:
+                self.stats.suppressed += 1
+                return
+            self._last_written[inst_id] = key
+        self.stats.persisted += 1
+        await self._sink.put(row)
+
+    async def close(self) -> None:
+        self._closing.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self._drain()
+
+    async def _run(self) -> None:
+        while not self._closing.is_set():
+            try:
+                await asyncio.wait_for(self._closing.wait(), self._interval)
+            except TimeoutError:
+                pass
+            await self._drain()
+
+    async def _drain(self) -> None:
+        pending, self._pending = self._pending, {}
+        for inst_id, ticker in pending.items():
+            self.stats.persisted += 1
+            await self._sink.put((inst_id, ticker))
+
+
+class LatestBookPublisher:
+    """Feeds `orderbook_latest` from the in-memory books.
+
+    WS handlers only mark a book as changed; every `interval_ms` the top `depth` levels
+    of each changed, synced book are snapshotted once and queued, however many deltas
+    arrived in between.
+    """
+
+    def __init__(
+        self,
+        sink: WriteBehindQueue[dict[str, Any]],
+        depth: int,
+        interval_ms: int,
+    ) -> None:
+        self.depth = depth
+        self._sink = sink
+        self._interval = max(interval_ms, 1) / 1000
+        self._dirty: dict[int, LocalOrderBook] = {}
+        self._task: asyncio.Task[None] | None = None
+        self._closing = asyncio.Event()
+
+    def start(self) -> None:
+        if self.depth > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="orderbook-latest")
+
+    def mark(self, inst_id: int, book: LocalOrderBook) -> None:
+        if self.depth > 0:
+            self._dirty[inst_id] = book
+
+    async def close(self) -> None:
+        self._closing.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.drain()
+
+    async def _run(self) -> None:
+        while not self._closing.is_set():
+            try:
+                await asyncio.wait_for(self._closing.wait(), self._interval)
+            except TimeoutError:
+                pass
+            await self.drain()
+
+    async def drain(self) -> int:
+        dirty, self._dirty = self._dirty, {}
+        queued = 0
+        for inst_id, book in dirty.items():
+            if not book.synced:
+                continue
+            snap = book.snapshot(self.depth)
+            await self._sink.put(
+                {
+                    "instrument_id": inst_id,
+                    "ts": book.ts or datetime.now(UTC),
+                    "update_id": book.update_id if book.update_id and book.update_id > 0 else None,
+                    "bids": snap.bids,
+                    "asks": snap.asks,
+                },
+            )
+            queued += 1
+        return queued
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from functools import cached_property
+from typing import Any
+
+from app.core.config import settings
+
+try:  # Optional fast path: `pip install crypto-copilot-api[fast]`
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without the extra
+    orjson = None  # type: ignore[assignment]
+
+Decoder = Callable[[str | bytes], Any]
+
+
+def get_decoder(name: str | None = None) -> Decoder:
+    """Return the WS frame decoder selected by WS_JSON_DECODER (auto|orjson|json)."""
+    choice = name or settings.ws_json_decoder
+    if choice == "json":
+        return json.loads
+    if orjson is not None:
+        return orjson.loads
+    if choice == "orjson":
+        raise RuntimeError("WS_JSON_DECODER=orjson but orjson is not installed")
+    return json.loads
+
+
+def to_decimal(value: str | int | float | Decimal | None) -> Decimal:
+    """Convert a raw exchange number once, at the point a consumer needs arithmetic."""
+    if isinstance(value, Decimal):
+        return value
+    if value is None or value == "":
+        return Decimal(0)
+    return Decimal(value if isinstance(value, str) else str(value))
+
+
+@dataclass
+class RawTicker:
+    """Ticker kept as Bybit's raw strings; Decimal views are computed on first access.
+
+    Most pushes are overwritten before anyone reads or persists them, so they never pay
+    for Decimal parsing or the mid/spread arithmetic.
+    """
+
+    ts: datetime
+    last_raw: str | None
+    bid_raw: str | None
+    ask_raw: str | None
+
+    @cached_property
+    def last(self) -> Decimal:
+        return to_decimal(self.last_raw)
+
+    @cached_property
+    def bid(self) -> Decimal:
+        return to_decimal(self.bid_raw)
+
+    @cached_property
+    def ask(self) -> Decimal:
+        return to_decimal(self.ask_raw)
+
+    @cached_property
+    def mid(self) -> Decimal:
+        bid, ask = self.bid, self.ask
+        return (bid + ask) / Decimal(2) if bid and ask else self.last
+
+    @cached_property
+    def spread_bps(self) -> Decimal:
+        bid, ask, mid = self.bid, self.ask, self.mid
+        return (ask - bid) / mid * Decimal(10_000) if bid and ask and mid else Decimal(0)
+
+    def to_row(self) -> dict[str, Any]:
+        return {
+            "ts": self.ts,
+            "last": self.last,
+            "bid": self.bid,
+            "ask": self.ask,
+            "mid": self.mid,
+            "spread_bps": self.spread_bps,
+            "day_vol_quote": None,
+        }
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import csv
+import enum
+import io
+import json
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Literal
+
+from app.db.rows import epoch_ms
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES: dict[str, str] = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _value(v: Any) -> Any:
+    if isinstance(v, datetime):
+        return epoch_ms(v)
+    if isinstance(v, enum.Enum):
+        return v.value
+    if isinstance(v, Decimal):
+        # Exact as stored (floats would round 38-digit numerics), minus the scale padding
+        return f"{v.normalize():f}"
+    return v
+
+
+async def encode_chunks(
+    parts: AsyncIterator[Sequence[Sequence[Any]]],
+    names: Sequence[str],
+    fmt: ExportFormat,
+) -> AsyncIterator[bytes]:
+    """Encode row chunks as NDJSON objects or CSV lines (with a header), one bytes chunk each."""
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow(names)
+        yield buf.getvalue().encode()
+        async for part in parts:
+            buf.seek(0)
+            buf.truncate()
+            writer.writerows([_value(v) for v in row] for row in part)
+            yield buf.getvalue().encode()
+        return
+    async for part in parts:
+        lines = [
+            json.dumps(
+                {n: _value(v) for n, v in zip(names, row, strict=False)}, separators=(",", ":")
+            )
+            for row in part
+        ]
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.logging import get_logger
+from app.db.repositories.coverage import MINUTE, CoverageRepository, Range
+from app.db.repositories.ohlcv import OhlcvRepository
+from app.services.market_data.candles import (
+    AGG_TIMEFRAMES,
+    aggregate_watermark,
+    bucket_start,
+    lock_aggregates,
+    rebuild_aggregates,
+)
+
+if TYPE_CHECKING:
+    from app.services.market_data.ccxt_adapter import CcxtAdapter
+    from app.services.market_data.instrument_registry import InstrumentRegistry
+
+logger = get_logger(__name__)
+
+
+def last_closed_minute(now: datetime | None = None) -> datetime:
+    """Exclusive end for repairs: the running minute's candle is still changing."""
+    now = now or datetime.now(UTC)
+    return now.replace(second=0, microsecond=0)
+
+
+def candle_window(
+    timeframe: str,
+    since: datetime | None,
+    limit: int,
+    now: datetime | None = None,
+) -> Range:
+    """[start, end) 1m range behind `limit` candles of `timeframe` from `since`.
+
+    Without `since` the range ends at the last closed minute, so the newest (possibly
+    partial) bucket is included.
+    """
+    width = 1 if timeframe == "1m" else AGG_TIMEFRAMES[timeframe]
+    end = last_closed_minute(now)
+    if since is not None:
+        start = bucket_start(since, width)
+        return start, min(start + limit * width * MINUTE, end)
+    return bucket_start(end - MINUTE, width) - (limit - 1) * width * MINUTE, end
+
+
+async def find_gaps(
+    db: AsyncSession,
+    instrument_id: int,
+    start: datetime,
+    end: datetime,
+) -> list[Range]:
+    """Missing [start, end) 1m ranges in the window, from the coverage index only."""
+    return await CoverageRepository(db).missing(
+        instrument_id, start, min(end, last_closed_minute())
+    )
+
+
+async def repair_gaps(
+    db: AsyncSession,
+    adapter: CcxtAdapter,
+    instrument_id: int,
+    symbol: str,
+    start: datetime,
+    end: datetime,
+) -> int:
+    """Fetch only the missing minutes in [start, end) from the exchange; returns candles stored.
+
+    Coverage advances to the last candle returned, so minutes the exchange has no candle
+    for (before listing, halts) are marked only once a later candle proves them empty.
+    An empty page leaves the rest of the gap open to be asked for again.
+    """
+    repo = OhlcvRepository(db)
+    coverage = CoverageRepository(db)
+    stored = 0
+    for gap_start, gap_end in await find_gaps(db, instrument_id, start, end):
+        since = gap_start
+        gap_stored = 0
+        while since < gap_end:
+            want = min(adapter.ohlcv_page_limit, int((gap_end - since) / MINUTE))
+            fetched = await adapter.fetch_ohlcv(symbol, "1m", since, want)
+            rows = [r for r in fetched if since <= r["ts"] < gap_end]
+            if rows:
+                await repo.insert_ohlcv_rows(instrument_id, rows)
+                gap_stored += len(rows)
+            if not fetched or fetched[-1]["ts"] < since:
+                break
+            upto = min(gap_end, fetched[-1]["ts"] + MINUTE)
+            await coverage.add(instrument_id, [(since, upto)])
+            await db.commit()
+            since = upto
+        if gap_stored:
+            # Serialized with refreshes, which read and write the same open buckets
+            await lock_aggregates(db, instrument_id)
+            watermark = await aggregate_watermark(db, instrument_id)
+            if watermark is not None and gap_start <= watermark:
+                # Repaired minutes behind the aggregate watermark are not folded in by
+                # the next refresh; later ones are, so their buckets are left to it
+                last = min(gap_end - MINUTE, watermark)
+                await rebuild_aggregates(db, instrument_id, gap_start, last, through=watermark)
+            await db.commit()
+        stored += gap_stored
+    return stored
+
+
+async def repair_all(
+    session_factory: async_sessionmaker[AsyncSession],
+    adapter: CcxtAdapter,
+    registry: InstrumentRegistry,
+    symbols: list[str],
+    lookback: timedelta,
+) -> int:
+    """Repair every symbol's gaps over the trailing `lookback`; returns candles stored."""
+    end = last_closed_minute()
+    stored = 0
+    async with session_factory() as db:
+        for symbol in symbols:
+            inst_id = registry.get(symbol)
+            if inst_id is None:
+                continue
+            try:
+                stored += await repair_gaps(db, adapter, inst_id, symbol, end - lookback, end)
+            except Exception:
+                await db.rollback()
+                logger.exception("ohlcv gap repair failed for %s", symbol)
+    if stored:
+        logger.info("ohlcv gap repair: stored %d candles", stored)
+    return stored
+
+
+async def seed_coverage(
+    session_factory: async_sessionmaker[AsyncSession],
+    registry: InstrumentRegistry,
+) -> int:
+    """Index stored candles of instruments without coverage rows; returns instruments seeded.
+
+    Databases filled before coverage tracking (SQLite; Postgres is seeded by its migration)
+    would otherwise have every stored minute refetched as a gap.
+    """
+    seeded = 0
+    async with session_factory() as db:
+        coverage = CoverageRepository(db)
+        for inst_id in registry.ids():
+            if await coverage.is_empty(inst_id) and await coverage.rebuild(inst_id):
+                seeded += 1
+    if seeded:
+        logger.info("ohlcv coverage seeded for %d instruments", seeded)
+    return seeded
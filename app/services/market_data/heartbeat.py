@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.repositories.configs import ConfigsRepository
+
+# The ingest process publishes its status here so API workers in other processes can
+# report it from `/ready`
+HEARTBEAT_KEY = "ingest_heartbeat"
+
+
+async def publish_heartbeat(db: AsyncSession, status: dict[str, Any] | None) -> None:
+    """Store the ingester's current status with the time it was taken."""
+    await ConfigsRepository(db).put(
+        HEARTBEAT_KEY,
+        {"at": datetime.now(UTC).isoformat(), "status": status},
+    )
+    await db.commit()
+
+
+async def read_heartbeat(db: AsyncSession, max_age_sec: float) -> dict[str, Any] | None:
+    """Last published status plus its age; None when no ingester ever published.
+
+    `stale` is set once the heartbeat is older than `max_age_sec`, i.e. the ingester
+    (or every standby) is down or stuck.
+    """
+    beat = await ConfigsRepository(db).get(HEARTBEAT_KEY)
+    if beat is None:
+        return None
+    age = (datetime.now(UTC) - datetime.fromisoformat(beat["at"])).total_seconds()
+    return {**(beat["status"] or {}), "heartbeat_age_s": round(age, 3), "stale": age > max_age_sec}
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import Instrument
+
+
+class InstrumentRegistry:
+    """Process-wide symbol -> instrument_id map for the ingestion hot path.
+
+    Loaded after the startup instrument sync and reloaded by every periodic sync
+    (app.workers.scheduler.sync_instruments), so WS handlers can resolve a symbol
+    without a DB round trip.
+    """
+
+    def __init__(self, venue: str | None = None) -> None:
+        self._venue = venue or settings.exchange
+        self._ids: dict[str, int] = {}
+        self._scales: dict[int, tuple[int | None, int | None]] = {}
+
+    def get(self, symbol: str) -> int | None:
+        return self._ids.get(symbol)
+
+    def scales(self, inst_id: int) -> tuple[int | None, int | None]:
+        """(price_scale, qty_scale) from the instruments table; None when unknown."""
+        return self._scales.get(inst_id, (None, None))
+
+    def symbols(self) -> list[str]:
+        return list(self._ids)
+
+    def ids(self) -> list[int]:
+        return list(self._ids.values())
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    async def refresh(self, db: AsyncSession) -> None:
+        res = await db.execute(
+            select(
+                Instrument.symbol,
+                Instrument.id,
+                Instrument.price_scale,
+                Instrument.qty_scale,
+            ).where(Instrument.venue == self._venue),
+        )
+        rows = res.all()
+        # Swap whole mappings so concurrent readers never see a half-built dict
+        self._ids = {symbol: inst_id for symbol, inst_id, _, _ in rows}
+        self._scales = {inst_id: (px, qty) for _, inst_id, px, qty in rows}
+
+
+instrument_registry = InstrumentRegistry()
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+
+Level = tuple[Decimal, Decimal]
+
+
+@dataclass
+class OrderbookSnapshot:
+    bids: list[Level]  # price, qty
+    asks: list[Level]
+
+
+class OrderBookGap(Exception):
+    def __init__(self, symbol: str, expected: int, received: int) -> None:
+        super().__init__(f"{symbol}: expected update {expected}, got {received}")
+        self.symbol = symbol
+        self.expected = expected
+        self.received = received
+
+
+class BookSide:
+    """Price levels for one side, kept sorted so the best level is an index lookup.
+
+    Lookups are a dict hit and the insertion point is found by bisection (O(log n)), but
+    inserting or removing a price shifts the list, an O(n) memmove. That is deliberate:
+    at exchange depths (50-500 levels) the memmove is cheaper than the per-level Python
+    overhead of an O(log n) ordered map or lazy-deletion heap, and stays ahead at 5000
+    (see scripts/bench_orderbook.py).
+    """
+
+    def __init__(self, *, descending: bool) -> None:
+        self._descending = descending
+        self._prices: list[Decimal] = []  # always ascending
+        self._qty: dict[Decimal, Decimal] = {}
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    def clear(self) -> None:
+        self._prices.clear()
+        self._qty.clear()
+
+    def set(self, px: Decimal, qty: Decimal) -> None:
+        if not qty:
+            if self._qty.pop(px, None) is not None:
+                del self._prices[bisect_left(self._prices, px)]
+            return
+        if px not in self._qty:
+            insort(self._prices, px)
+        self._qty[px] = qty
+
+    def best(self) -> Level | None:
+        if not self._prices:
+            return None
+        px = self._prices[-1] if self._descending else self._prices[0]
+        return px, self._qty[px]
+
+    def levels(self, depth: int | None = None) -> list[Level]:
+        prices = reversed(self._prices) if self._descending else iter(self._prices)
+        out: list[Level] = []
+        for px in prices:
+            if depth is not None and len(out) >= depth:
+                break
+            out.append((px, self._qty[px]))
+        return out
+
+
+class LocalOrderBook:
+    """Per-symbol L2 book maintained from Bybit `orderbook.{depth}` snapshots and deltas.
+
+    Deltas must arrive with consecutive `u` update ids. A gap raises `OrderBookGap` and
+    leaves the book unsynced, ignoring further deltas until the next snapshot.
+    """
+
+    def __init__(self, symbol: str) -> None:
+        self.symbol = symbol
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.update_id: int | None = None
+        self.ts: datetime | None = None
+        # Id of the last persisted snapshot/checkpoint; persisted deltas reference it
+        self.checkpoint_id: str | None = None
+
+    @property
+    def synced(self) -> bool:
+        return self.update_id is not None
+
+    def invalidate(self) -> None:
+        """Mark the book unsynced; deltas are ignored until the next snapshot."""
+        self.update_id = None
+
+    def apply_snapshot(
+        self,
+        bids: Iterable[Level],
+        asks: Iterable[Level],
+        update_id: int | None,
+        ts: datetime | None = None,
+    ) -> None:
+        self.bids.clear()
+        self.asks.clear()
+        for px, qty in bids:
+            self.bids.set(px, qty)
+        for px, qty in asks:
+            self.asks.set(px, qty)
+        # A snapshot without an id still resyncs the book; the next delta sets the baseline
+        self.update_id = update_id if update_id is not None else -1
+        self.ts = ts
+
+    def apply_delta(
+        self,
+        bids: Iterable[Level],
+        asks: Iterable[Level],
+        update_id: int | None,
+        ts: datetime | None = None,
+    ) -> bool:
+        """Apply a delta in place; returns False when it was ignored (stale or unsynced)."""
+        if self.update_id is None:
+            return False
+        if update_id is not None and self.update_id >= 0:
+            if update_id <= self.update_id:
+                return False
+            if update_id != self.update_id + 1:
+                expected = self.update_id + 1
+                self.update_id = None
+                raise OrderBookGap(self.symbol, expected, update_id)
+        for px, qty in bids:
+            self.bids.set(px, qty)
+        for px, qty in asks:
+            self.asks.set(px, qty)
+        if update_id is not None:
+            self.update_id = update_id
+        self.ts = ts
+        return True
+
+    def best_bid(self) -> Level | None:
+        return self.bids.best()
+
+    def best_ask(self) -> Level | None:
+        return self.asks.best()
+
+    def snapshot(self, depth: int | None = None) -> OrderbookSnapshot:
+        return OrderbookSnapshot(bids=self.bids.levels(depth), asks=self.asks.levels(depth))
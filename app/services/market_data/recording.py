@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import heapq
+import itertools
+import time
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import IO, TYPE_CHECKING
+
+from app.core.logging import get_logger
+
+if TYPE_CHECKING:
+    from app.services.market_data.ws_bybit import BybitWs
+
+logger = get_logger(__name__)
+
+# Segment line format: "<recv_ns>\t<raw frame>\n"; frames are single-line JSON
+SEGMENT_SUFFIX = ".ndjson.gz"
+
+
+class FrameRecorder:
+    """Appends raw WS frames with their receive time to rotating gzip segments.
+
+    `write` only buffers the line; full batches (or whatever is buffered after
+    `flush_interval` seconds) are compressed and written in a worker thread, so the
+    shard reader never blocks on gzip or disk. A segment is closed after
+    `segment_frames` frames so a crash loses at most the tail of one file.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        prefix: str,
+        segment_frames: int = 100_000,
+        *,
+        flush_frames: int = 1_000,
+        flush_interval: float = 1.0,
+        max_pending_batches: int = 64,
+    ) -> None:
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.segment_frames = max(1, segment_frames)
+        self.flush_frames = max(1, flush_frames)
+        self.flush_interval = flush_interval
+        self.frames = 0
+        self.segments = 0
+        # Frames discarded because the writer thread fell behind
+        self.dropped = 0
+        self._fh: IO[str] | None = None
+        self._in_segment = 0
+        self._buffer: list[str] = []
+        self._batches: asyncio.Queue[list[str] | None] = asyncio.Queue(
+            maxsize=max_pending_batches,
+        )
+        self._task: asyncio.Task[None] | None = None
+
+    def write(self, raw: str | bytes, recv_ns: int | None = None) -> None:
+        text = raw.decode() if isinstance(raw, bytes) else raw
+        self._buffer.append(f"{recv_ns or time.time_ns()}\t{text}\n")
+        self.frames += 1
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._drain())
+        if len(self._buffer) >= self.flush_frames:
+            self._hand_off()
+
+    def _hand_off(self) -> None:
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        try:
+            self._batches.put_nowait(batch)
+        except asyncio.QueueFull:
+            # Recording is diagnostics; never let it stall ingestion
+            self.dropped += len(batch)
+            logger.warning("WS recorder %s behind, dropped %d frames", self.prefix, len(batch))
+
+    async def _drain(self) -> None:
+        while True:
+            try:
+                batch = await asyncio.wait_for(self._batches.get(), self.flush_interval)
+            except TimeoutError:
+                # Quiet market: flush a partial batch so the files stay current
+                self._hand_off()
+                continue
+            if batch is None:
+                return
+            await asyncio.to_thread(self._write_lines, batch)
+
+    def _open(self) -> IO[str]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%fZ")
+        path = self.directory / f"{self.prefix}-{stamp}-{self.segments:05d}{SEGMENT_SUFFIX}"
+        self.segments += 1
+        logger.info("recording WS frames to %s", path)
+        self._in_segment = 0
+        return gzip.open(path, "at", encoding="utf-8", compresslevel=5)
+
+    def _write_lines(self, lines: list[str]) -> None:
+        # Runs in a worker thread, one batch at a time
+        for line in lines:
+            if self._fh is None:
+                self._fh = self._open()
+            self._fh.write(line)
+            self._in_segment += 1
+            if self._in_segment >= self.segment_frames:
+                self._close_segment()
+
+    def _close_segment(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    async def close(self) -> None:
+        """Write everything buffered and close the current segment."""
+        self._hand_off()
+        if self._task is not None:
+            await self._batches.put(None)
+            await self._task
+            self._task = None
+        await asyncio.to_thread(self._close_segment)
+
+
+def _iter_file(path: Path) -> Iterator[tuple[int, str]]:
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            head, sep, rest = line.partition("\t")
+            if sep and head.isdigit():
+                yield int(head), rest
+            else:
+                yield 0, line
+
+
+def _recorder_prefix(path: Path) -> str:
+    # "<prefix>-<stamp>-<n>.ndjson.gz"; other files are their own stream
+    name = path.name.removesuffix(SEGMENT_SUFFIX)
+    parts = name.rsplit("-", 2)
+    return parts[0] if name != path.name and len(parts) == 3 else str(path)
+
+
+def iter_segments(paths: Iterable[str | Path]) -> Iterator[tuple[int, str]]:
+    """Yield (recv_ns, raw) from segment files, merged across recorders by receive time.
+
+    Each recorder's (shard's) segments are read in name order and the shards are
+    interleaved with `heapq.merge`, so one file per shard is open at a time. Lines
+    without a receive-time prefix (plain frame dumps) get recv_ns 0, which replays
+    them back to back.
+    """
+    streams: dict[str, list[Path]] = {}
+    for path in paths:
+        p = Path(path)
+        streams.setdefault(_recorder_prefix(p), []).append(p)
+    chains = [
+        itertools.chain.from_iterable(_iter_file(p) for p in sorted(files))
+        for files in streams.values()
+    ]
+    yield from heapq.merge(*chains, key=lambda frame: frame[0])
+
+
+def segment_paths(directory: str | Path) -> list[Path]:
+    return sorted(Path(directory).glob(f"*{SEGMENT_SUFFIX}"))
+
+
+async def replay(
+    ws: BybitWs,
+    frames: Iterable[tuple[int, str]],
+    speed: float | None = 1.0,
+) -> int:
+    """Feed recorded frames through `ws.handle_frame` without a network.
+
+    `speed` 1.0 keeps the recorded pacing, N compresses it N times and None or 0
+    replays as fast as the handlers allow. Returns the number of frames handled.
+    """
+    loop = asyncio.get_running_loop()
+    start_wall: float | None = None
+    first_ns = 0
+    n = 0
+    for recv_ns, raw in frames:
+        if speed and recv_ns:
+            if start_wall is None:
+                start_wall, first_ns = loop.time(), recv_ns
+            delay = start_wall + (recv_ns - first_ns) / 1e9 / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        # Lag metrics stay meaningful when replayed: they are measured against recording time
+        await ws.handle_frame(raw, received_wall=recv_ns / 1e9 if recv_ns else None)
+        n += 1
+    return n
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Generic, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import DB_DROPPED_ROWS, DB_FLUSH_ROWS, DB_FLUSH_SECONDS
+from app.db.models import OBSide
+from app.db.repositories.orderbook import OrderBookRepository
+from app.db.repositories.tickers import TickersRepository
+from app.db.repositories.trades import TradesRepository
+from app.services.market_data.conflation import LatestBookPublisher, TickerConflator
+from app.services.market_data.decoding import RawTicker, to_decimal
+from app.services.market_data.instrument_registry import instrument_registry
+
+T = TypeVar("T")
+FlushFn = Callable[[AsyncSession, list[T]], Awaitable[None]]
+
+logger = get_logger(__name__)
+
+_STOP: Any = object()
+
+
+@dataclass
+class WriterStats:
+    enqueued: int = 0
+    written: int = 0
+    dropped: int = 0
+    flushes: int = 0
+    failed_flushes: int = 0
+    last_flush_ms: float = 0.0
+
+
+class WriteBehindQueue(Generic[T]):
+    """Bounded queue that persists rows in multi-row batches off the WS reader path.
+
+    A batch is flushed when it reaches `max_rows` or when the oldest row has waited
+    `max_delay_ms`. When the queue is full, `put` either waits (backpressure) or drops
+    the row and counts it, depending on `drop_when_full`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        session_factory: async_sessionmaker[AsyncSession],
+        flush_fn: FlushFn[T],
+        *,
+        max_rows: int,
+        max_delay_ms: int,
+        max_queue: int,
+        drop_when_full: bool = False,
+    ) -> None:
+        self.name = name
+        self.stats = WriterStats()
+        self._session_factory = session_factory
+        self._flush_fn = flush_fn
+        self._max_rows = max(1, max_rows)
+        self._max_delay = max_delay_ms / 1000
+        self._drop_when_full = drop_when_full
+        self._queue: asyncio.Queue[T] = asyncio.Queue(maxsize=max_queue)
+        self._task: asyncio.Task[None] | None = None
+        self._closed = False
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"write-behind:{self.name}")
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    async def put(self, row: T) -> None:
+        if self._closed:
+            self._drop(1)
+            return
+        if self._drop_when_full:
+            try:
+                self._queue.put_nowait(row)
+            except asyncio.QueueFull:
+                self._drop(1)
+                return
+        else:
+            await self._queue.put(row)
+        self.stats.enqueued += 1
+
+    async def put_many(self, rows: list[T]) -> None:
+        for row in rows:
+            await self.put(row)
+
+    async def close(self) -> None:
+        """Stop accepting rows and flush everything already queued."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._task is None:
+            # Never started: drain synchronously so nothing queued is lost
+            batch: list[T] = []
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                if len(batch) >= self._max_rows:
+                    await self._flush(batch)
+                    batch = []
+            if batch:
+                await self._flush(batch)
+            return
+        await self._queue.put(_STOP)
+        await self._task
+
+    def _drop(self, n: int) -> None:
+        self.stats.dropped += n
+        DB_DROPPED_ROWS.inc(self.name, amount=n)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = loop.time() + self._max_delay
+            while len(batch) < self._max_rows:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except TimeoutError:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[T]) -> None:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            async with self._session_factory() as db:
+                await self._flush_fn(db, batch)
+        except Exception:
+            self.stats.failed_flushes += 1
+            self._drop(len(batch))
+            logger.exception("write-behind flush failed for %s (%d rows)", self.name, len(batch))
+            return
+        self.stats.flushes += 1
+        self.stats.written += len(batch)
+        elapsed = loop.time() - started
+        self.stats.last_flush_ms = elapsed * 1000
+        DB_FLUSH_SECONDS.observe(self.name, value=elapsed)
+        DB_FLUSH_ROWS.inc(self.name, amount=len(batch))
+
+
+# WS handlers enqueue raw exchange strings; they become Decimals here, once per batch
+
+
+async def _flush_tickers(db: AsyncSession, rows: list[tuple[int, RawTicker]]) -> None:
+    await TickersRepository(db).insert_tickers_batch(
+        [{**ticker.to_row(), "instrument_id": inst_id} for inst_id, ticker in rows],
+    )
+
+
+async def _flush_orderbook(db: AsyncSession, rows: list[dict[str, Any]]) -> None:
+    await OrderBookRepository(db).write_levels_batch(
+        [{**r, "px": to_decimal(r["px"]), "qty": to_decimal(r["qty"])} for r in rows],
+    )
+
+
+async def _flush_orderbook_packed(db: AsyncSession, rows: list[dict[str, Any]]) -> None:
+    # Instrument scales are the floor; the repository widens them if a level needs more
+    packed = []
+    for r in rows:
+        price_scale, qty_scale = instrument_registry.scales(r["instrument_id"])
+        packed.append({**r, "price_scale": price_scale, "qty_scale": qty_scale})
+    await OrderBookRepository(db, storage_mode="packed").write_packed_batch(packed)
+
+
+async def _flush_orderbook_latest(db: AsyncSession, rows: list[dict[str, Any]]) -> None:
+    await OrderBookRepository(db).upsert_latest_batch(rows)
+
+
+async def _flush_trades(db: AsyncSession, rows: list[dict[str, Any]]) -> None:
+    await TradesRepository(db).insert_trades_batch(
+        [{**r, "px": to_decimal(r["px"]), "qty": to_decimal(r["qty"])} for r in rows],
+    )
+
+
+@dataclass
+class MarketDataWriters:
+    tickers: WriteBehindQueue[tuple[int, RawTicker]]
+    orderbook: WriteBehindQueue[dict[str, Any]]
+    trades: WriteBehindQueue[dict[str, Any]]
+    orderbook_latest: WriteBehindQueue[dict[str, Any]]
+    # Ticker pushes go through the conflator, which feeds `tickers`
+    ticker_conflator: TickerConflator
+    # Changed books are snapshotted on an interval into `orderbook_latest`
+    book_publisher: LatestBookPublisher
+    # OB_STORAGE_MODE: "rows" queues one item per level, "packed" one item per message
+    ob_storage_mode: str = "rows"
+
+    @classmethod
+    def from_settings(cls, session_factory: async_sessionmaker[AsyncSession]) -> MarketDataWriters:
+        def make(name: str, flush_fn: FlushFn[Any]) -> WriteBehindQueue[Any]:
+            return WriteBehindQueue(
+                name,
+                session_factory,
+                flush_fn,
+                max_rows=settings.ws_write_batch_rows,
+                max_delay_ms=settings.ws_write_flush_ms,
+                max_queue=settings.ws_write_queue_max,
+                drop_when_full=settings.ws_write_overflow == "drop",
+            )
+
+        tickers = make("tickers", _flush_tickers)
+        orderbook_latest = make("orderbook_latest", _flush_orderbook_latest)
+        packed = settings.ob_storage_mode == "packed"
+        return cls(
+            tickers=tickers,
+            orderbook=make("orderbook", _flush_orderbook_packed if packed else _flush_orderbook),
+            trades=make("trades", _flush_trades),
+            orderbook_latest=orderbook_latest,
+            ticker_conflator=TickerConflator(
+                tickers,
+                settings.ticker_persist_mode,
+                settings.ticker_conflate_ms,
+            ),
+            book_publisher=LatestBookPublisher(
+                orderbook_latest,
+                settings.ob_latest_depth,
+                settings.ob_latest_interval_ms,
+            ),
+            ob_storage_mode=settings.ob_storage_mode,
+        )
+
+    async def put_levels(
+        self,
+        inst_id: int,
+        ts: datetime,
+        bids: Sequence[Sequence[Any]],
+        asks: Sequence[Sequence[Any]],
+        *,
+        snapshot_id: str | None = None,
+        update_id: int | None = None,
+        checkpoint_id: str | None = None,
+    ) -> None:
+        """Enqueue one `orderbook_l2` row per level, or one packed row for the whole message.
+
+        px/qty may be raw strings or Decimals.
+        """
+        if self.ob_storage_mode == "packed":
+            await self.orderbook.put(
+                {
+                    "instrument_id": inst_id,
+                    "ts": ts,
+                    "bids": bids,
+                    "asks": asks,
+                    "snapshot_id": snapshot_id,
+                    "update_id": update_id,
+                    "checkpoint_id": checkpoint_id,
+                },
+            )
+            return
+        if snapshot_id is not None and not bids and not asks:
+            # An empty book still needs a row carrying its snapshot id, or later deltas
+            # would reference a checkpoint that does not exist; qty 0 is a removal on replay
+            bids = [("0", "0")]
+        for side, levels in ((OBSide.bid, bids), (OBSide.ask, asks)):
+            for px, qty in levels:
+                await self.orderbook.put(
+                    {
+                        "instrument_id": inst_id,
+                        "ts": ts,
+                        "side": side,
+                        "px": px,
+                        "qty": qty,
+                        "snapshot_id": snapshot_id,
+                        "update_id": update_id,
+                        "checkpoint_id": checkpoint_id,
+                    },
+                )
+
+    def all(self) -> list[WriteBehindQueue[Any]]:
+        return [self.tickers, self.orderbook, self.trades, self.orderbook_latest]
+
+    def start(self) -> None:
+        for w in self.all():
+            w.start()
+        self.ticker_conflator.start()
+        self.book_publisher.start()
+
+    async def close(self) -> None:
+        # Conflated tickers and books still pending must reach their queues before flushing
+        await self.ticker_conflator.close()
+        await self.book_publisher.close()
+        await asyncio.gather(*(w.close() for w in self.all()))
@@ -2,7 +2,11 @@ from __future__ import annotations
 
 import asyncio
 import json
+import math
+import time
 import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
 from datetime import UTC, datetime
 from decimal import Decimal
 from typing import Any
@@ -10,165 +14,351 @@ from typing import Any
 import websockets
 
 from app.core.config import settings
-from app.db.repositories.orderbook import OrderBookRepository
-from app.db.repositories.tickers import TickersRepository
-from app.db.repositories.trades import TradesRepository
-from app.services.market_data.cache import MarketCache, OrderbookSnapshot
+from app.core.logging import get_logger
+from app.core.metrics import (
+    WS_HANDLER_ERRORS,
+    WS_HANDLER_SECONDS,
+    WS_INGEST_LAG_SECONDS,
+    WS_MESSAGES,
+    WS_QUEUE_DEPTH,
+    WS_RECONNECTS,
+)
+from app.services.market_data.cache import MarketCache
 from app.services.market_data.ccxt_adapter import to_ccxt_symbol
+from app.services.market_data.decoding import RawTicker, get_decoder
+from app.services.market_data.instrument_registry import InstrumentRegistry, instrument_registry
+from app.services.market_data.orderbook import OrderBookGap
+from app.services.market_data.recording import FrameRecorder
+from app.services.market_data.write_behind import MarketDataWriters
+
+# Bybit rejects subscribe requests with more than 10 args on the spot stream
+_MAX_ARGS_PER_SUBSCRIBE = 10
+
+_STOP: Any = object()
+
+logger = get_logger(__name__)
+
+
+def _levels(raw: list[list[str]]) -> list[tuple[Decimal, Decimal]]:
+    return [(Decimal(px), Decimal(qty)) for px, qty in raw]
+
+
+def topics_for(symbols: list[str], depth: int) -> list[str]:
+    ws_symbols = [s.replace("/", "") for s in symbols]
+    return (
+        [f"tickers.{s}" for s in ws_symbols]
+        + [f"orderbook.{depth}.{s}" for s in ws_symbols]
+        + [f"publicTrade.{s}" for s in ws_symbols]
+    )
+
+
+def topic_labels(topic: str) -> tuple[str, str]:
+    """("orderbook", "BTCUSDT") for "orderbook.50.BTCUSDT"; the metric labels of a frame."""
+    kind, _, rest = topic.partition(".")
+    return kind, rest.rsplit(".", 1)[-1]
+
+
+def exchange_ts_ms(msg: dict[str, Any]) -> int | None:
+    """Exchange event time of a frame: envelope `ts`, else the first trade's `T`."""
+    ts = msg.get("ts")
+    if ts is None:
+        data = msg.get("data")
+        if isinstance(data, list) and data and isinstance(data[0], dict):
+            ts = data[0].get("T")
+    try:
+        return int(ts) if ts is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def shard_symbols(symbols: list[str], shards: int | None = None) -> list[list[str]]:
+    """Spread symbols round-robin over WS_SHARDS connections.
+
+    With WS_SHARDS=0 the shard count follows WS_SYMBOLS_PER_SHARD, so connections grow
+    with the tracked universe.
+    """
+    if not symbols:
+        return []
+    n = shards if shards is not None else settings.ws_shards
+    if n <= 0:
+        n = math.ceil(len(symbols) / max(1, settings.ws_symbols_per_shard))
+    n = min(n, len(symbols))
+    return [symbols[i::n] for i in range(n)]
+
+
+@dataclass
+class ShardStats:
+    shard_id: int
+    symbols: int
+    frames: int = 0
+    handler_errors: int = 0
+    reconnects: int = 0
+    resyncs: int = 0
+    queue_depth: int = 0
+    last_queue_lag_ms: float = 0.0
+    max_queue_lag_ms: float = 0.0
+    # Exchange event time to local receive time of the last frame that carried one
+    last_ingest_lag_ms: float = 0.0
+    last_frame_at: datetime | None = None
 
 
 class BybitWs:
-    def __init__(self, cache: MarketCache) -> None:
+    """One public WS connection (shard) carrying tickers, order book and trades topics.
+
+    A reader task only receives frames and hands them to a bounded queue; a worker task
+    decodes them and routes them to a handler by topic prefix. A disconnect triggers a
+    single reconnect that resubscribes every topic and resyncs the shard's books.
+    """
+
+    def __init__(
+        self,
+        cache: MarketCache,
+        writers: MarketDataWriters,
+        registry: InstrumentRegistry | None = None,
+        *,
+        shard_id: int = 0,
+        recorder: FrameRecorder | None = None,
+    ) -> None:
         self._cache = cache
+        self._writers = writers
+        self._registry = registry or instrument_registry
         self._closing = asyncio.Event()
+        self._decode = get_decoder()
+        self._ws: Any = None
+        self._recorder = recorder
+        # (monotonic receive time, wall-clock receive time, raw frame)
+        self._frames: asyncio.Queue[tuple[float, float, Any]] = asyncio.Queue(
+            maxsize=settings.ws_shard_queue_max,
+        )
+        self.stats = ShardStats(shard_id=shard_id, symbols=0)
+        self._handlers: dict[str, Callable[[dict[str, Any]], Awaitable[None]]] = {
+            "tickers": self._on_ticker,
+            "orderbook": self._on_orderbook,
+            "publicTrade": self._on_trade,
+        }
 
     async def _connect(self):
         return await websockets.connect(settings.ws_public_url, ping_interval=20, ping_timeout=20)
 
-    async def _run(self, topics: list[str], handler) -> None:
+    async def start(self, symbols: list[str], depth: int) -> None:
+        self.stats.symbols = len(symbols)
+        worker = asyncio.create_task(
+            self._work(),
+            name=f"bybit-ws-worker:{self.stats.shard_id}",
+        )
+        try:
+            await self._run(topics_for(symbols, depth), symbols)
+        finally:
+            await self._frames.put((0.0, 0.0, _STOP))
+            await worker
+            if self._recorder is not None:
+                await self._recorder.close()
+
+    async def _run(self, topics: list[str], symbols: list[str]) -> None:
         backoff = 1
+        loop = asyncio.get_running_loop()
         while not self._closing.is_set():
             try:
                 async with await self._connect() as ws:
-                    await ws.send(json.dumps({"op": "subscribe", "args": topics}))
+                    self._ws = ws
+                    # Deltas from the previous connection cannot be chained onto new ones
+                    for symbol in symbols:
+                        self._cache.book(symbol).invalidate()
+                    for i in range(0, len(topics), _MAX_ARGS_PER_SUBSCRIBE):
+                        args = topics[i : i + _MAX_ARGS_PER_SUBSCRIBE]
+                        await ws.send(json.dumps({"op": "subscribe", "args": args}))
                     async for raw in ws:
-                        msg = json.loads(raw)
-                        await handler(msg)
+                        received_wall = time.time()
+                        if self._recorder is not None:
+                            self._recorder.write(raw, int(received_wall * 1e9))
+                        await self._frames.put((loop.time(), received_wall, raw))
+                        self.stats.frames += 1
                         if self._closing.is_set():
                             break
                 backoff = 1
             except Exception:
+                if self._closing.is_set():
+                    break
+                self.stats.reconnects += 1
+                WS_RECONNECTS.inc(str(self.stats.shard_id))
+                logger.warning(
+                    "shard %d connection lost, reconnecting in %ds",
+                    self.stats.shard_id,
+                    min(backoff, 30),
+                    exc_info=True,
+                )
                 await asyncio.sleep(min(backoff, 30))
                 backoff *= 2
+            finally:
+                self._ws = None
+
+    async def _work(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            received, received_wall, raw = await self._frames.get()
+            if raw is _STOP:
+                return
+            lag_ms = (loop.time() - received) * 1000
+            self.stats.last_queue_lag_ms = lag_ms
+            self.stats.max_queue_lag_ms = max(self.stats.max_queue_lag_ms, lag_ms)
+            self.stats.queue_depth = self._frames.qsize()
+            WS_QUEUE_DEPTH.set(str(self.stats.shard_id), value=self.stats.queue_depth)
+            await self.handle_frame(raw, received_wall)
 
-    async def start_tickers(self, symbols: list[str], db_session_factory) -> None:
-        topics = [f"tickers.{s.replace('/', '')}" for s in symbols]
+    async def handle_frame(self, raw: str | bytes, received_wall: float | None = None) -> None:
+        """Decode one raw frame and route it; also the entry point for offline replay."""
+        started = time.perf_counter()
+        self.stats.last_frame_at = datetime.now(UTC)
+        msg: dict[str, Any] = {}
+        kind = "unknown"
+        try:
+            msg = self._decode(raw)
+            topic = msg.get("topic")
+            if topic:
+                kind, symbol = topic_labels(topic)
+                WS_MESSAGES.inc(kind, symbol)
+                exch_ms = exchange_ts_ms(msg)
+                if exch_ms is not None:
+                    wall = received_wall if received_wall is not None else time.time()
+                    ingest_lag = max(wall - exch_ms / 1000, 0.0)
+                    self.stats.last_ingest_lag_ms = ingest_lag * 1000
+                    WS_INGEST_LAG_SECONDS.observe(kind, symbol, value=ingest_lag)
+            await self._dispatch(msg)
+        except OrderBookGap:
+            # Resubscribing makes Bybit push a fresh snapshot for the topic
+            self.stats.resyncs += 1
+            await self._resubscribe(msg.get("topic"))
+        except Exception:
+            self.stats.handler_errors += 1
+            WS_HANDLER_ERRORS.inc(kind)
+            logger.exception("shard %d failed to handle frame", self.stats.shard_id)
+        WS_HANDLER_SECONDS.observe(kind, value=time.perf_counter() - started)
 
-        async def on_ticker(msg: dict[str, Any]) -> None:
-            data = msg.get("data")
-            if isinstance(data, list):
-                for d in data:
-                    await self._process_ticker(d, db_session_factory)
-            elif isinstance(data, dict):
-                await self._process_ticker(data, db_session_factory)
+    async def _dispatch(self, msg: dict[str, Any]) -> None:
+        topic = msg.get("topic")
+        if not topic:
+            # Subscribe acks and pongs carry no topic
+            return
+        handler = self._handlers.get(topic.split(".", 1)[0])
+        if handler is not None:
+            await handler(msg)
+
+    async def _resubscribe(self, topic: str | None) -> None:
+        ws = self._ws
+        if not topic or ws is None:
+            # Without a live connection the next reconnect resubscribes everything anyway
+            return
+        try:
+            await ws.send(json.dumps({"op": "unsubscribe", "args": [topic]}))
+            await ws.send(json.dumps({"op": "subscribe", "args": [topic]}))
+        except Exception:
+            return
 
-        await self._run(topics, on_ticker)
+    async def _on_ticker(self, msg: dict[str, Any]) -> None:
+        data = msg.get("data")
+        if isinstance(data, list):
+            for d in data:
+                await self._process_ticker(d)
+        elif isinstance(data, dict):
+            await self._process_ticker(data)
 
-    async def _process_ticker(self, d: dict[str, Any], db_session_factory) -> None:
+    async def _process_ticker(self, d: dict[str, Any]) -> None:
         symbol_ws = d.get("symbol")
         if not symbol_ws:
             return
         symbol = to_ccxt_symbol(symbol_ws)
-        bid = Decimal(d.get("bid1Price") or d.get("bidPrice") or 0)
-        ask = Decimal(d.get("ask1Price") or d.get("askPrice") or 0)
-        last = Decimal(d.get("lastPrice") or 0)
-        mid = (bid + ask) / Decimal(2) if bid and ask else last
-        spread_bps = (ask - bid) / mid * Decimal(10_000) if bid and ask and mid else Decimal(0)
-        ts = datetime.now(UTC)
-        row = {
-            "ts": ts,
-            "last": last,
-            "bid": bid,
-            "ask": ask,
-            "mid": mid,
-            "spread_bps": spread_bps,
-            "day_vol_quote": None,
-        }
-        await self._cache.set_ticker(symbol, row)
-        async with db_session_factory() as db:  # type: ignore[misc]
-            from sqlalchemy import select
-
-            from app.db.models import Instrument
-
-            res = await db.execute(select(Instrument.id).where(Instrument.symbol == symbol))
-            inst_id = res.scalar_one_or_none()
-            if inst_id is None:
-                return
-            await TickersRepository(db).insert_ticker(inst_id, row)
-
-    async def start_orderbook(self, symbols: list[str], depth: int, db_session_factory) -> None:
-        topics = [f"orderbook.{depth}.{s.replace('/', '')}" for s in symbols]
-
-        async def on_ob(msg: dict[str, Any]) -> None:
-            data = msg.get("data")
-            ts = datetime.now(UTC)
-            if not data:
-                return
-            if isinstance(data, dict) and data.get("type") == "snapshot":
-                await self._process_ob_snapshot(data, ts, db_session_factory)
-            elif isinstance(data, dict):
-                await self._process_ob_delta(data, ts, db_session_factory)
+        # Prices stay raw strings; Decimal parsing happens only if something reads them
+        ticker = RawTicker(
+            ts=datetime.now(UTC),
+            last_raw=d.get("lastPrice"),
+            bid_raw=d.get("bid1Price") or d.get("bidPrice"),
+            ask_raw=d.get("ask1Price") or d.get("askPrice"),
+        )
+        await self._cache.set_ticker(symbol, ticker)
+        inst_id = self._registry.get(symbol)
+        if inst_id is None:
+            return
+        await self._writers.ticker_conflator.put((inst_id, ticker))
 
-        await self._run(topics, on_ob)
+    async def _on_orderbook(self, msg: dict[str, Any]) -> None:
+        data = msg.get("data")
+        ts = datetime.now(UTC)
+        if not data or not isinstance(data, dict):
+            return
+        # `type` lives on the envelope; Bybit also re-sends a snapshot as u=1 after a restart
+        kind = msg.get("type") or data.get("type")
+        if kind == "snapshot" or data.get("u") == 1:
+            await self._process_ob_snapshot(data, ts)
+        else:
+            await self._process_ob_delta(data, ts)
 
-    async def _process_ob_snapshot(
-        self, data: dict[str, Any], ts: datetime, db_session_factory
-    ) -> None:
+    async def _process_ob_snapshot(self, data: dict[str, Any], ts: datetime) -> None:
         symbol = to_ccxt_symbol(data.get("s") or data.get("symbol"))
-        bids = [(Decimal(px), Decimal(qty)) for px, qty in data.get("b", [])]
-        asks = [(Decimal(px), Decimal(qty)) for px, qty in data.get("a", [])]
+        raw_bids, raw_asks = data.get("b", []), data.get("a", [])
         snapshot_id = str(uuid.uuid4())
-        await self._cache.set_orderbook(symbol, OrderbookSnapshot(bids=bids, asks=asks))
-        async with db_session_factory() as db:  # type: ignore[misc]
-            from sqlalchemy import select
-
-            from app.db.models import Instrument
-
-            res = await db.execute(select(Instrument.id).where(Instrument.symbol == symbol))
-            inst_id = res.scalar_one_or_none()
-            if inst_id is None:
-                return
-            await OrderBookRepository(db).write_snapshot(inst_id, snapshot_id, bids, asks, ts)
+        book = self._cache.book(symbol)
+        book.apply_snapshot(_levels(raw_bids), _levels(raw_asks), data.get("u"), ts)
+        inst_id = self._registry.get(symbol)
+        if inst_id is None:
+            return
+        # Bybit's own snapshot doubles as a checkpoint for the deltas that follow
+        book.checkpoint_id = snapshot_id
+        self._writers.book_publisher.mark(inst_id, book)
+        await self._writers.put_levels(
+            inst_id,
+            ts,
+            raw_bids,
+            raw_asks,
+            snapshot_id=snapshot_id,
+            update_id=data.get("u"),
+        )
 
-    async def _process_ob_delta(
-        self, data: dict[str, Any], ts: datetime, db_session_factory
-    ) -> None:
+    async def _process_ob_delta(self, data: dict[str, Any], ts: datetime) -> None:
         symbol = to_ccxt_symbol(data.get("s") or data.get("symbol"))
         update_id = data.get("u")
-        bids = [(Decimal(px), Decimal(qty)) for px, qty in data.get("b", [])]
-        asks = [(Decimal(px), Decimal(qty)) for px, qty in data.get("a", [])]
-        async with db_session_factory() as db:  # type: ignore[misc]
-            from sqlalchemy import select
-
-            from app.db.models import Instrument
+        raw_bids, raw_asks = data.get("b", []), data.get("a", [])
+        # Raises OrderBookGap on a sequence gap; the worker resubscribes to resnapshot
+        book = self._cache.book(symbol)
+        if not book.apply_delta(_levels(raw_bids), _levels(raw_asks), update_id, ts):
+            return
+        inst_id = self._registry.get(symbol)
+        if inst_id is None:
+            return
+        self._writers.book_publisher.mark(inst_id, book)
+        await self._writers.put_levels(
+            inst_id,
+            ts,
+            raw_bids,
+            raw_asks,
+            update_id=update_id,
+            checkpoint_id=book.checkpoint_id,
+        )
 
-            res = await db.execute(select(Instrument.id).where(Instrument.symbol == symbol))
-            inst_id = res.scalar_one_or_none()
+    async def _on_trade(self, msg: dict[str, Any]) -> None:
+        data = msg.get("data") or []
+        for t in data:
+            sym = to_ccxt_symbol(t.get("s") or t.get("symbol"))
+            inst_id = self._registry.get(sym)
             if inst_id is None:
-                return
-            # Batch deltas in a single transaction to reduce commit frequency
-            repo = OrderBookRepository(db)
-            await repo.write_deltas_batch(inst_id, update_id, bids=bids, asks=asks, ts=ts)
-
-    async def start_trades(self, symbols: list[str], db_session_factory) -> None:
-        topics = [f"publicTrade.{s.replace('/', '')}" for s in symbols]
-
-        async def on_trade(msg: dict[str, Any]) -> None:
-            data = msg.get("data") or []
-            by_sym: dict[str, list[dict[str, Any]]] = {}
-            for t in data:
-                sym = to_ccxt_symbol(t.get("s") or t.get("symbol"))
-                px = Decimal(t.get("p") or t.get("price") or 0)
-                qty = Decimal(t.get("q") or t.get("qty") or 0)
-                side = (t.get("S") or t.get("side") or "").lower()
-                ts = datetime.fromtimestamp((t.get("T") or t.get("ts") or 0) / 1000, tz=UTC)
-                trade_id = str(t.get("i") or t.get("tradeId") or t.get("id"))
-                by_sym.setdefault(sym, []).append(
-                    {"ts": ts, "px": px, "qty": qty, "side": side, "trade_id": trade_id},
-                )
-            async with db_session_factory() as db:  # type: ignore[misc]
-                from sqlalchemy import select
-
-                from app.db.models import Instrument
-
-                for sym, rows in by_sym.items():
-                    res = await db.execute(select(Instrument.id).where(Instrument.symbol == sym))
-                    inst_id = res.scalar_one_or_none()
-                    if inst_id is None:
-                        continue
-                    await TradesRepository(db).insert_trades(inst_id, rows)
-
-        await self._run(topics, on_trade)
+                continue
+            # Raw strings go straight to the writer, which converts them per batch
+            px = t.get("p") or t.get("price")
+            qty = t.get("q") or t.get("qty")
+            side = (t.get("S") or t.get("side") or "").lower()
+            ts = datetime.fromtimestamp((t.get("T") or t.get("ts") or 0) / 1000, tz=UTC)
+            trade_id = str(t.get("i") or t.get("tradeId") or t.get("id"))
+            await self._writers.trades.put(
+                {
+                    "instrument_id": inst_id,
+                    "ts": ts,
+                    "px": px,
+                    "qty": qty,
+                    "side": side,
+                    "trade_id": trade_id,
+                },
+            )
 
     async def close(self) -> None:
         self._closing.set()
+        if self._ws is not None:
+            await self._ws.close()
@@ -0,0 +1,120 @@
+"""Market data ingestion process: `python -m app.workers.ingest`.
+
+Runs the Bybit WS shards and writers outside the API workers. Any number of copies
+may run; a leader lock (Postgres advisory lock, or a file lock on SQLite) keeps
+exactly one of them ingesting and lets a standby take over when the leader dies.
+Each copy serves its own /metrics and /health on INGEST_METRICS_PORT.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import signal
+
+from app.core.config import settings
+from app.core.logging import configure_logging, get_logger
+from app.core.metrics import registry
+from app.db.session import dispose_engines, get_engine
+from app.services.market_data.ccxt_adapter import close_ccxt_adapters
+from app.workers.leader import LeaderLock, leader_lock_for
+from app.workers.scheduler import (
+    ingest_status,
+    start_market_data_tasks,
+    stop_market_data_tasks,
+)
+
+logger = get_logger(__name__)
+
+
+async def _wait(stop: asyncio.Event, seconds: float) -> None:
+    with contextlib.suppress(TimeoutError):
+        await asyncio.wait_for(stop.wait(), seconds)
+
+
+async def run_ingester(stop: asyncio.Event, lock: LeaderLock | None = None) -> None:
+    """Wait for leadership, ingest while it holds, and step down on loss or `stop`."""
+    lock = lock or leader_lock_for(get_engine())
+    poll = settings.ingest_leader_poll_sec
+    while not stop.is_set():
+        try:
+            acquired = await lock.try_acquire()
+        except Exception:
+            logger.warning("leader lock unavailable, retrying in %.0fs", poll, exc_info=True)
+            acquired = False
+        if not acquired:
+            await _wait(stop, poll)
+            continue
+
+        logger.info("acquired ingest leadership")
+        try:
+            await start_market_data_tasks()
+            while not stop.is_set():
+                await _wait(stop, poll)
+                if not await lock.still_held():
+                    logger.warning("lost ingest leadership, stopping ingestion")
+                    break
+        except Exception:
+            logger.exception("ingestion failed, stepping down")
+        finally:
+            await stop_market_data_tasks()
+            await lock.release()
+        if not stop.is_set():
+            # Give a standby the chance to take over before competing again
+            await _wait(stop, poll)
+
+
+async def _scrape(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Answer one GET /metrics or /health request (HTTP/1.0, connection closed after)."""
+    try:
+        request = await reader.readline()
+        while (await reader.readline()).strip():
+            pass
+        parts = request.split()
+        path = parts[1].decode() if len(parts) > 1 else ""
+        if path == "/metrics":
+            status, ctype, body = "200 OK", "text/plain; version=0.0.4", registry.render()
+        elif path == "/health":
+            status, ctype = "200 OK", "application/json"
+            body = json.dumps({"status": "ok", "ingestion": ingest_status()})
+        else:
+            status, ctype, body = "404 Not Found", "text/plain", "not found\n"
+        data = body.encode()
+        writer.write(
+            f"HTTP/1.0 {status}\r\nContent-Type: {ctype}\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode() + data,
+        )
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_metrics(host: str, port: int) -> asyncio.Server:
+    """Expose this process's metrics registry; the API's /metrics only has its own."""
+    server = await asyncio.start_server(_scrape, host, port)
+    logger.info("ingest metrics on http://%s:%d/metrics", host, port)
+    return server
+
+
+async def main() -> None:
+    configure_logging(settings.log_level)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    server = None
+    if settings.ingest_metrics_port > 0:
+        server = await serve_metrics(settings.ingest_metrics_host, settings.ingest_metrics_port)
+    await run_ingester(stop)
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+    await close_ccxt_adapters()
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
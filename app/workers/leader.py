@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import os
+import tempfile
+from pathlib import Path
+from typing import IO, Protocol
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class LeaderLock(Protocol):
+    async def try_acquire(self) -> bool: ...
+
+    async def still_held(self) -> bool: ...
+
+    async def release(self) -> None: ...
+
+
+class PgAdvisoryLock:
+    """Session-level `pg_try_advisory_lock` held on a dedicated connection.
+
+    Postgres drops the lock when that connection ends, so a crashed or partitioned
+    leader frees it for a standby without any lease bookkeeping.
+    """
+
+    def __init__(self, engine: AsyncEngine, key: int) -> None:
+        self._engine = engine
+        self._key = key
+        self._conn: AsyncConnection | None = None
+
+    async def try_acquire(self) -> bool:
+        conn = await self._engine.connect()
+        try:
+            res = await conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": self._key})
+            acquired = bool(res.scalar())
+            # Keep the lock out of the implicit transaction so later checks cannot roll it back
+            await conn.commit()
+        except Exception:
+            await conn.close()
+            raise
+        if not acquired:
+            await conn.close()
+            return False
+        self._conn = conn
+        return True
+
+    async def still_held(self) -> bool:
+        if self._conn is None:
+            return False
+        try:
+            await self._conn.execute(text("SELECT 1"))
+            await self._conn.commit()
+        except Exception:
+            logger.warning("leader lock connection lost", exc_info=True)
+            await self._discard()
+            return False
+        return True
+
+    async def release(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            # Unlock explicitly: the connection goes back to the pool, not away
+            await self._conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": self._key})
+            await self._conn.commit()
+        except Exception:
+            await self._discard()
+            return
+        await self._conn.close()
+        self._conn = None
+
+    async def _discard(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                await conn.invalidate()
+            except Exception:
+                pass
+
+
+class FileLeaderLock:
+    """Exclusive `flock` on a local file, for SQLite deployments on a single host.
+
+    The kernel releases the lock when the holding process exits.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self._path = Path(path)
+        self._fh: IO[str] | None = None
+
+    async def try_acquire(self) -> bool:
+        return await asyncio.to_thread(self._acquire)
+
+    def _acquire(self) -> bool:
+        fh = open(self._path, "a+")  # noqa: SIM115 - held open for the life of the lock
+        try:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            fh.close()
+            return False
+        fh.seek(0)
+        fh.truncate()
+        fh.write(f"{os.getpid()}\n")
+        fh.flush()
+        self._fh = fh
+        return True
+
+    async def still_held(self) -> bool:
+        return self._fh is not None
+
+    async def release(self) -> None:
+        if self._fh is not None:
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
+
+
+def leader_lock_for(engine: AsyncEngine) -> LeaderLock:
+    if engine.dialect.name == "postgresql":
+        return PgAdvisoryLock(engine, settings.ingest_lock_key)
+    path = settings.ingest_lock_file or os.path.join(
+        tempfile.gettempdir(),
+        "crypto-copilot-ingest.lock",
+    )
+    return FileLeaderLock(path)
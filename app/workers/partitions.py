@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from datetime import UTC, date, datetime, time
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.partitions import (
+    PARTITIONED_TABLES,
+    create_partition,
+    drop_partition,
+    expired_partitions,
+    is_partitioned,
+    list_partitions,
+    partitions_before,
+    today_utc,
+    wanted_partitions,
+)
+from app.db.repositories.coverage import CoverageRepository
+from app.db.session import get_engine
+from app.workers.retention import stored_watermark
+
+logger = get_logger(__name__)
+
+
+async def maintain_partitions(
+    engine: AsyncEngine | None = None,
+    today: date | None = None,
+) -> dict[str, tuple[int, int]]:
+    """Create partitions PARTITION_AHEAD_DAYS ahead and drop those past RETENTION_DAYS.
+
+    Returns {table: (created, dropped)}. A no-op on SQLite and on tables that have not
+    been converted by migration 0005. Each table is handled in its own short
+    transaction so DDL locks are held briefly. `ticker_rt` partitions are only dropped
+    once the ticker rollup has passed their upper bound.
+    """
+    engine = engine or get_engine()
+    if engine.dialect.name != "postgresql":
+        return {}
+    today = today or today_utc()
+    retention = settings.retention_days
+    done: dict[str, tuple[int, int]] = {}
+    for table, period in PARTITIONED_TABLES.items():
+        async with engine.begin() as conn:
+            if not await is_partitioned(conn, table):
+                continue
+            existing = await list_partitions(conn, table, period)
+            names = {p.name for p in existing}
+            created = 0
+            for p in wanted_partitions(table, period, today, settings.partition_ahead_days):
+                if p.name not in names:
+                    await create_partition(conn, p)
+                    created += 1
+            expired = expired_partitions(existing, today, retention.get(table, 0))
+            if table == "ticker_rt" and expired:
+                # Raw tickers not yet summarized in ticker_rollup stay, whatever their age
+                expired = partitions_before(expired, await stored_watermark(conn))
+            for p in expired:
+                # Retention is one DDL statement instead of a bloating DELETE
+                await drop_partition(conn, p)
+            if table == "ohlcv_1m" and expired:
+                # Dropped minutes must show up as gaps again, not as covered
+                end = max(p.end for p in expired)
+                await CoverageRepository(conn).trim(datetime.combine(end, time(), UTC))
+        done[table] = (created, len(expired))
+        if created or expired:
+            logger.info("partitions %s: created=%d dropped=%d", table, created, len(expired))
+    return done
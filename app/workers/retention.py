@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import delete, func, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.models import (
+    Config,
+    OHLCV1m,
+    OrderBookL2,
+    OrderBookPacked,
+    TickerRollup,
+    TickerRT,
+    TradeRT,
+)
+from app.db.partitions import is_partitioned
+from app.db.repositories.configs import ConfigsRepository
+from app.db.repositories.coverage import CoverageRepository
+
+logger = get_logger(__name__)
+
+# Rollup label -> the unit `ts` is truncated to
+ROLLUP_INTERVALS: dict[str, str] = {"1s": "second", "1m": "minute"}
+WATERMARK_KEY = "retention.ticker_rollup.watermark"
+
+# Tables RETENTION_DAYS may name; ticker_rollup covers both intervals, while
+# ticker_rollup_1s / ticker_rollup_1m expire one of them (1s buckets are 60x the rows)
+RETAINED_TABLES: dict[str, Any] = {
+    "ticker_rt": TickerRT,
+    "ticker_rollup": TickerRollup,
+    "ticker_rollup_1s": TickerRollup,
+    "ticker_rollup_1m": TickerRollup,
+    "trade_rt": TradeRT,
+    "orderbook_l2": OrderBookL2,
+    "orderbook_l2_packed": OrderBookPacked,
+    "ohlcv_1m": OHLCV1m,
+}
+
+_INTERVAL_RETENTION = {"ticker_rollup_1s": "1s", "ticker_rollup_1m": "1m"}
+
+_ROLLUP_UPDATE = ["open", "high", "low", "close", "bid", "ask", "spread_bps_avg", "samples"]
+
+
+def _utc(ts: datetime) -> datetime:
+    # SQLite hands back naive datetimes; everything stored is UTC
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=UTC)
+
+
+def bucket_start(ts: datetime, seconds: int) -> datetime:
+    return ts.replace(second=ts.second - ts.second % seconds, microsecond=0)
+
+
+def _bucket(dialect: str, label: str, ts: Any) -> Any:
+    """SQL expression truncating `ts` to the start of its `label` bucket."""
+    unit = ROLLUP_INTERVALS[label]
+    if dialect == "postgresql":
+        return func.date_trunc(unit, ts)
+    # SQLite stores DateTime as "YYYY-MM-DD HH:MM:SS.ffffff" text in UTC
+    fmt = "%Y-%m-%d %H:%M:%S" if unit == "second" else "%Y-%m-%d %H:%M:00"
+    return func.strftime(f"{fmt}.000000", ts)
+
+
+def rollup_statement(dialect: str, label: str, start: datetime, end: datetime) -> Any:
+    """INSERT ... SELECT folding `ticker_rt` rows in [start, end) into `label` buckets.
+
+    Grouped in the database: open/close/bid/ask are the first/last tick by (ts, id), so
+    only the buckets cross the wire. Existing buckets are overwritten.
+    """
+    bucket = _bucket(dialect, label, TickerRT.ts)
+    part = (TickerRT.instrument_id, bucket)
+    order = (TickerRT.ts.asc(), TickerRT.id.asc())
+
+    def first(col: Any) -> Any:
+        return func.first_value(col).over(partition_by=part, order_by=order)
+
+    def last(col: Any) -> Any:
+        return func.last_value(col).over(partition_by=part, order_by=order, rows=(None, None))
+
+    ticks = (
+        select(
+            TickerRT.instrument_id,
+            bucket.label("ts"),
+            TickerRT.last,
+            TickerRT.spread_bps,
+            first(TickerRT.last).label("open"),
+            last(TickerRT.last).label("close"),
+            last(TickerRT.bid).label("bid"),
+            last(TickerRT.ask).label("ask"),
+        )
+        .where(TickerRT.ts >= start, TickerRT.ts < end)
+        .subquery()
+    )
+    buckets = select(
+        ticks.c.instrument_id,
+        literal(label),
+        ticks.c.ts,
+        # Constant per bucket; max() just picks it
+        func.max(ticks.c.open),
+        func.max(ticks.c.last),
+        func.min(ticks.c.last),
+        func.max(ticks.c.close),
+        func.max(ticks.c.bid),
+        func.max(ticks.c.ask),
+        func.avg(ticks.c.spread_bps),
+        func.count(),
+    ).group_by(ticks.c.instrument_id, ticks.c.ts)
+    ins: Any = (postgresql if dialect == "postgresql" else sqlite).insert(TickerRollup)
+    ins = ins.from_select(["instrument_id", "interval", "ts", *_ROLLUP_UPDATE], buckets)
+    return ins.on_conflict_do_update(
+        index_elements=["instrument_id", "interval", "ts"],
+        set_={c: ins.excluded[c] for c in _ROLLUP_UPDATE},
+    ).returning(TickerRollup.id)
+
+
+async def stored_watermark(conn: AsyncConnection | AsyncSession) -> datetime | None:
+    """End of the rolled-up span: raw tickers before it are summarized in `ticker_rollup`."""
+    state = await conn.scalar(select(Config.value).where(Config.key == WATERMARK_KEY))
+    return datetime.fromisoformat(state["ts"]) if state and state.get("ts") else None
+
+
+async def _watermark(db: AsyncSession) -> datetime | None:
+    stored = await stored_watermark(db)
+    if stored is not None:
+        return stored
+    oldest = await db.scalar(select(func.min(TickerRT.ts)))
+    return bucket_start(_utc(oldest), 60) if oldest is not None else None
+
+
+async def rollup_tickers(
+    session_factory: async_sessionmaker[AsyncSession],
+    now: datetime | None = None,
+) -> int:
+    """Roll `ticker_rt` into `ticker_rollup` from the stored watermark; returns buckets written.
+
+    Works in ROLLUP_WINDOW_SEC slices, each committed with its watermark, and stops
+    ROLLUP_LATENESS_SEC before `now` (on a minute boundary) so buckets are complete.
+    Re-running a slice overwrites the same buckets.
+    """
+    now = now or datetime.now(UTC)
+    upto = bucket_start(now - timedelta(seconds=settings.rollup_lateness_sec), 60)
+    window = timedelta(seconds=max(60, settings.rollup_window_sec))
+    written = 0
+    async with session_factory() as db:
+        dialect = db.get_bind().dialect.name
+        start = await _watermark(db)
+        while start is not None and start < upto:
+            end = min(start + window, upto)
+            for label in ROLLUP_INTERVALS:
+                res = await db.execute(rollup_statement(dialect, label, start, end))
+                written += len(res.all())
+            await ConfigsRepository(db).put(WATERMARK_KEY, {"ts": end.isoformat()})
+            await db.commit()
+            start = end
+    return written
+
+
+async def purge_expired(
+    session_factory: async_sessionmaker[AsyncSession],
+    now: datetime | None = None,
+) -> dict[str, int]:
+    """Delete rows older than RETENTION_DAYS in RETENTION_BATCH_ROWS batches.
+
+    Each batch is its own short transaction. Postgres tables that are partitioned are
+    skipped (app.workers.partitions drops their partitions instead), and raw tickers are
+    never deleted past the rollup watermark. `ticker_rollup_1s` / `ticker_rollup_1m`
+    expire only that interval's buckets.
+    """
+    now = now or datetime.now(UTC)
+    batch = max(1, settings.retention_batch_rows)
+    deleted: dict[str, int] = {}
+    for table, days in settings.retention_days.items():
+        model = RETAINED_TABLES.get(table)
+        if model is None or days <= 0:
+            continue
+        cutoff = now - timedelta(days=days)
+        async with session_factory() as db:
+            bind = db.get_bind()
+            if bind.dialect.name == "postgresql":
+                conn = await db.connection()
+                if await is_partitioned(conn, model.__tablename__):
+                    continue
+            if model is TickerRT:
+                watermark = await _watermark(db)
+                if watermark is None:
+                    continue
+                cutoff = min(cutoff, watermark)
+            expired = [model.ts < cutoff]
+            if table in _INTERVAL_RETENTION:
+                expired.append(TickerRollup.interval == _INTERVAL_RETENTION[table])
+            n = 0
+            while True:
+                ids = (await db.scalars(select(model.id).where(*expired).limit(batch))).all()
+                if not ids:
+                    break
+                await db.execute(delete(model).where(model.id.in_(ids)))
+                if model is OHLCV1m:
+                    # Purged minutes must show up as gaps again, not as covered
+                    await CoverageRepository(db).trim(cutoff)
+                await db.commit()
+                n += len(ids)
+                # Let ingestion get a turn between batches
+                await asyncio.sleep(0)
+        if n:
+            deleted[table] = n
+            logger.info("retention %s: deleted %d rows older than %s", table, n, cutoff)
+    return deleted
+
+
+async def run_retention(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    await rollup_tickers(session_factory)
+    await purge_expired(session_factory)
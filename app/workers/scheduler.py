@@ -2,67 +2,230 @@ from __future__ import annotations
 
 import asyncio
 from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any
 
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import JOB_FAILURES
 from app.db.repositories.instruments import InstrumentsRepository
-from app.db.repositories.ohlcv import OhlcvRepository
 from app.db.session import get_session_factory
 from app.services.market_data.cache import MarketCache
-from app.services.market_data.ccxt_adapter import CcxtAdapter
-from app.services.market_data.ws_bybit import BybitWs
+from app.services.market_data.candles import refresh_all_aggregates
+from app.services.market_data.ccxt_adapter import CcxtAdapter, get_ccxt_adapter
+from app.services.market_data.checkpoint import checkpoint_books
+from app.services.market_data.gaps import repair_all, seed_coverage
+from app.services.market_data.heartbeat import publish_heartbeat
+from app.services.market_data.instrument_registry import instrument_registry
+from app.services.market_data.recording import FrameRecorder
+from app.services.market_data.write_behind import MarketDataWriters
+from app.services.market_data.ws_bybit import BybitWs, shard_symbols
+from app.workers.partitions import maintain_partitions
+from app.workers.retention import run_retention
+
+logger = get_logger(__name__)
+
+_shards: list[BybitWs] = []
+_shard_tasks: list[asyncio.Task[None]] = []
+_writers: MarketDataWriters | None = None
+# Periodic/backfill tasks owned by the current ingestion run, cancelled on stop
+_bg_tasks: list[asyncio.Task[None]] = []
 
 
 async def run_periodic(task: Callable[[], Awaitable[None]], interval_seconds: int) -> None:
+    """Run `task` every `interval_seconds`; a failed run is logged and counted, not fatal."""
+    name = getattr(task, "__name__", "job").lstrip("_")
     while True:
         try:
             await task()
         except Exception:
-            pass
+            JOB_FAILURES.inc(name)
+            logger.exception("periodic job %s failed", name)
         await asyncio.sleep(interval_seconds)
 
 
+async def sync_instruments(
+    session_factory: async_sessionmaker[AsyncSession],
+    adapter: CcxtAdapter,
+) -> None:
+    """Upsert the configured symbols' market metadata and reload the registry from it."""
+    markets = await adapter.fetch_markets_spot()
+    wanted = set(settings.symbols_list)
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many(
+            [m for m in markets if m["symbol"] in wanted],
+        )
+        await instrument_registry.refresh(db)
+
+
 async def start_market_data_tasks(
     session_factory: async_sessionmaker[AsyncSession] | None = None,
 ) -> None:
-    # Gate background ingestion by flag to avoid exhausting DB resources unintentionally
-    if not settings.enable_market_data_tasks:
-        return
+    """Start WS shards, writers and periodic jobs in this process.
+
+    Callers gate this behind ENABLE_MARKET_DATA_TASKS and the ingest leader lock
+    (see app.workers.ingest) so only one process ingests at a time.
+    """
+    global _writers
     session_factory = session_factory or get_session_factory()
     cache = MarketCache()
-    ccxt = CcxtAdapter(settings.exchange)
+    # Shared with the API routes in this process; closed by the process owner on exit
+    ccxt = get_ccxt_adapter()
 
-    # Upsert instruments
-    async with session_factory() as db:  # type: ignore[misc]
-        markets = await ccxt.fetch_markets_spot()
-        wanted = set(settings.symbols_list)
-        markets = [m for m in markets if m["symbol"] in wanted]
-        await InstrumentsRepository(db).upsert_many(markets)
+    # Resolve symbols in memory from here on; WS handlers never query for ids
+    await sync_instruments(session_factory, ccxt)
+    # Candles stored before coverage tracking must be indexed before any repair runs,
+    # or the repairs would refetch them; a no-op once every instrument has coverage
+    await seed_coverage(session_factory, instrument_registry)
 
-    # Backfill OHLCV in the background only if explicitly enabled
+    # Backfill OHLCV in the background only if explicitly enabled; only minutes missing
+    # from the coverage index are fetched, so restarts do not refetch history
     if settings.enable_backfill_on_startup:
 
         async def backfill_all() -> None:
-            async with session_factory() as db:  # type: ignore[misc]
-                for sym in settings.symbols_list:
-                    rows = await ccxt.backfill_ohlcv_1m(sym, settings.backfill_lookback_days)
-                    from sqlalchemy import select
-
-                    from app.db.models import Instrument
-
-                    res = await db.execute(select(Instrument.id).where(Instrument.symbol == sym))
-                    inst_id = res.scalar_one_or_none()
-                    if inst_id is None:
-                        continue
-                    await OhlcvRepository(db).insert_ohlcv_rows(inst_id, rows)
-
-        asyncio.create_task(backfill_all())
-
-    # Start WS tasks
-    ws = BybitWs(cache)
-    asyncio.create_task(ws.start_tickers(settings.symbols_list, session_factory))
-    asyncio.create_task(
-        ws.start_orderbook(settings.symbols_list, settings.ws_orderbook_levels, session_factory),
+            await repair_all(
+                session_factory,
+                ccxt,
+                instrument_registry,
+                settings.symbols_list,
+                timedelta(days=settings.backfill_lookback_days),
+            )
+
+        _bg_tasks.append(asyncio.create_task(backfill_all()))
+
+    # Start one WS shard per symbol group; persistence goes through write-behind queues
+    _writers = MarketDataWriters.from_settings(session_factory)
+    _writers.start()
+    for shard_id, symbols in enumerate(shard_symbols(settings.symbols_list)):
+        recorder = (
+            FrameRecorder(
+                settings.ws_record_dir,
+                f"bybit-shard{shard_id}",
+                settings.ws_record_segment_frames,
+            )
+            if settings.ws_record_dir
+            else None
+        )
+        ws = BybitWs(cache, _writers, shard_id=shard_id, recorder=recorder)
+        _shards.append(ws)
+        _shard_tasks.append(asyncio.create_task(ws.start(symbols, settings.ws_orderbook_levels)))
+    _bg_tasks.append(asyncio.create_task(run_periodic(_log_ingest_stats, 60)))
+
+    async def heartbeat() -> None:
+        # API workers live in other processes; they read this for `/ready`
+        async with session_factory() as db:
+            await publish_heartbeat(db, ingest_status())
+
+    _bg_tasks.append(
+        asyncio.create_task(run_periodic(heartbeat, settings.ingest_heartbeat_sec)),
+    )
+
+    if settings.instrument_sync_interval_sec > 0:
+
+        async def instruments() -> None:
+            # Symbols listed after startup resolve without a restart; markets come from
+            # the adapter's cache and unchanged rows are skipped, so this is cheap
+            await sync_instruments(session_factory, ccxt)
+
+        _bg_tasks.append(
+            asyncio.create_task(run_periodic(instruments, settings.instrument_sync_interval_sec)),
+        )
+
+    async def checkpoint() -> None:
+        if _writers is not None:
+            await checkpoint_books(cache, _writers)
+
+    _bg_tasks.append(
+        asyncio.create_task(run_periodic(checkpoint, settings.ws_snapshot_interval_sec)),
+    )
+
+    async def partitions() -> None:
+        await maintain_partitions(session_factory.kw.get("bind"))
+
+    _bg_tasks.append(
+        asyncio.create_task(run_periodic(partitions, settings.partition_maintenance_sec)),
+    )
+
+    async def candle_aggregates() -> None:
+        await refresh_all_aggregates(session_factory, instrument_registry)
+
+    _bg_tasks.append(
+        asyncio.create_task(run_periodic(candle_aggregates, settings.ohlcv_agg_interval_sec)),
     )
-    asyncio.create_task(ws.start_trades(settings.symbols_list, session_factory))
+
+    if settings.ohlcv_repair_interval_sec > 0:
+
+        async def ohlcv_repair() -> None:
+            await repair_all(
+                session_factory,
+                ccxt,
+                instrument_registry,
+                settings.symbols_list,
+                timedelta(minutes=settings.ohlcv_repair_lookback_min),
+            )
+
+        _bg_tasks.append(
+            asyncio.create_task(run_periodic(ohlcv_repair, settings.ohlcv_repair_interval_sec)),
+        )
+
+    async def retention() -> None:
+        await run_retention(session_factory)
+
+    _bg_tasks.append(
+        asyncio.create_task(run_periodic(retention, settings.retention_interval_sec)),
+    )
+
+
+async def _log_ingest_stats() -> None:
+    for ws in _shards:
+        st = ws.stats
+        logger.info(
+            "ws shard=%d symbols=%d frames=%d queue=%d lag_ms=%.1f max_lag_ms=%.1f "
+            "ingest_lag_ms=%.1f reconnects=%d resyncs=%d errors=%d",
+            st.shard_id,
+            st.symbols,
+            st.frames,
+            st.queue_depth,
+            st.last_queue_lag_ms,
+            st.max_queue_lag_ms,
+            st.last_ingest_lag_ms,
+            st.reconnects,
+            st.resyncs,
+            st.handler_errors,
+        )
+
+
+def ingest_status() -> dict[str, Any] | None:
+    """Worst-shard ingestion lag for the heartbeat; None when this process runs no shards."""
+    if not _shards:
+        return None
+    now = datetime.now(UTC)
+    stats = [ws.stats for ws in _shards]
+    frame_ages = [(now - st.last_frame_at).total_seconds() for st in stats if st.last_frame_at]
+    return {
+        "shards": len(stats),
+        "lag_ms": round(max(st.last_ingest_lag_ms for st in stats), 1),
+        "queue_lag_ms": round(max(st.last_queue_lag_ms for st in stats), 1),
+        "queue_depth": sum(st.queue_depth for st in stats),
+        "last_frame_age_s": round(max(frame_ages), 3) if frame_ages else None,
+        "writer_queue_depth": sum(w.qsize() for w in _writers.all()) if _writers else 0,
+    }
+
+
+async def stop_market_data_tasks() -> None:
+    global _writers
+    for task in _bg_tasks:
+        task.cancel()
+    await asyncio.gather(*_bg_tasks, return_exceptions=True)
+    _bg_tasks.clear()
+    await asyncio.gather(*(ws.close() for ws in _shards))
+    # Let each shard worker drain its frame queue into the writers
+    await asyncio.gather(*_shard_tasks, return_exceptions=True)
+    _shards.clear()
+    _shard_tasks.clear()
+    # Flush whatever the WS handlers already queued before the process exits
+    if _writers is not None:
+        await _writers.close()
+        _writers = None
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0003_ob_checkpoints"
+down_revision = "0002_market_data"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("orderbook_l2", sa.Column("checkpoint_id", sa.String(length=36), nullable=True))
+    op.create_index("ix_ob_l2_snapshot_id", "orderbook_l2", ["snapshot_id"])
+    op.create_index("ix_ob_l2_checkpoint_id", "orderbook_l2", ["checkpoint_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ob_l2_checkpoint_id", table_name="orderbook_l2")
+    op.drop_index("ix_ob_l2_snapshot_id", table_name="orderbook_l2")
+    op.drop_column("orderbook_l2", "checkpoint_id")
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0004_ob_packed"
+down_revision = "0003_ob_checkpoints"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "orderbook_l2_packed",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "instrument_id",
+            sa.Integer(),
+            sa.ForeignKey("instruments.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("ts", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("snapshot_id", sa.String(length=36), nullable=True),
+        sa.Column("checkpoint_id", sa.String(length=36), nullable=True),
+        sa.Column("update_id", sa.BigInteger(), nullable=True),
+        sa.Column("price_scale", sa.Integer(), nullable=False),
+        sa.Column("qty_scale", sa.Integer(), nullable=False),
+        sa.Column("bids", sa.LargeBinary(), nullable=False),
+        sa.Column("asks", sa.LargeBinary(), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False,
+        ),
+        sa.Column(
+            "updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False,
+        ),
+    )
+    op.create_index("ix_ob_packed_instr_ts", "orderbook_l2_packed", ["instrument_id", "ts"])
+    op.create_index("ix_ob_packed_snapshot_id", "orderbook_l2_packed", ["snapshot_id"])
+    op.create_index("ix_ob_packed_checkpoint_id", "orderbook_l2_packed", ["checkpoint_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ob_packed_checkpoint_id", table_name="orderbook_l2_packed")
+    op.drop_index("ix_ob_packed_snapshot_id", table_name="orderbook_l2_packed")
+    op.drop_index("ix_ob_packed_instr_ts", table_name="orderbook_l2_packed")
+    op.drop_table("orderbook_l2_packed")
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.core.config import settings
+from app.db.partitions import partition_ddl, partitions_between
+
+revision = "0005_partition_timeseries"
+down_revision = "0004_ob_packed"
+branch_labels = None
+depends_on = None
+
+# table -> (partition period, [(index name, columns, unique)])
+# Unique keys on a partitioned table must contain the partition key, hence `ts` in
+# uq_trade_rt_unique. Kept in step with app.db.partitions.PARTITIONED_TABLES.
+TABLES: dict[str, tuple[str, list[tuple[str, list[str], bool]]]] = {
+    "ohlcv_1m": (
+        "month",
+        [("uq_ohlcv1m_unique", ["instrument_id", "ts"], True), ("ix_ohlcv1m_ts", ["ts"], False)],
+    ),
+    "ticker_rt": (
+        "day",
+        [
+            ("ix_tickerrt_ts", ["ts"], False),
+            ("ix_tickerrt_instr_ts", ["instrument_id", "ts"], False),
+        ],
+    ),
+    "trade_rt": (
+        "day",
+        [
+            ("uq_trade_rt_unique", ["instrument_id", "trade_id", "ts"], True),
+            ("ix_tradert_ts", ["ts"], False),
+            ("ix_tradert_instr_ts", ["instrument_id", "ts"], False),
+        ],
+    ),
+    "orderbook_l2": (
+        "day",
+        [
+            ("ix_ob_l2_instr_ts_side", ["instrument_id", "ts", "side"], False),
+            ("ix_ob_l2_snapshot_id", ["snapshot_id"], False),
+            ("ix_ob_l2_checkpoint_id", ["checkpoint_id"], False),
+        ],
+    ),
+    "orderbook_l2_packed": (
+        "day",
+        [
+            ("ix_ob_packed_instr_ts", ["instrument_id", "ts"], False),
+            ("ix_ob_packed_snapshot_id", ["snapshot_id"], False),
+            ("ix_ob_packed_checkpoint_id", ["checkpoint_id"], False),
+        ],
+    ),
+}
+
+# Partitions created ahead of "now" at upgrade time; the maintenance worker keeps going
+AHEAD_DAYS = 7
+
+
+def _cols(columns: list[str]) -> str:
+    return ", ".join(f'"{c}"' for c in columns)
+
+
+def _create_indexes(table: str, indexes: list[tuple[str, list[str], bool]]) -> None:
+    for name, columns, unique in indexes:
+        if unique:
+            op.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" UNIQUE ({_cols(columns)})')
+        else:
+            op.execute(f'CREATE INDEX "{name}" ON "{table}" ({_cols(columns)})')
+
+
+def _upgrade_sqlite() -> None:
+    # SQLite has no partitioning; only keep the trade key and extra indexes in step
+    with op.batch_alter_table("trade_rt") as batch:
+        batch.drop_constraint("uq_trade_rt_unique", type_="unique")
+        batch.create_unique_constraint("uq_trade_rt_unique", ["instrument_id", "trade_id", "ts"])
+    op.create_index("ix_tickerrt_instr_ts", "ticker_rt", ["instrument_id", "ts"])
+    op.create_index("ix_tradert_instr_ts", "trade_rt", ["instrument_id", "ts"])
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        _upgrade_sqlite()
+        return
+
+    today = datetime.now(UTC).date()
+    for table, (period, indexes) in TABLES.items():
+        legacy = f"{table}_legacy"
+        op.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+        seq = bind.execute(sa.text(f"SELECT pg_get_serial_sequence('{legacy}', 'id')")).scalar()
+        op.execute(
+            f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS) PARTITION BY RANGE (ts)',
+        )
+
+        # Cover existing rows and the startup backfill window up to AHEAD_DAYS from now;
+        # older inserts create their partitions on demand (app.db.bulk)
+        first = today - timedelta(days=settings.backfill_lookback_days)
+        oldest = bind.execute(sa.text(f'SELECT min(ts) FROM "{legacy}"')).scalar()
+        if oldest is not None:
+            first = min(first, oldest.astimezone(UTC).date())
+        for p in partitions_between(table, period, first, today + timedelta(days=AHEAD_DAYS)):
+            op.execute(partition_ddl(p))
+
+        op.execute(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"')
+        if seq:
+            # The id sequence would otherwise be dropped with the legacy table
+            op.execute(f'ALTER SEQUENCE {seq} OWNED BY "{table}".id')
+        op.execute(f'DROP TABLE "{legacy}"')
+        # Keys go on after the legacy table is gone so constraint names stay unchanged
+        op.execute(f'ALTER TABLE "{table}" ADD PRIMARY KEY (id, ts)')
+        op.execute(
+            f'ALTER TABLE "{table}" ADD FOREIGN KEY (instrument_id) '
+            "REFERENCES instruments (id) ON DELETE CASCADE",
+        )
+        _create_indexes(table, indexes)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        op.drop_index("ix_tradert_instr_ts", table_name="trade_rt")
+        op.drop_index("ix_tickerrt_instr_ts", table_name="ticker_rt")
+        with op.batch_alter_table("trade_rt") as batch:
+            batch.drop_constraint("uq_trade_rt_unique", type_="unique")
+            batch.create_unique_constraint("uq_trade_rt_unique", ["instrument_id", "trade_id"])
+        return
+
+    previous = {
+        "trade_rt": [
+            ("uq_trade_rt_unique", ["instrument_id", "trade_id"], True),
+            ("ix_tradert_ts", ["ts"], False),
+        ],
+        "ticker_rt": [("ix_tickerrt_ts", ["ts"], False)],
+    }
+    for table, (_, indexes) in TABLES.items():
+        heap = f"{table}_heap"
+        seq = bind.execute(sa.text(f"SELECT pg_get_serial_sequence('{table}', 'id')")).scalar()
+        op.execute(f'CREATE TABLE "{heap}" (LIKE "{table}" INCLUDING DEFAULTS)')
+        op.execute(f'INSERT INTO "{heap}" SELECT * FROM "{table}"')
+        if seq:
+            op.execute(f'ALTER SEQUENCE {seq} OWNED BY "{heap}".id')
+        # Dropping the parent drops every partition with it
+        op.execute(f'DROP TABLE "{table}"')
+        op.execute(f'ALTER TABLE "{heap}" RENAME TO "{table}"')
+        op.execute(f'ALTER TABLE "{table}" ADD PRIMARY KEY (id)')
+        op.execute(
+            f'ALTER TABLE "{table}" ADD FOREIGN KEY (instrument_id) '
+            "REFERENCES instruments (id) ON DELETE CASCADE",
+        )
+        _create_indexes(table, previous.get(table, indexes))
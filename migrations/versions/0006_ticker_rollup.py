@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0006_ticker_rollup"
+down_revision = "0005_partition_timeseries"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ticker_rollup",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "instrument_id",
+            sa.Integer(),
+            sa.ForeignKey("instruments.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("interval", sa.String(length=4), nullable=False),
+        sa.Column("ts", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("open", sa.Numeric(38, 18), nullable=False),
+        sa.Column("high", sa.Numeric(38, 18), nullable=False),
+        sa.Column("low", sa.Numeric(38, 18), nullable=False),
+        sa.Column("close", sa.Numeric(38, 18), nullable=False),
+        sa.Column("bid", sa.Numeric(38, 18), nullable=False),
+        sa.Column("ask", sa.Numeric(38, 18), nullable=False),
+        sa.Column("spread_bps_avg", sa.Numeric(38, 18), nullable=False),
+        sa.Column("samples", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False,
+        ),
+        sa.Column(
+            "updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False,
+        ),
+        sa.UniqueConstraint("instrument_id", "interval", "ts", name="uq_ticker_rollup_unique"),
+    )
+    op.create_index("ix_ticker_rollup_ts", "ticker_rollup", ["ts"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ticker_rollup_ts", table_name="ticker_rollup")
+    op.drop_table("ticker_rollup")
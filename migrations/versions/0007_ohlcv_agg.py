@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0007_ohlcv_agg"
+down_revision = "0006_ticker_rollup"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ohlcv_agg",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "instrument_id",
+            sa.Integer(),
+            sa.ForeignKey("instruments.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("timeframe", sa.String(length=4), nullable=False),
+        sa.Column("ts", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("open", sa.Numeric(38, 18), nullable=False),
+        sa.Column("high", sa.Numeric(38, 18), nullable=False),
+        sa.Column("low", sa.Numeric(38, 18), nullable=False),
+        sa.Column("close", sa.Numeric(38, 18), nullable=False),
+        sa.Column("volume_base", sa.Numeric(38, 18), nullable=False),
+        sa.Column("turnover_quote", sa.Numeric(38, 18), nullable=True),
+        sa.Column("minutes", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False,
+        ),
+        sa.Column(
+            "updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False,
+        ),
+        # Doubles as the (instrument_id, timeframe, ts) range-scan index for chart reads
+        sa.UniqueConstraint("instrument_id", "timeframe", "ts", name="uq_ohlcv_agg_unique"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ohlcv_agg")
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "0008_latest_state"
+down_revision = "0007_ohlcv_agg"
+branch_labels = None
+depends_on = None
+
+
+def _timestamps() -> list[sa.Column]:
+    return [
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False,
+        ),
+        sa.Column(
+            "updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False,
+        ),
+    ]
+
+
+def _instrument_pk() -> sa.Column:
+    return sa.Column(
+        "instrument_id",
+        sa.Integer(),
+        sa.ForeignKey("instruments.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+
+def upgrade() -> None:
+    json_type = postgresql.JSONB().with_variant(sa.JSON(), "sqlite")
+    op.create_table(
+        "ticker_latest",
+        _instrument_pk(),
+        sa.Column("ts", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last", sa.Numeric(38, 18), nullable=False),
+        sa.Column("bid", sa.Numeric(38, 18), nullable=False),
+        sa.Column("ask", sa.Numeric(38, 18), nullable=False),
+        sa.Column("mid", sa.Numeric(38, 18), nullable=False),
+        sa.Column("spread_bps", sa.Numeric(38, 18), nullable=False),
+        sa.Column("day_vol_quote", sa.Numeric(38, 18), nullable=True),
+        sa.Column("mark", sa.Numeric(38, 18), nullable=True),
+        sa.Column("index", sa.Numeric(38, 18), nullable=True),
+        *_timestamps(),
+    )
+    op.create_table(
+        "orderbook_latest",
+        _instrument_pk(),
+        sa.Column("ts", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("update_id", sa.BigInteger(), nullable=True),
+        sa.Column("bids", json_type, nullable=False),
+        sa.Column("asks", json_type, nullable=False),
+        *_timestamps(),
+    )
+    # Seed tickers from history so reads work before the next push arrives
+    op.execute(
+        "INSERT INTO ticker_latest (instrument_id, ts, last, bid, ask, mid, spread_bps, "
+        'day_vol_quote, mark, "index") '
+        "SELECT t.instrument_id, t.ts, t.last, t.bid, t.ask, t.mid, t.spread_bps, "
+        't.day_vol_quote, t.mark, t."index" FROM ticker_rt t '
+        "JOIN (SELECT instrument_id, max(ts) AS ts FROM ticker_rt GROUP BY instrument_id) m "
+        "ON m.instrument_id = t.instrument_id AND m.ts = t.ts "
+        "WHERE t.id = (SELECT max(x.id) FROM ticker_rt x "
+        "WHERE x.instrument_id = t.instrument_id AND x.ts = t.ts)",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("orderbook_latest")
+    op.drop_table("ticker_latest")
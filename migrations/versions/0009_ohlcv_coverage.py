@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0009_ohlcv_coverage"
+down_revision = "0008_latest_state"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ohlcv_coverage",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "instrument_id",
+            sa.Integer(),
+            sa.ForeignKey("instruments.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("end", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False,
+        ),
+        sa.Column(
+            "updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_ohlcv_coverage_instr_start", "ohlcv_coverage", ["instrument_id", "start"],
+    )
+    if op.get_bind().dialect.name == "postgresql":
+        # Seed from existing candles: consecutive minutes share ts - row_number() minutes
+        op.execute(
+            'INSERT INTO ohlcv_coverage (instrument_id, start, "end") '
+            "SELECT instrument_id, min(ts), max(ts) + interval '1 minute' FROM ("
+            "  SELECT instrument_id, ts, ts - row_number() OVER ("
+            "    PARTITION BY instrument_id ORDER BY ts) * interval '1 minute' AS grp"
+            "  FROM ohlcv_1m"
+            ") runs GROUP BY instrument_id, grp",
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ohlcv_coverage_instr_start", table_name="ohlcv_coverage")
+    op.drop_table("ohlcv_coverage")
@@ -0,0 +1,110 @@
+"""Compare bulk-load paths for 1m OHLCV and trades: multi-row INSERT vs COPY + merge.
+
+Usage:
+    uv run python scripts/bench_bulk_load.py --db-url postgresql+asyncpg://... [--days 120]
+
+Loads `--days` of synthetic 1m candles (one instrument) and as many trades through the
+repositories twice, once with COPY disabled and once enabled (DB_COPY_MIN_ROWS, or 2000
+when unset), and prints rows/sec. COPY is off by default; enable it only where this shows
+a clear win.
+The target schema must be migrated; the benchmark instrument's rows are deleted first.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import delete  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.db.models import OHLCV1m, TradeRT  # noqa: E402
+from app.db.repositories.instruments import InstrumentsRepository  # noqa: E402
+from app.db.repositories.ohlcv import OhlcvRepository  # noqa: E402
+from app.db.repositories.trades import TradesRepository  # noqa: E402
+
+SYMBOL = "BENCH/USDT"
+
+
+def candles(days: int) -> list[dict]:
+    start = datetime(2025, 1, 1, tzinfo=UTC)
+    px = Decimal("100")
+    return [
+        {
+            "ts": start + timedelta(minutes=i),
+            "open": px,
+            "high": px + 1,
+            "low": px - 1,
+            "close": px,
+            "volume_base": Decimal("12.5"),
+            "turnover_quote": None,
+        }
+        for i in range(days * 1440)
+    ]
+
+
+def trades(n: int) -> list[dict]:
+    start = datetime(2025, 1, 1, tzinfo=UTC)
+    return [
+        {
+            "ts": start + timedelta(milliseconds=i * 250),
+            "px": Decimal("100.25"),
+            "qty": Decimal("0.013"),
+            "side": "buy" if i % 2 else "sell",
+            "trade_id": f"b{i}",
+        }
+        for i in range(n)
+    ]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", required=True)
+    parser.add_argument("--days", type=int, default=120)
+    args = parser.parse_args()
+
+    engine = create_async_engine(args.db_url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": SYMBOL}])
+        inst = await InstrumentsRepository(db).get_by_symbol(SYMBOL)
+        assert inst is not None
+        inst_id = inst.id
+
+    ohlcv_rows = candles(args.days)
+    trade_rows = trades(len(ohlcv_rows))
+    copy_min_rows = settings.db_copy_min_rows or 2_000
+    for label, min_rows in (("insert", 0), ("copy", copy_min_rows)):
+        settings.db_copy_min_rows = min_rows
+        async with session_factory() as db:
+            await db.execute(delete(OHLCV1m).where(OHLCV1m.instrument_id == inst_id))
+            await db.execute(delete(TradeRT).where(TradeRT.instrument_id == inst_id))
+            await db.commit()
+        for name, load, rows in (
+            (
+                "ohlcv_1m",
+                lambda db, r: OhlcvRepository(db).insert_ohlcv_rows(inst_id, r),
+                ohlcv_rows,
+            ),
+            ("trade_rt", lambda db, r: TradesRepository(db).insert_trades(inst_id, r), trade_rows),
+        ):
+            started = time.perf_counter()
+            async with session_factory() as db:
+                # One call with the whole batch, as a backfill would make; bulk_upsert
+                # chunks under the parameter cap itself
+                await load(db, rows)
+            elapsed = time.perf_counter() - started
+            print(f"{label:<7} {name:<9} rows={len(rows)} {len(rows) / elapsed:>12,.0f} rows/s")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
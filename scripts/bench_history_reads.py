@@ -0,0 +1,141 @@
+"""Compare history read paths for 1m OHLCV: ORM objects vs Core tuples vs columns.
+
+Usage:
+    uv run python scripts/bench_history_reads.py [--db-url URL] [--rows 10000] [--repeat 20]
+
+Seeds `--rows` synthetic candles for one instrument (skipped when already present), then
+times each read path `--repeat` times, including conversion to the API's
+[ts_ms, o, h, l, c, v] rows, and prints the median per read. Without `--db-url` a
+temporary SQLite file is used; a Postgres target must already be migrated.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+from typing import Any
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.repositories.instruments import InstrumentsRepository  # noqa: E402
+from app.db.repositories.ohlcv import CANDLE_COLUMNS, OhlcvRepository  # noqa: E402
+from app.db.rows import epoch_ms, to_columns  # noqa: E402
+
+SYMBOL = "BENCH/USDT"
+START = datetime(2025, 1, 1, tzinfo=UTC)
+
+
+def candles(n: int) -> list[dict]:
+    return [
+        {
+            "ts": START + timedelta(minutes=i),
+            "open": Decimal("100.5") + i % 7,
+            "high": Decimal("101.25") + i % 7,
+            "low": Decimal("99.75") + i % 7,
+            "close": Decimal("100.125") + i % 7,
+            "volume_base": Decimal("12.5"),
+        }
+        for i in range(n)
+    ]
+
+
+async def orm(db: AsyncSession, n: int) -> Any:
+    rows = await OhlcvRepository(db).fetch_ohlcv_1m(SYMBOL, START, None, n)
+    return [
+        [
+            epoch_ms(r.ts),
+            float(r.open),
+            float(r.high),
+            float(r.low),
+            float(r.close),
+            float(r.volume_base),
+        ]
+        for r in rows
+    ]
+
+
+async def core(db: AsyncSession, n: int) -> Any:
+    rows = await OhlcvRepository(db).fetch_ohlcv_1m_rows(SYMBOL, START, None, n)
+    return [
+        [epoch_ms(ts), float(o), float(h), float(lo), float(c), float(v)]
+        for ts, o, h, lo, c, v in rows
+    ]
+
+
+async def core_float(db: AsyncSession, n: int) -> Any:
+    rows = await OhlcvRepository(db).fetch_ohlcv_1m_rows(SYMBOL, START, None, n, as_float=True)
+    return [[epoch_ms(ts), o, h, lo, c, v] for ts, o, h, lo, c, v in rows]
+
+
+async def columns(db: AsyncSession, n: int) -> Any:
+    rows = await OhlcvRepository(db).fetch_ohlcv_1m_rows(SYMBOL, START, None, n, as_float=True)
+    return to_columns(rows, CANDLE_COLUMNS, floats=CANDLE_COLUMNS[1:])
+
+
+PATHS: dict[str, Callable[[AsyncSession, int], Awaitable[Any]]] = {
+    "orm": orm,
+    "core": core,
+    "core_float": core_float,
+    "columns": columns,
+}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    tmp = None
+    db_url = args.db_url
+    if db_url is None:
+        tmp = tempfile.TemporaryDirectory()
+        db_url = f"sqlite+aiosqlite:///{tmp.name}/bench.db"
+    engine = create_async_engine(db_url)
+    if tmp is not None:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": SYMBOL}])
+        inst = await InstrumentsRepository(db).get_by_symbol(SYMBOL)
+        assert inst is not None
+        rows = candles(args.rows)
+        for i in range(0, len(rows), 4_000):
+            await OhlcvRepository(db).insert_ohlcv_rows(inst.id, rows[i : i + 4_000])
+
+    for name, read in PATHS.items():
+        timings = []
+        for _ in range(args.repeat):
+            # Fresh session per read, as in a request: no warm identity map
+            async with session_factory() as db:
+                started = time.perf_counter()
+                await read(db, args.rows)
+                timings.append(time.perf_counter() - started)
+        median = statistics.median(timings)
+        print(
+            f"{name:<11} rows={args.rows} {median * 1000:>9.2f} ms {args.rows / median:>12,.0f} rows/s"
+        )
+    await engine.dispose()
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+"""Micro-benchmark for BookSide level updates: bisect + list vs an O(log n) ordered map.
+
+Usage:
+    uv run python scripts/bench_orderbook.py [--depths 50,500,5000] [--updates 200000]
+
+Seeds a side with `depth` levels, then applies `--updates` synthetic delta levels
+(a third of them deletions, the rest inserts or quantity changes around the book) and
+reads the best level after each one, as the WS handler does. `BookSide` is compared with
+`sortedcontainers.SortedDict` when that package is installed, and with a heap with lazy
+deletion otherwise (both O(log n) per update). Prints updates/sec per depth.
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import os
+import random
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from decimal import Decimal
+from typing import Any
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.market_data.orderbook import BookSide  # noqa: E402
+
+try:
+    from sortedcontainers import SortedDict
+except ImportError:  # pragma: no cover - optional
+    SortedDict = None
+
+Level = tuple[Decimal, Decimal]
+
+
+def updates(depth: int, n: int, seed: int = 1) -> tuple[list[Level], list[Level]]:
+    rng = random.Random(seed)
+    base = Decimal(30_000)
+    tick = Decimal("0.1")
+    seeded = [(base - i * tick, Decimal(1)) for i in range(depth)]
+    deltas = [
+        (base - rng.randint(0, depth * 2) * tick, Decimal(rng.choice((0, 1, 2)))) for _ in range(n)
+    ]
+    return seeded, deltas
+
+
+def run_book_side(seeded: list[Level], deltas: list[Level]) -> float:
+    side = BookSide(descending=True)
+    for px, qty in seeded:
+        side.set(px, qty)
+    started = time.perf_counter()
+    for px, qty in deltas:
+        side.set(px, qty)
+        side.best()
+    return time.perf_counter() - started
+
+
+def run_sorted_dict(seeded: list[Level], deltas: list[Level]) -> float:
+    levels: Any = SortedDict(seeded)
+    started = time.perf_counter()
+    for px, qty in deltas:
+        if qty:
+            levels[px] = qty
+        else:
+            levels.pop(px, None)
+        if levels:
+            levels.peekitem(-1)
+    return time.perf_counter() - started
+
+
+def run_lazy_heap(seeded: list[Level], deltas: list[Level]) -> float:
+    qty_at = dict(seeded)
+    heap = [-px for px in qty_at]
+    heapq.heapify(heap)
+    started = time.perf_counter()
+    for px, qty in deltas:
+        if qty:
+            if px not in qty_at:
+                heapq.heappush(heap, -px)
+            qty_at[px] = qty
+        else:
+            qty_at.pop(px, None)
+        # Deleted prices stay in the heap until they surface at the top
+        while heap and -heap[0] not in qty_at:
+            heapq.heappop(heap)
+    return time.perf_counter() - started
+
+
+def bench(
+    run: Callable[[list[Level], list[Level]], float], depth: int, n: int, repeat: int
+) -> float:
+    seeded, deltas = updates(depth, n)
+    return n / statistics.median(run(seeded, deltas) for _ in range(repeat))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depths", default="50,500,5000")
+    parser.add_argument("--updates", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    other, name = (
+        (run_sorted_dict, "SortedDict") if SortedDict is not None else (run_lazy_heap, "lazy heap")
+    )
+    print(f"updates={args.updates} repeat={args.repeat}")
+    for depth in (int(d) for d in args.depths.split(",")):
+        ours = bench(run_book_side, depth, args.updates, args.repeat)
+        theirs = bench(other, depth, args.updates, args.repeat)
+        print(
+            f"depth={depth:<6} BookSide {ours:>12,.0f} u/s   {name} {theirs:>12,.0f} u/s"
+            f"  ({ours / theirs:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
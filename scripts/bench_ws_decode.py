@@ -0,0 +1,320 @@
+"""Micro-benchmark for the Bybit WS frame path: decode + dispatch, frames/sec.
+
+Usage:
+    uv run python scripts/bench_ws_decode.py [--frames FILE] [--repeat N]
+
+FILE holds one raw WS frame per line (optionally gzip-compressed). Without it, a
+synthetic mix shaped like Bybit spot tickers / orderbook.50 deltas / publicTrade
+frames is used. `legacy` is the handler as it was before lazy conversion: json.loads,
+then Decimal parsing of every ticker price, book level and trade in the handlers.
+Both handlers run decode + dispatch on the same frames with the symbol resolved, so
+book updates and writer hand-offs are included on both sides.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import UTC, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.db.models import OBSide  # noqa: E402
+from app.services.market_data.cache import MarketCache  # noqa: E402
+from app.services.market_data.ccxt_adapter import to_ccxt_symbol  # noqa: E402
+from app.services.market_data.decoding import get_decoder, orjson  # noqa: E402
+from app.services.market_data.ws_bybit import BybitWs  # noqa: E402
+
+
+class _NullQueue:
+    async def put(self, row: Any) -> None:
+        return None
+
+
+class _NullPublisher:
+    def mark(self, inst_id: int, book: Any) -> None:
+        return None
+
+
+class _NullWriters:
+    tickers = _NullQueue()
+    orderbook = _NullQueue()
+    trades = _NullQueue()
+    ticker_conflator = _NullQueue()
+    book_publisher = _NullPublisher()
+
+    async def put_levels(self, *args: Any, **kwargs: Any) -> None:
+        return None
+
+
+class _Registry:
+    def get(self, symbol: str) -> int | None:
+        return 1
+
+
+class LegacyBybitWs(BybitWs):
+    """The pre-lazy handlers: every price and qty becomes a Decimal on arrival."""
+
+    async def _process_ticker(self, d: dict[str, Any]) -> None:
+        symbol_ws = d.get("symbol")
+        if not symbol_ws:
+            return
+        symbol = to_ccxt_symbol(symbol_ws)
+        bid = Decimal(d.get("bid1Price") or d.get("bidPrice") or 0)
+        ask = Decimal(d.get("ask1Price") or d.get("askPrice") or 0)
+        last = Decimal(d.get("lastPrice") or 0)
+        mid = (bid + ask) / Decimal(2) if bid and ask else last
+        spread_bps = (ask - bid) / mid * Decimal(10_000) if bid and ask and mid else Decimal(0)
+        row = {
+            "ts": datetime.now(UTC),
+            "last": last,
+            "bid": bid,
+            "ask": ask,
+            "mid": mid,
+            "spread_bps": spread_bps,
+            "day_vol_quote": None,
+        }
+        await self._cache.set_ticker(symbol, row)  # type: ignore[arg-type]
+        inst_id = self._registry.get(symbol)
+        if inst_id is None:
+            return
+        await self._writers.tickers.put({**row, "instrument_id": inst_id})
+
+    async def _process_ob_snapshot(self, data: dict[str, Any], ts: datetime) -> None:
+        symbol = to_ccxt_symbol(data.get("s") or data.get("symbol"))
+        bids = [(Decimal(px), Decimal(qty)) for px, qty in data.get("b", [])]
+        asks = [(Decimal(px), Decimal(qty)) for px, qty in data.get("a", [])]
+        snapshot_id = str(uuid.uuid4())
+        self._cache.book(symbol).apply_snapshot(bids, asks, data.get("u"), ts)
+        inst_id = self._registry.get(symbol)
+        if inst_id is None:
+            return
+        await self._legacy_levels(inst_id, ts, bids, asks, snapshot_id=snapshot_id)
+
+    async def _process_ob_delta(self, data: dict[str, Any], ts: datetime) -> None:
+        symbol = to_ccxt_symbol(data.get("s") or data.get("symbol"))
+        update_id = data.get("u")
+        bids = [(Decimal(px), Decimal(qty)) for px, qty in data.get("b", [])]
+        asks = [(Decimal(px), Decimal(qty)) for px, qty in data.get("a", [])]
+        if not self._cache.book(symbol).apply_delta(bids, asks, update_id, ts):
+            return
+        inst_id = self._registry.get(symbol)
+        if inst_id is None:
+            return
+        await self._legacy_levels(inst_id, ts, bids, asks, update_id=update_id)
+
+    async def _legacy_levels(
+        self,
+        inst_id: int,
+        ts: datetime,
+        bids: list[tuple[Decimal, Decimal]],
+        asks: list[tuple[Decimal, Decimal]],
+        *,
+        snapshot_id: str | None = None,
+        update_id: int | None = None,
+    ) -> None:
+        for side, levels in ((OBSide.bid, bids), (OBSide.ask, asks)):
+            for px, qty in levels:
+                await self._writers.orderbook.put(
+                    {
+                        "instrument_id": inst_id,
+                        "ts": ts,
+                        "side": side,
+                        "px": px,
+                        "qty": qty,
+                        "snapshot_id": snapshot_id,
+                        "update_id": update_id,
+                    },
+                )
+
+    async def _on_trade(self, msg: dict[str, Any]) -> None:
+        for t in msg.get("data") or []:
+            sym = to_ccxt_symbol(t.get("s") or t.get("symbol"))
+            inst_id = self._registry.get(sym)
+            if inst_id is None:
+                continue
+            await self._writers.trades.put(
+                {
+                    "instrument_id": inst_id,
+                    "ts": datetime.fromtimestamp((t.get("T") or 0) / 1000, tz=UTC),
+                    "px": Decimal(t.get("p") or t.get("price") or 0),
+                    "qty": Decimal(t.get("q") or t.get("qty") or 0),
+                    "side": (t.get("S") or t.get("side") or "").lower(),
+                    "trade_id": str(t.get("i") or t.get("tradeId") or t.get("id")),
+                },
+            )
+
+
+def synthetic_frames(n: int = 20_000) -> list[str]:
+    rnd = random.Random(7)
+    frames: list[str] = []
+    u = 1
+    px = 65_000.0
+    frames.append(
+        json.dumps(
+            {
+                "topic": "orderbook.50.BTCUSDT",
+                "type": "snapshot",
+                "ts": 1,
+                "data": {
+                    "s": "BTCUSDT",
+                    "b": [[f"{px - i * 0.1:.2f}", "1.000"] for i in range(50)],
+                    "a": [[f"{px + 0.1 + i * 0.1:.2f}", "1.000"] for i in range(50)],
+                    "u": u,
+                },
+            },
+        ),
+    )
+    for i in range(n):
+        kind = rnd.random()
+        if kind < 0.6:
+            u += 1
+            levels = [
+                [f"{px + rnd.randint(-50, 50) * 0.1:.2f}", f"{rnd.choice([0, rnd.random()]):.6f}"]
+                for _ in range(rnd.randint(1, 8))
+            ]
+            frames.append(
+                json.dumps(
+                    {
+                        "topic": "orderbook.50.BTCUSDT",
+                        "type": "delta",
+                        "ts": i,
+                        "data": {
+                            "s": "BTCUSDT",
+                            "b": [lv for lv in levels if float(lv[0]) <= px],
+                            "a": [lv for lv in levels if float(lv[0]) > px],
+                            "u": u,
+                        },
+                    },
+                ),
+            )
+        elif kind < 0.85:
+            frames.append(
+                json.dumps(
+                    {
+                        "topic": "publicTrade.BTCUSDT",
+                        "ts": i,
+                        "data": [
+                            {
+                                "T": i,
+                                "s": "BTCUSDT",
+                                "S": rnd.choice(["Buy", "Sell"]),
+                                "v": f"{rnd.random():.6f}",
+                                "p": f"{px + rnd.randint(-5, 5) * 0.1:.2f}",
+                                "i": str(i),
+                                "q": f"{rnd.random():.6f}",
+                            }
+                            for _ in range(rnd.randint(1, 5))
+                        ],
+                    },
+                ),
+            )
+        else:
+            frames.append(
+                json.dumps(
+                    {
+                        "topic": "tickers.BTCUSDT",
+                        "ts": i,
+                        "data": {
+                            "symbol": "BTCUSDT",
+                            "lastPrice": f"{px:.2f}",
+                            "bid1Price": f"{px - 0.1:.2f}",
+                            "ask1Price": f"{px + 0.1:.2f}",
+                        },
+                    },
+                ),
+            )
+    return frames
+
+
+def load_frames(path: Path) -> list[str]:
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as fh:  # type: ignore[operator]
+        # Recorder segments prefix each frame with "<recv_ns>\t"; plain dumps do not
+        return [line.rstrip("\n").split("\t", 1)[-1] for line in fh if line.strip()]
+
+
+def _eager_decimals(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        return {k: _eager_decimals(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_eager_decimals(v) for v in obj]
+    if isinstance(obj, str):
+        try:
+            return Decimal(obj)
+        except ArithmeticError:
+            return obj
+    return obj
+
+
+def bench_decode_only(frames: list[str], decode: Any, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for raw in frames:
+            decode(raw)
+    return len(frames) * repeat / (time.perf_counter() - started)
+
+
+def bench_legacy_decode(frames: list[str], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for raw in frames:
+            msg = json.loads(raw)
+            _eager_decimals(msg.get("data"))
+    return len(frames) * repeat / (time.perf_counter() - started)
+
+
+async def bench_handler(frames: list[str], ws: BybitWs, repeat: int) -> float:
+    """Frames/sec through decode + dispatch (metrics and recording excluded on both sides)."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for raw in frames:
+            msg = ws._decode(raw)
+            try:
+                await ws._dispatch(msg)
+            except Exception:
+                # Gaps are expected when replaying a capture more than once
+                continue
+    return len(frames) * repeat / (time.perf_counter() - started)
+
+
+def _handler(cls: type[BybitWs], decoder: str) -> BybitWs:
+    ws = cls(MarketCache(), _NullWriters(), _Registry())  # type: ignore[arg-type]
+    ws._decode = get_decoder(decoder)
+    return ws
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=Path, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames) if args.frames else synthetic_frames()
+    decoders = ["json"] + (["orjson"] if orjson is not None else [])
+    print(f"frames={len(frames)} repeat={args.repeat}")
+    legacy = asyncio.run(bench_handler(frames, _handler(LegacyBybitWs, "json"), args.repeat))
+    print(f"{'legacy json + eager Decimal handler':<40} {legacy:>12,.0f} f/s")
+    for name in decoders:
+        rate = asyncio.run(bench_handler(frames, _handler(BybitWs, name), args.repeat))
+        print(f"{name + ' + lazy handler':<40} {rate:>12,.0f} f/s  ({rate / legacy:.2f}x)")
+    # Decode alone, for attributing the difference
+    rate = bench_legacy_decode(frames, args.repeat)
+    print(f"{'legacy json + Decimal (decode only)':<40} {rate:>12,.0f} f/s")
+    for name in decoders:
+        rate = bench_decode_only(frames, get_decoder(name), args.repeat)
+        print(f"{name + ' (decode only)':<40} {rate:>12,.0f} f/s")
+
+
+if __name__ == "__main__":
+    main()
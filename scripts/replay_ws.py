@@ -0,0 +1,101 @@
+"""Replay recorded Bybit WS frames through the ingestion handlers and a real database.
+
+Usage:
+    uv run python scripts/replay_ws.py SEGMENT [SEGMENT ...] [--speed N] [--db-url URL]
+
+SEGMENT is a file written by WS_RECORD_DIR (or a directory of them). --speed 1 keeps
+the recorded pacing, N replays N times faster and 0 as fast as possible. The default
+database is a throwaway SQLite file; pass a postgresql+asyncpg URL to measure against
+a local Postgres (its schema must be migrated). No network access is needed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.repositories.instruments import InstrumentsRepository  # noqa: E402
+from app.services.market_data.cache import MarketCache  # noqa: E402
+from app.services.market_data.ccxt_adapter import to_ccxt_symbol  # noqa: E402
+from app.services.market_data.instrument_registry import InstrumentRegistry  # noqa: E402
+from app.services.market_data.recording import (  # noqa: E402
+    iter_segments,
+    replay,
+    segment_paths,
+)
+from app.services.market_data.write_behind import MarketDataWriters  # noqa: E402
+from app.services.market_data.ws_bybit import BybitWs, topic_labels  # noqa: E402
+
+
+def _paths(args: list[Path]) -> list[Path]:
+    out: list[Path] = []
+    for p in args:
+        out.extend(segment_paths(p) if p.is_dir() else [p])
+    return out
+
+
+def _symbols(paths: list[Path]) -> list[str]:
+    seen: set[str] = set()
+    for _, raw in iter_segments(paths):
+        topic = json.loads(raw).get("topic")
+        if topic:
+            seen.add(to_ccxt_symbol(topic_labels(topic)[1]))
+    return sorted(seen)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("segments", nargs="+", type=Path)
+    parser.add_argument("--speed", type=float, default=0.0)
+    parser.add_argument("--db-url", default=None)
+    args = parser.parse_args()
+
+    paths = _paths(args.segments)
+    db_url = args.db_url or f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/replay.db"
+    engine = create_async_engine(db_url)
+    if db_url.startswith("sqlite"):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    registry = InstrumentRegistry()
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many({"symbol": s} for s in _symbols(paths))
+        await registry.refresh(db)
+
+    writers = MarketDataWriters.from_settings(session_factory)
+    writers.start()
+    ws = BybitWs(MarketCache(), writers, registry)
+    started = time.perf_counter()
+    frames = await replay(ws, iter_segments(paths), speed=args.speed or None)
+    handled = time.perf_counter() - started
+    await writers.close()
+    total = time.perf_counter() - started
+    await engine.dispose()
+
+    print(f"db={db_url} symbols={len(registry)} frames={frames}")
+    print(f"handlers: {handled:.2f}s {frames / handled:,.0f} f/s")
+    print(f"incl. final flush: {total:.2f}s {frames / total:,.0f} f/s")
+    st = ws.stats
+    print(f"handler_errors={st.handler_errors} resyncs={st.resyncs}")
+    for w in writers.all():
+        s = w.stats
+        print(
+            f"writer={w.name} written={s.written} dropped={s.dropped} flushes={s.flushes} "
+            f"failed={s.failed_flushes} last_flush_ms={s.last_flush_ms:.1f}",
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db import bulk
+from app.db.models import Instrument
+from app.db.repositories.instruments import InstrumentsRepository
+from app.db.repositories.ohlcv import OhlcvRepository
+from app.db.repositories.trades import TradesRepository
+
+
+def test_chunk_size_respects_parameter_cap() -> None:
+    assert bulk.chunk_size("postgresql", 8) == 32_767 // 8
+    assert bulk.chunk_size("sqlite", 8) * 8 <= bulk.max_params("sqlite")
+
+
+async def test_trades_and_candles_upsert_on_sqlite(
+    session_factory: async_sessionmaker[AsyncSession],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # Force several chunks so the per-chunk counts are exercised
+    monkeypatch.setattr(bulk, "_SQLITE_MAX_PARAMS", 12)
+    t0 = datetime(2026, 1, 1, tzinfo=UTC)
+    trades = [
+        {"ts": t0, "px": Decimal("1"), "qty": Decimal("2"), "side": "buy", "trade_id": f"t{i}"}
+        for i in range(5)
+    ]
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        repo = TradesRepository(db)
+        assert await repo.insert_trades(1, trades[:3]) == bulk.BulkResult(written=3, skipped=0)
+        assert await repo.insert_trades(1, trades) == bulk.BulkResult(written=2, skipped=3)
+        assert len(await repo.get_recent("BTC/USDT")) == 5
+
+        candles = [
+            {
+                "ts": t0 + timedelta(minutes=i),
+                "open": 1,
+                "high": 1,
+                "low": 1,
+                "close": 1,
+                "volume_base": 1,
+            }
+            for i in range(4)
+        ]
+        ohlcv = OhlcvRepository(db)
+        assert (await ohlcv.insert_ohlcv_rows(1, candles)).written == 4
+        assert (await ohlcv.insert_ohlcv_rows(1, candles)).skipped == 4
+
+
+async def test_bulk_upsert_updates_selected_columns(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        res = await bulk.bulk_upsert(
+            db,
+            Instrument,
+            [
+                {
+                    "symbol": "BTC/USDT",
+                    "venue": "bybit",
+                    "base_asset": "BTC",
+                    "quote_asset": "USDT",
+                    "exchange": "bybit",
+                    "price_scale": 2,
+                },
+            ],
+            ["venue", "symbol"],
+            ["price_scale"],
+        )
+        await db.commit()
+        assert res.written == 1
+        scale = await db.scalar(select(Instrument.price_scale))
+        assert scale == 2
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.copy import _records, copy_supported
+from app.db.models import TradeSide
+
+
+def test_copy_records_follow_column_order_and_unwrap_enums() -> None:
+    rows = [{"trade_id": "t1", "side": TradeSide.buy, "qty": 1}]
+    assert _records(rows, ["side", "trade_id", "px"]) == [("buy", "t1", None)]
+
+
+async def test_copy_path_is_postgres_only(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    async with session_factory() as db:
+        assert not copy_supported(db, 1_000_000)
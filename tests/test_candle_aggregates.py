@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.repositories.configs import ConfigsRepository
+from app.db.repositories.instruments import InstrumentsRepository
+from app.db.repositories.ohlcv import OhlcvRepository
+from app.services.market_data.candles import (
+    AGG_LOCK_NAMESPACE,
+    bucket_start,
+    lock_aggregates,
+    rebuild_aggregates,
+    refresh_aggregates,
+)
+
+
+def _candle(ts: datetime, close: int) -> dict[str, object]:
+    px = Decimal(close)
+    return {"ts": ts, "open": px, "high": px + 1, "low": px - 1, "close": px, "volume_base": 2}
+
+
+def test_buckets_align_to_utc_midnight() -> None:
+    ts = datetime(2026, 3, 1, 5, 59, tzinfo=UTC)
+    assert bucket_start(ts, 240) == datetime(2026, 3, 1, 4, 0, tzinfo=UTC)
+    assert bucket_start(ts, 15) == datetime(2026, 3, 1, 5, 45, tzinfo=UTC)
+    assert bucket_start(ts, 1440) == datetime(2026, 3, 1, tzinfo=UTC)
+
+
+async def test_incremental_refresh_and_backfill_rebuild(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    t0 = datetime(2026, 3, 1, tzinfo=UTC)
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        repo = OhlcvRepository(db)
+        await repo.insert_ohlcv_rows(
+            1, [_candle(t0 + timedelta(minutes=i), 100 + i) for i in range(7)]
+        )
+        assert await refresh_aggregates(db, 1) > 0
+
+        five = await repo.fetch_aggregates("BTC/USDT", "5m", None, None)
+        assert [(c.open, c.close, c.high, c.volume_base, c.minutes) for c in five] == [
+            (100, 104, 105, 10, 5),
+            (105, 106, 107, 4, 2),
+        ]
+
+        # New minutes extend the open bucket; nothing new means nothing to do
+        await repo.insert_ohlcv_rows(1, [_candle(t0 + timedelta(minutes=7), 90)])
+        await refresh_aggregates(db, 1)
+        assert await refresh_aggregates(db, 1) == 0
+        # A backfill before the watermark is folded in by an explicit range rebuild
+        await repo.insert_ohlcv_rows(1, [_candle(t0 - timedelta(minutes=1), 50)])
+        await rebuild_aggregates(db, 1, t0 - timedelta(minutes=1), t0 - timedelta(minutes=1))
+        await db.commit()
+
+    async with session_factory() as db:
+        repo = OhlcvRepository(db)
+        five = await repo.fetch_aggregates("BTC/USDT", "5m", t0 + timedelta(minutes=5), None)
+        assert [(c.close, c.low, c.minutes) for c in five] == [(90, 89, 3)]
+        day = await repo.fetch_aggregates("BTC/USDT", "1d", None, None)
+        assert [(c.ts.day, c.close) for c in day] == [(28, 50), (1, 90)]
+
+
+async def test_refresh_reads_only_minutes_past_the_watermark(
+    session_factory: async_sessionmaker[AsyncSession],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    t0 = datetime(2026, 3, 1, 10, tzinfo=UTC)
+    reads: list[tuple[datetime, datetime]] = []
+    fetch = OhlcvRepository.fetch_1m_rows
+
+    async def spy(self: OhlcvRepository, instrument_id: int, start: datetime, end: datetime) -> Any:
+        reads.append((start, end))
+        return await fetch(self, instrument_id, start, end)
+
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        repo = OhlcvRepository(db)
+        await repo.insert_ohlcv_rows(1, [_candle(t0 + timedelta(minutes=i), 100) for i in range(3)])
+        await refresh_aggregates(db, 1)
+        monkeypatch.setattr(OhlcvRepository, "fetch_1m_rows", spy)
+        for i in range(3, 6):
+            await repo.insert_ohlcv_rows(1, [_candle(t0 + timedelta(minutes=i), 100 + i)])
+            await refresh_aggregates(db, 1)
+        incremental = {
+            tf: [(c.ts, c.open, c.high, c.low, c.close, c.volume_base, c.minutes) for c in rows]
+            for tf in ("5m", "1h", "1d")
+            if (rows := await repo.fetch_aggregates("BTC/USDT", tf, None, None))
+        }
+
+        # Each refresh read just the new minute, not the 1d bucket's whole day
+        assert reads == [
+            (t0 + timedelta(minutes=i), t0 + timedelta(minutes=i + 1)) for i in range(3, 6)
+        ]
+        await rebuild_aggregates(db, 1, t0, t0 + timedelta(minutes=5))
+        rebuilt = {
+            tf: [(c.ts, c.open, c.high, c.low, c.close, c.volume_base, c.minutes) for c in rows]
+            for tf in ("5m", "1h", "1d")
+            if (rows := await repo.fetch_aggregates("BTC/USDT", tf, None, None))
+        }
+    assert incremental == rebuilt
+    assert incremental["1d"][0][1:] == (100, 106, 99, 105, 12, 6)
+
+
+async def test_failed_refresh_keeps_buckets_and_watermark_together(
+    session_factory: async_sessionmaker[AsyncSession],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    t0 = datetime(2026, 3, 1, 10, tzinfo=UTC)
+    put = ConfigsRepository.put
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        repo = OhlcvRepository(db)
+        await repo.insert_ohlcv_rows(1, [_candle(t0 + timedelta(minutes=i), 100) for i in range(3)])
+        await refresh_aggregates(db, 1)
+        await repo.insert_ohlcv_rows(1, [_candle(t0 + timedelta(minutes=3), 100)])
+
+        async def fail(*args: Any) -> None:
+            raise RuntimeError("watermark write failed")
+
+        monkeypatch.setattr(ConfigsRepository, "put", fail)
+        with pytest.raises(RuntimeError):
+            await refresh_aggregates(db, 1)
+        await db.rollback()
+        monkeypatch.setattr(ConfigsRepository, "put", put)
+        await refresh_aggregates(db, 1)
+
+    async with session_factory() as db:
+        repo = OhlcvRepository(db)
+        for tf in ("5m", "1d"):
+            buckets = await repo.fetch_aggregates("BTC/USDT", tf, None, None)
+            assert [(c.minutes, c.volume_base) for c in buckets] == [(4, 8)]
+
+
+async def test_bucket_writers_take_the_instrument_lock_on_postgres() -> None:
+    executed: list[str] = []
+
+    class PgSession:
+        def get_bind(self) -> Any:
+            return SimpleNamespace(dialect=postgresql.dialect())
+
+        async def execute(self, stmt: Any) -> None:
+            sql = stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+            executed.append(str(sql))
+
+    db: Any = PgSession()
+    await lock_aggregates(db, 7)
+    assert len(executed) == 1
+    assert f"pg_advisory_xact_lock({AGG_LOCK_NAMESPACE}, 7)" in executed[0]
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import asyncio
+from decimal import Decimal
+from typing import Any
+
+import ccxt.async_support as ccxt
+import pytest
+
+from app.services.market_data import ccxt_adapter
+from app.services.market_data.ccxt_adapter import close_ccxt_adapters, get_ccxt_adapter
+
+
+class FakeClient:
+    precisionMode = ccxt.TICK_SIZE
+
+    def __init__(self) -> None:
+        self.markets: dict[str, Any] | None = None
+        self.loads: list[bool] = []
+        self.closed = False
+
+    async def load_markets(self, reload: bool = False) -> dict[str, Any]:
+        self.loads.append(reload)
+        await asyncio.sleep(0)
+        self.markets = {
+            "BTC/USDT": {
+                "spot": True,
+                "quote": "USDT",
+                "precision": {"price": 0.01, "amount": 1e-06},
+                "maker": 0.001,
+                "taker": 0.001,
+                "limits": {"cost": {"min": 5}},
+            },
+        }
+        return self.markets
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+async def test_pool_shares_one_client_and_markets(monkeypatch: pytest.MonkeyPatch) -> None:
+    adapter = get_ccxt_adapter("bybit")
+    assert get_ccxt_adapter("bybit") is adapter
+    await adapter.close()
+    client = FakeClient()
+    monkeypatch.setattr(adapter, "_client", client)
+
+    # Concurrent first use loads once; later calls hit the cache until the TTL expires
+    await asyncio.gather(*(adapter.markets() for _ in range(5)))
+    await adapter.fetch_markets_spot()
+    assert client.loads == [False]
+    monkeypatch.setattr(ccxt_adapter.settings, "ccxt_markets_ttl_sec", 0)
+    await adapter.markets()
+    assert client.loads == [False, True]
+
+    [row] = await adapter.fetch_markets_spot()
+    # Tick-size precision is a step, not a digit count
+    assert (row["tick_size"], row["price_scale"]) == (Decimal("0.01"), 2)
+    assert (row["lot_size"], row["qty_scale"]) == (Decimal("0.000001"), 6)
+
+    await close_ccxt_adapters()
+    assert client.closed
+    assert get_ccxt_adapter("bybit") is not adapter
+    await close_ccxt_adapters()
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.services.market_data.conflation import TickerConflator
+from app.services.market_data.decoding import RawTicker
+from app.services.market_data.write_behind import WriteBehindQueue
+
+
+def _ticker(last: str) -> RawTicker:
+    return RawTicker(ts=datetime.now(UTC), last_raw=last, bid_raw="1", ask_raw="2")
+
+
+async def _noop(_: AsyncSession, rows: list[tuple[int, RawTicker]]) -> None:
+    return None
+
+
+def _sink(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> WriteBehindQueue[tuple[int, RawTicker]]:
+    return WriteBehindQueue(
+        "t", session_factory, _noop, max_rows=10, max_delay_ms=10, max_queue=100
+    )
+
+
+async def test_change_mode_skips_unchanged(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    sink = _sink(session_factory)
+    conflator = TickerConflator(sink, "change", 1000)
+    for last in ["10", "10", "11", "11", "10"]:
+        await conflator.put((1, _ticker(last)))
+    await conflator.put((2, _ticker("10")))
+    assert sink.qsize() == 4
+    assert conflator.stats.suppressed == 2
+
+
+async def test_interval_mode_keeps_latest_per_instrument(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    sink = _sink(session_factory)
+    conflator = TickerConflator(sink, "interval", 60_000)
+    conflator.start()
+    for last in ["10", "11", "12"]:
+        await conflator.put((1, _ticker(last)))
+    await conflator.put((2, _ticker("5")))
+    assert sink.qsize() == 0
+
+    await conflator.close()
+    assert sink.qsize() == 2
+    assert conflator.stats.persisted == 2
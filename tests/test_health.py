@@ -2,8 +2,11 @@ from __future__ import annotations
 
 import pytest
 from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.db.session import get_session
 from app.main import app
+from app.services.market_data.heartbeat import publish_heartbeat
 
 
 @pytest.mark.asyncio
@@ -17,3 +20,38 @@ async def test_health_smoke(monkeypatch: pytest.MonkeyPatch) -> None:
     assert health.status_code == 200
     assert health.json()["status"] == "ok"
     await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_renders_prometheus_text() -> None:
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get("/api/v1/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert "# TYPE ws_messages_total counter" in resp.text
+    assert "# TYPE db_flush_seconds histogram" in resp.text
+
+
+@pytest.mark.asyncio
+async def test_ready_reports_heartbeat_from_ingest_process(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    async def session():  # type: ignore[no-untyped-def]
+        async with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_session] = session
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            assert (await client.get("/api/v1/ready")).json()["ingestion"] is None
+            # Published by the ingester, which runs in another process
+            async with session_factory() as db:
+                await publish_heartbeat(db, {"shards": 2, "lag_ms": 12.5})
+            ingestion = (await client.get("/api/v1/ready")).json()["ingestion"]
+    finally:
+        app.dependency_overrides.pop(get_session, None)
+    assert ingestion["shards"] == 2
+    assert ingestion["lag_ms"] == 12.5
+    assert ingestion["stale"] is False
+    assert ingestion["heartbeat_age_s"] >= 0
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import json
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.routes import candles as candles_routes
+from app.db.cursors import InvalidCursor
+from app.db.repositories.instruments import InstrumentsRepository
+from app.db.repositories.ohlcv import OhlcvRepository
+from app.db.repositories.trades import TradesRepository
+from app.main import app
+
+T0 = datetime(2026, 3, 1, tzinfo=UTC)
+
+
+async def _seed(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        await OhlcvRepository(db).insert_ohlcv_rows(
+            1,
+            [
+                {
+                    "ts": T0 + timedelta(minutes=i),
+                    "open": Decimal(i),
+                    "high": Decimal(i),
+                    "low": Decimal(i),
+                    "close": Decimal(i),
+                    "volume_base": Decimal("0.5"),
+                }
+                for i in range(5)
+            ],
+        )
+        # Pairs of trades share a timestamp, so paging must not rely on ts alone
+        await TradesRepository(db).insert_trades(
+            1,
+            [
+                {
+                    "ts": T0 + timedelta(seconds=i // 2),
+                    "px": Decimal("100"),
+                    "qty": Decimal(i + 1),
+                    "side": "buy",
+                    "trade_id": f"t{i}",
+                }
+                for i in range(5)
+            ],
+        )
+
+
+async def test_keyset_pages_cover_everything_once(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    await _seed(session_factory)
+    async with session_factory() as db:
+        seen, cursor = [], None
+        while True:
+            rows, cursor = await OhlcvRepository(db).fetch_ohlcv_1m_page(
+                "BTC/USDT",
+                None,
+                None,
+                2,
+                cursor,
+            )
+            seen.extend(int(r.close) for r in rows)
+            if cursor is None:
+                break
+        assert seen == [0, 1, 2, 3, 4]
+
+        trade_ids, cursor = [], None
+        while True:
+            page, cursor = await TradesRepository(db).get_trades_page(
+                "BTC/USDT",
+                None,
+                None,
+                2,
+                cursor,
+            )
+            trade_ids.extend(r.trade_id for r in page)
+            if cursor is None:
+                break
+        assert trade_ids == ["t0", "t1", "t2", "t3", "t4"]
+
+        with pytest.raises(InvalidCursor):
+            await TradesRepository(db).get_trades_page("BTC/USDT", None, None, 2, "bogus")
+
+
+async def test_export_streams_ndjson_and_csv(
+    session_factory: async_sessionmaker[AsyncSession],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    await _seed(session_factory)
+    monkeypatch.setattr(candles_routes, "get_read_session_factory", lambda: session_factory)
+    monkeypatch.setattr(candles_routes.settings, "export_chunk_rows", 2)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        resp = await client.get(
+            "/api/v1/candles/export",
+            params={"symbol": "BTC/USDT", "start": (T0 + timedelta(minutes=1)).isoformat()},
+        )
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in resp.text.splitlines()]
+        assert [row["close"] for row in lines] == ["1", "2", "3", "4"]
+        assert lines[0]["ts"] == int((T0 + timedelta(minutes=1)).timestamp() * 1000)
+
+        resp = await client.get(
+            "/api/v1/candles/export",
+            params={"symbol": "BTC/USDT", "format": "csv"},
+        )
+        lines = resp.text.splitlines()
+        assert lines[0] == "ts,open,high,low,close,volume_base"
+        assert len(lines) == 6
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from array import array
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.repositories.instruments import InstrumentsRepository
+from app.db.repositories.ohlcv import CANDLE_COLUMNS, OhlcvRepository
+from app.db.repositories.trades import TradesRepository
+from app.db.rows import to_columns
+
+
+async def test_tuple_paths_match_orm(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    t0 = datetime(2026, 3, 1, tzinfo=UTC)
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        repo = OhlcvRepository(db)
+        await repo.insert_ohlcv_rows(
+            1,
+            [
+                {
+                    "ts": t0 + timedelta(minutes=i),
+                    "open": Decimal("100.5"),
+                    "high": Decimal("101"),
+                    "low": Decimal("99.25"),
+                    "close": Decimal(100 + i),
+                    "volume_base": Decimal("2"),
+                }
+                for i in range(3)
+            ],
+        )
+        await TradesRepository(db).insert_trades(
+            1,
+            [
+                {
+                    "ts": t0,
+                    "px": Decimal("100.5"),
+                    "qty": Decimal("0.1"),
+                    "side": "buy",
+                    "trade_id": "a",
+                },
+                {
+                    "ts": t0 + timedelta(seconds=1),
+                    "px": Decimal("101"),
+                    "qty": Decimal("1"),
+                    "side": "sell",
+                    "trade_id": "b",
+                },
+            ],
+        )
+
+        orm = await repo.fetch_ohlcv_1m("BTC/USDT", t0, None, 2)
+        rows = await repo.fetch_ohlcv_1m_rows("BTC/USDT", t0, None, 2)
+        assert [tuple(r) for r in rows] == [
+            tuple(getattr(c, name) for name in CANDLE_COLUMNS) for c in orm
+        ]
+        floats = await repo.fetch_ohlcv_1m_rows("BTC/USDT", t0, None, 2, as_float=True)
+        assert [r.close for r in floats] == [100.0, 101.0]
+        assert all(type(r.open) is float for r in floats)
+
+        cols = to_columns(floats, CANDLE_COLUMNS, floats=("close",))
+        assert cols["ts"] == [int(t0.timestamp() * 1000), int(t0.timestamp() * 1000) + 60_000]
+        assert cols["close"] == array("d", [100.0, 101.0])
+        assert to_columns([], CANDLE_COLUMNS)["open"] == []
+
+        trades = await TradesRepository(db).get_recent_rows("BTC/USDT", as_float=True)
+        assert [(r.trade_id, r.px) for r in trades] == [("b", 101.0), ("a", 100.5)]
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.repositories.instruments import InstrumentsRepository
+from app.services.market_data.instrument_registry import InstrumentRegistry
+from app.workers import scheduler
+
+
+async def test_registry_resolves_after_refresh(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    registry = InstrumentRegistry(venue="bybit")
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many(
+            [{"symbol": "BTC/USDT", "venue": "bybit"}, {"symbol": "ETH/USDT", "venue": "bybit"}],
+        )
+        assert registry.get("BTC/USDT") is None
+        await registry.refresh(db)
+
+    assert len(registry) == 2
+    assert registry.get("BTC/USDT") is not None
+    assert registry.get("BTC/USDT") != registry.get("ETH/USDT")
+    assert registry.get("DOGE/USDT") is None
+
+
+async def test_sync_resolves_symbols_listed_later(
+    session_factory: async_sessionmaker[AsyncSession],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    class Markets:
+        def __init__(self) -> None:
+            self.listed = [{"symbol": "BTC/USDT", "venue": "bybit"}]
+
+        async def fetch_markets_spot(self) -> list[dict[str, Any]]:
+            return self.listed
+
+    registry = InstrumentRegistry(venue="bybit")
+    monkeypatch.setattr(scheduler, "instrument_registry", registry)
+    monkeypatch.setattr(scheduler.settings, "symbols", "BTC/USDT,ETH/USDT")
+    markets = Markets()
+    await scheduler.sync_instruments(session_factory, markets)  # type: ignore[arg-type]
+    assert registry.get("ETH/USDT") is None
+
+    markets.listed = [*markets.listed, {"symbol": "ETH/USDT", "venue": "bybit"}]
+    await scheduler.sync_instruments(session_factory, markets)  # type: ignore[arg-type]
+    assert registry.get("ETH/USDT") is not None
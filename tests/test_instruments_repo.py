@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.repositories.instruments import InstrumentsRepository
+
+
+def _market(symbol: str, tick: str) -> dict[str, object]:
+    return {
+        "symbol": symbol,
+        "venue": "bybit",
+        "tick_size": Decimal(tick),
+        "lot_size": Decimal("0.001"),
+    }
+
+
+async def test_upsert_many_only_rewrites_changed_markets(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    async with session_factory() as db:
+        repo = InstrumentsRepository(db)
+        first = await repo.upsert_many([_market("BTC/USDT", "0.1"), _market("ETH/USDT", "0.01")])
+        assert (first.written, first.skipped) == (2, 0)
+
+        again = await repo.upsert_many([_market("BTC/USDT", "0.1"), _market("ETH/USDT", "0.01")])
+        assert (again.written, again.skipped) == (0, 2)
+
+        changed = await repo.upsert_many(
+            [_market("BTC/USDT", "0.5"), _market("ETH/USDT", "0.01"), _market("SOL/USDT", "0.001")],
+        )
+        assert (changed.written, changed.skipped) == (2, 1)
+
+    async with session_factory() as db:
+        btc = await InstrumentsRepository(db).get_by_symbol("BTC/USDT")
+        assert btc is not None and btc.tick_size_num == Decimal("0.5")
+        assert len(await InstrumentsRepository(db).get_all_spot()) == 3
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.routes import marketdata as marketdata_routes
+from app.db.repositories.instruments import InstrumentsRepository
+from app.db.repositories.orderbook import OrderBookRepository
+from app.db.repositories.tickers import TickersRepository
+from app.db.session import get_read_session
+from app.main import app
+from app.services.market_data.heartbeat import publish_heartbeat
+from app.services.market_data.orderbook import LocalOrderBook
+from app.services.market_data.write_behind import MarketDataWriters
+
+
+def _ticker(inst_id: int, ts: datetime, last: int) -> dict[str, object]:
+    px = Decimal(last)
+    return {
+        "instrument_id": inst_id,
+        "ts": ts,
+        "last": px,
+        "bid": px - 1,
+        "ask": px + 1,
+        "mid": px,
+        "spread_bps": Decimal(2),
+    }
+
+
+async def test_ticker_batches_keep_latest_per_instrument(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    t0 = datetime(2026, 3, 1, tzinfo=UTC)
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many(
+            [{"symbol": "BTC/USDT"}, {"symbol": "ETH/USDT"}]
+        )
+        repo = TickersRepository(db)
+        await repo.insert_tickers_batch(
+            [_ticker(1, t0, 100), _ticker(1, t0 + timedelta(seconds=1), 101), _ticker(2, t0, 10)],
+        )
+        await repo.insert_tickers_batch([_ticker(1, t0 + timedelta(seconds=2), 102)])
+
+    async with session_factory() as db:
+        latest = await TickersRepository(db).get_latest_many(["BTC/USDT", "ETH/USDT", "XRP/USDT"])
+        assert {s: t.last for s, t in latest.items()} == {"BTC/USDT": 102, "ETH/USDT": 10}
+
+        # A late single insert is stored as history but does not roll the latest back
+        await TickersRepository(db).insert_ticker(1, _ticker(1, t0, 99))
+        btc = await TickersRepository(db).get_latest("BTC/USDT")
+        assert btc is not None and btc.last == 102
+
+
+async def test_publisher_snapshots_changed_books(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+    writers = MarketDataWriters.from_settings(session_factory)
+    book = LocalOrderBook("BTC/USDT")
+    book.apply_snapshot(
+        [(Decimal("100"), Decimal("1")), (Decimal("99"), Decimal("2"))],
+        [(Decimal("101"), Decimal("3"))],
+        1,
+        datetime(2026, 3, 1, tzinfo=UTC),
+    )
+    # Several deltas between drains still publish one snapshot
+    for u in (2, 3):
+        book.apply_delta([(Decimal("100"), Decimal(u))], [], u)
+        writers.book_publisher.mark(1, book)
+    assert await writers.book_publisher.drain() == 1
+    await writers.orderbook_latest.close()
+
+    async with session_factory() as db:
+        books = await OrderBookRepository(db).get_latest_many(["BTC/USDT"], limit_per_side=1)
+        assert books["BTC/USDT"]["bids"] == [(Decimal("100"), Decimal("3"))]
+        assert books["BTC/USDT"]["asks"] == [(Decimal("101"), Decimal("3"))]
+        snap = await OrderBookRepository(db).get_latest_snapshot("BTC/USDT", 5)
+        assert len(snap["bids"]) == 2
+
+
+async def test_stale_stored_book_falls_back_to_exchange(
+    session_factory: async_sessionmaker[AsyncSession],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    now = datetime.now(UTC)
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        await OrderBookRepository(db).upsert_latest_batch(
+            [{"instrument_id": 1, "ts": now - timedelta(minutes=5), "bids": [], "asks": []}],
+        )
+
+    class Exchange:
+        async def fetch_l2_orderbook(self, symbol: str, limit: int) -> dict[str, object]:
+            return {"bids": [], "asks": [], "ts": "live"}
+
+    async def read_session():  # type: ignore[no-untyped-def]
+        async with session_factory() as db:
+            yield db
+
+    monkeypatch.setattr(marketdata_routes, "get_ccxt_adapter", lambda *_: Exchange())
+    monkeypatch.setattr(marketdata_routes.settings, "ob_latest_max_age_ms", 5_000)
+    app.dependency_overrides[get_read_session] = read_session
+    params = {"symbol": "BTC/USDT"}
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            assert (await client.get("/api/v1/marketdata/orderbook", params=params)).json()[
+                "ts"
+            ] == "live"
+            # A quiet book is still current while the ingester's shards receive frames
+            async with session_factory() as db:
+                await publish_heartbeat(db, {"last_frame_age_s": 0.2})
+            quiet = (await client.get("/api/v1/marketdata/orderbook", params=params)).json()
+            assert quiet["ts"] != "live"
+            async with session_factory() as db:
+                await publish_heartbeat(db, {"last_frame_age_s": 60.0})
+            assert (await client.get("/api/v1/marketdata/orderbook", params=params)).json()[
+                "ts"
+            ] == "live"
+            monkeypatch.setattr(marketdata_routes.settings, "ob_latest_max_age_ms", 0)
+            stored = (await client.get("/api/v1/marketdata/orderbook", params=params)).json()
+    finally:
+        app.dependency_overrides.pop(get_read_session, None)
+    assert stored["ts"] != "live"
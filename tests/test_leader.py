@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from app.workers import ingest
+from app.workers.leader import FileLeaderLock
+
+
+async def test_file_lock_admits_one_leader(tmp_path: Path) -> None:
+    first, second = FileLeaderLock(tmp_path / "ingest.lock"), FileLeaderLock(
+        tmp_path / "ingest.lock"
+    )
+    assert await first.try_acquire()
+    assert not await second.try_acquire()
+    await first.release()
+    assert await second.try_acquire()
+    await second.release()
+
+
+async def test_ingester_steps_down_when_leadership_is_lost(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls: list[str] = []
+
+    async def start() -> None:
+        calls.append("start")
+
+    async def stop_tasks() -> None:
+        calls.append("stop")
+
+    class FlakyLock(FileLeaderLock):
+        async def still_held(self) -> bool:
+            # Leadership disappears after the first check
+            stop.set()
+            return False
+
+    monkeypatch.setattr(ingest, "start_market_data_tasks", start)
+    monkeypatch.setattr(ingest, "stop_market_data_tasks", stop_tasks)
+    monkeypatch.setattr(ingest.settings, "ingest_leader_poll_sec", 0.01)
+    stop = asyncio.Event()
+    lock = FlakyLock(tmp_path / "ingest.lock")
+    await asyncio.wait_for(ingest.run_ingester(stop, lock), 2)
+    assert calls == ["start", "stop"]
+    assert await FileLeaderLock(tmp_path / "ingest.lock").try_acquire()
+
+
+async def test_ingest_process_serves_its_own_metrics() -> None:
+    server = await ingest.serve_metrics("127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nHost: test\r\n\r\n")
+        await writer.drain()
+        response = (await reader.read()).decode()
+        writer.close()
+    finally:
+        server.close()
+        await server.wait_closed()
+    assert response.startswith("HTTP/1.0 200 OK")
+    assert "# TYPE ws_messages_total counter" in response
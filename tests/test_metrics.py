@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.core.metrics import JOB_FAILURES, MetricsRegistry
+from app.services.market_data.ws_bybit import exchange_ts_ms, topic_labels
+from app.workers.scheduler import run_periodic
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    reg = MetricsRegistry()
+    h = reg.histogram("handler_seconds", "doc", ("topic",), buckets=(0.1, 1.0))
+    c = reg.counter("messages_total", "doc", ("topic", "symbol"))
+    for v in (0.05, 0.5, 5.0):
+        h.observe("tickers", value=v)
+    c.inc("tickers", "BTCUSDT")
+    c.inc("tickers", "BTCUSDT")
+
+    text = reg.render()
+    assert 'handler_seconds_bucket{topic="tickers",le="0.1"} 1' in text
+    assert 'handler_seconds_bucket{topic="tickers",le="1"} 2' in text
+    assert 'handler_seconds_bucket{topic="tickers",le="+Inf"} 3' in text
+    assert 'handler_seconds_count{topic="tickers"} 3' in text
+    assert 'messages_total{topic="tickers",symbol="BTCUSDT"} 2' in text
+
+
+def test_frame_labels_and_exchange_time() -> None:
+    assert topic_labels("orderbook.50.BTCUSDT") == ("orderbook", "BTCUSDT")
+    assert topic_labels("publicTrade.ETHUSDT") == ("publicTrade", "ETHUSDT")
+    assert exchange_ts_ms({"ts": 1700000000123}) == 1700000000123
+    assert exchange_ts_ms({"data": [{"T": 1700000000001}]}) == 1700000000001
+    assert exchange_ts_ms({"data": {}}) is None
+
+
+async def test_periodic_job_failures_are_counted() -> None:
+    calls = 0
+
+    async def flaky_job() -> None:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("boom")
+        raise asyncio.CancelledError
+
+    before = JOB_FAILURES.value("flaky_job")
+    with pytest.raises(asyncio.CancelledError):
+        await run_periodic(flaky_job, 0)
+    assert calls == 2
+    assert JOB_FAILURES.value("flaky_job") == before + 1
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any, cast
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.routes import candles as candles_routes
+from app.db.models import OHLCVCoverage
+from app.db.repositories.coverage import CoverageRepository, merge_ranges, minute_runs
+from app.db.repositories.instruments import InstrumentsRepository
+from app.db.repositories.ohlcv import OhlcvRepository
+from app.db.session import get_read_session
+from app.main import app
+from app.services.market_data.candles import refresh_aggregates
+from app.services.market_data.gaps import find_gaps, repair_gaps, seed_coverage
+from app.services.market_data.instrument_registry import InstrumentRegistry
+
+if TYPE_CHECKING:
+    from app.services.market_data.ccxt_adapter import CcxtAdapter
+
+T0 = datetime(2026, 3, 1, tzinfo=UTC)
+
+
+def _m(n: int) -> datetime:
+    return T0 + timedelta(minutes=n)
+
+
+def _candle(ts: datetime) -> dict[str, Any]:
+    px = Decimal(100)
+    return {"ts": ts, "open": px, "high": px, "low": px, "close": px, "volume_base": px}
+
+
+class FakeExchange:
+    """Serves every minute except `absent`, at most `page` candles per call."""
+
+    def __init__(self, absent: set[datetime], page: int = 3) -> None:
+        self.absent = absent
+        self.page = page
+        self.ohlcv_page_limit = page
+        self.calls: list[tuple[datetime, int]] = []
+
+    async def fetch_ohlcv(
+        self,
+        symbol: str,
+        timeframe: str,
+        since: datetime,
+        limit: int,
+    ) -> list[dict[str, Any]]:
+        self.calls.append((since, limit))
+        out, ts = [], since
+        while len(out) < min(limit, self.page) and ts < _m(60):
+            if ts not in self.absent:
+                out.append(_candle(ts))
+            ts += timedelta(minutes=1)
+        return out
+
+    async def close(self) -> None:
+        pass
+
+
+def adapter(exchange: FakeExchange) -> CcxtAdapter:
+    return cast("CcxtAdapter", exchange)
+
+
+def test_range_helpers() -> None:
+    assert minute_runs([_m(2), _m(0), _m(1), _m(5)]) == [(_m(0), _m(3)), (_m(5), _m(6))]
+    assert merge_ranges([(_m(3), _m(5)), (_m(0), _m(3)), (_m(7), _m(8))]) == [
+        (_m(0), _m(5)),
+        (_m(7), _m(8)),
+    ]
+
+
+async def test_coverage_tracks_inserts_and_repair_fetches_only_gaps(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        repo = OhlcvRepository(db)
+        await repo.insert_ohlcv_rows(1, [_candle(_m(i)) for i in (0, 1, 2, 6, 7)])
+        await repo.insert_ohlcv_rows(1, [_candle(_m(3))])
+        assert await CoverageRepository(db).ranges(1, _m(0), _m(10)) == [
+            (_m(0), _m(4)),
+            (_m(6), _m(8)),
+        ]
+        assert await find_gaps(db, 1, _m(0), _m(10)) == [(_m(4), _m(6)), (_m(8), _m(10))]
+
+        # The exchange has no candle for minute 9; it must not be asked for it again
+        exchange = FakeExchange(absent={_m(9)})
+        stored = await repair_gaps(db, adapter(exchange), 1, "BTC/USDT", _m(0), _m(10))
+        assert stored == 3
+        assert [since for since, _ in exchange.calls] == [_m(4), _m(8)]
+        assert await find_gaps(db, 1, _m(0), _m(10)) == []
+        assert await CoverageRepository(db).ranges(1, _m(0), _m(10)) == [(_m(0), _m(10))]
+
+        # Past the exchange's newest candle nothing is proven empty yet
+        exchange = FakeExchange(absent=set())
+        stored = await repair_gaps(db, adapter(exchange), 1, "BTC/USDT", _m(55), _m(70))
+        assert stored == 5
+        assert exchange.calls[-1] == (_m(60), 3)
+        assert await find_gaps(db, 1, _m(0), _m(70)) == [(_m(10), _m(55)), (_m(60), _m(70))]
+
+
+async def test_seed_coverage_indexes_untracked_candles(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        await OhlcvRepository(db).insert_ohlcv_rows(1, [_candle(_m(i)) for i in (0, 1, 3)])
+        # As stored before coverage tracking existed
+        await db.execute(delete(OHLCVCoverage))
+        await db.commit()
+        registry = InstrumentRegistry()
+        await registry.refresh(db)
+
+    assert await seed_coverage(session_factory, registry) == 1
+    assert await seed_coverage(session_factory, registry) == 0
+    async with session_factory() as db:
+        assert await find_gaps(db, 1, _m(0), _m(4)) == [(_m(2), _m(3))]
+
+
+async def test_candles_route_serves_db_and_stores_missing_tail(
+    session_factory: async_sessionmaker[AsyncSession],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        await OhlcvRepository(db).insert_ohlcv_rows(1, [_candle(_m(i)) for i in range(5)])
+
+    async def read_session():  # type: ignore[no-untyped-def]
+        async with session_factory() as db:
+            yield db
+
+    exchange = FakeExchange(absent=set(), page=1000)
+    monkeypatch.setattr(candles_routes, "get_ccxt_adapter", lambda *_: exchange)
+    monkeypatch.setattr(candles_routes, "get_session_factory", lambda: session_factory)
+    app.dependency_overrides[get_read_session] = read_session
+    params = {"symbol": "BTC/USDT", "timeframe": "1m", "since": T0.isoformat(), "limit": 8}
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            first = (await client.get("/api/v1/candles/", params=params)).json()
+            assert [r[0] for r in first] == [int(_m(i).timestamp() * 1000) for i in range(8)]
+            # Only the uncovered tail was requested, and it is now stored
+            assert exchange.calls == [(_m(5), 3)]
+            assert (await client.get("/api/v1/candles/", params=params)).json() == first
+            assert len(exchange.calls) == 1
+
+            # Unknown symbols pass through in the same [ts_ms, o, h, l, c, v] shape
+            other = (
+                await client.get(
+                    "/api/v1/candles/",
+                    params={**params, "symbol": "ETH/USDT", "limit": 2},
+                )
+            ).json()
+            assert other == [
+                [int(_m(i).timestamp() * 1000), 100.0, 100.0, 100.0, 100.0, 100.0] for i in range(2)
+            ]
+    finally:
+        app.dependency_overrides.pop(get_read_session, None)
+
+
+async def test_candles_route_folds_minutes_past_the_aggregate_watermark(
+    session_factory: async_sessionmaker[AsyncSession],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        repo = OhlcvRepository(db)
+        await repo.insert_ohlcv_rows(1, [_candle(_m(i)) for i in range(10)])
+        await refresh_aggregates(db, 1)
+        # Stored after the last refresh; minutes 13 and 14 come from the exchange
+        await repo.insert_ohlcv_rows(1, [_candle(_m(i)) for i in range(10, 13)])
+
+    async def read_session():  # type: ignore[no-untyped-def]
+        async with session_factory() as db:
+            yield db
+
+    exchange = FakeExchange(absent=set(), page=1000)
+    monkeypatch.setattr(candles_routes, "get_ccxt_adapter", lambda *_: exchange)
+    monkeypatch.setattr(candles_routes, "get_session_factory", lambda: session_factory)
+    app.dependency_overrides[get_read_session] = read_session
+    params: dict[str, str | int] = {
+        "symbol": "BTC/USDT",
+        "timeframe": "5m",
+        "since": T0.isoformat(),
+        "limit": 3,
+    }
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            rows = (await client.get("/api/v1/candles/", params=params)).json()
+    finally:
+        app.dependency_overrides.pop(get_read_session, None)
+    assert exchange.calls == [(_m(13), 2)]
+    assert [(r[0], r[5]) for r in rows] == [
+        (int(_m(i).timestamp() * 1000), 500.0) for i in (0, 5, 10)
+    ]
+
+    # The repair left the unrefreshed bucket to the next refresh, which counts it once
+    async with session_factory() as db:
+        await refresh_aggregates(db, 1)
+        five = await OhlcvRepository(db).fetch_aggregates("BTC/USDT", "5m", None, None)
+    assert [(c.volume_base, c.minutes) for c in five] == [(Decimal(500), 5)] * 3
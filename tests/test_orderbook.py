@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+import pytest
+
+from app.services.market_data.orderbook import LocalOrderBook, OrderBookGap
+
+
+def D(v: str) -> Decimal:
+    return Decimal(v)
+
+
+def test_delta_updates_and_deletes_levels() -> None:
+    ob = LocalOrderBook("BTC/USDT")
+    ob.apply_snapshot(
+        [(D("100"), D("1")), (D("99"), D("2"))],
+        [(D("101"), D("1")), (D("102"), D("3"))],
+        update_id=10,
+    )
+    assert ob.best_bid() == (D("100"), D("1"))
+    assert ob.best_ask() == (D("101"), D("1"))
+
+    applied = ob.apply_delta(
+        [(D("100"), D("0")), (D("99.5"), D("4"))],
+        [(D("100.5"), D("2")), (D("102"), D("0"))],
+        update_id=11,
+    )
+    assert applied
+    assert ob.best_bid() == (D("99.5"), D("4"))
+    assert ob.best_ask() == (D("100.5"), D("2"))
+    snap = ob.snapshot()
+    assert snap.bids == [(D("99.5"), D("4")), (D("99"), D("2"))]
+    assert snap.asks == [(D("100.5"), D("2")), (D("101"), D("1"))]
+    assert ob.update_id == 11
+
+
+def test_gap_unsyncs_until_next_snapshot() -> None:
+    ob = LocalOrderBook("BTC/USDT")
+    ob.apply_snapshot([(D("100"), D("1"))], [(D("101"), D("1"))], update_id=5)
+
+    assert not ob.apply_delta([], [], update_id=5)  # stale duplicate is ignored
+    with pytest.raises(OrderBookGap):
+        ob.apply_delta([(D("100"), D("2"))], [], update_id=8)
+    assert not ob.synced
+    assert not ob.apply_delta([(D("100"), D("3"))], [], update_id=9)
+
+    ob.apply_snapshot([(D("98"), D("1"))], [(D("101"), D("1"))], update_id=20)
+    assert ob.apply_delta([(D("98"), D("2"))], [], update_id=21)
+    assert ob.best_bid() == (D("98"), D("2"))
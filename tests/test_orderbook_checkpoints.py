@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.db.models import OBSide
+from app.db.repositories.instruments import InstrumentsRepository
+from app.db.repositories.orderbook import OrderBookRepository
+from app.services.market_data.cache import MarketCache
+from app.services.market_data.checkpoint import checkpoint_books
+from app.services.market_data.instrument_registry import InstrumentRegistry
+from app.services.market_data.write_behind import MarketDataWriters
+
+
+def _row(side: OBSide, px: str, qty: str, ts: datetime, **tags: object) -> dict[str, object]:
+    return {
+        "instrument_id": 1,
+        "ts": ts,
+        "side": side,
+        "px": Decimal(px),
+        "qty": Decimal(qty),
+        **tags,
+    }
+
+
+async def test_book_rebuilds_from_checkpoint_plus_deltas(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    t0 = datetime(2026, 1, 1, tzinfo=UTC)
+    t1, t2, t3 = (t0 + timedelta(seconds=s) for s in (1, 2, 30))
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        repo = OrderBookRepository(db)
+        await repo.write_levels_batch(
+            [
+                _row(OBSide.bid, "100", "1", t0, snapshot_id="cp1"),
+                _row(OBSide.ask, "101", "1", t0, snapshot_id="cp1"),
+                _row(OBSide.bid, "100", "0", t1, update_id=2, checkpoint_id="cp1"),
+                _row(OBSide.bid, "99", "5", t1, update_id=2, checkpoint_id="cp1"),
+                _row(OBSide.ask, "101", "3", t2, update_id=3, checkpoint_id="cp1"),
+                _row(OBSide.bid, "98", "7", t3, snapshot_id="cp2"),
+                _row(OBSide.ask, "102", "1", t3, snapshot_id="cp2"),
+            ],
+        )
+
+        at_t1 = await repo.get_book_at("BTC/USDT", t1)
+        assert at_t1["bids"] == [(Decimal("99"), Decimal("5"))]
+        assert at_t1["asks"] == [(Decimal("101"), Decimal("1"))]
+
+        at_t2 = await repo.get_book_at("BTC/USDT", t2)
+        assert at_t2["asks"] == [(Decimal("101"), Decimal("3"))]
+
+        latest = await repo.get_book_at("BTC/USDT")
+        assert latest["bids"] == [(Decimal("98"), Decimal("7"))]
+        assert await repo.get_book_at("BTC/USDT", t0 - timedelta(seconds=1)) == {
+            "bids": [],
+            "asks": [],
+            "ts": None,
+        }
+
+
+async def test_empty_book_checkpoint_is_written(
+    session_factory: async_sessionmaker[AsyncSession],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    t0 = datetime(2026, 1, 1, tzinfo=UTC)
+    monkeypatch.setattr(settings, "ob_storage_mode", "rows")
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        await OrderBookRepository(db).write_levels_batch(
+            [_row(OBSide.bid, "100", "1", t0, snapshot_id="cp1")],
+        )
+
+    cache = MarketCache()
+    book = cache.book("BTC/USDT")
+    book.apply_snapshot([], [], 5, t0)
+    registry = InstrumentRegistry(venue="bybit")
+    async with session_factory() as db:
+        await registry.refresh(db)
+    writers = MarketDataWriters.from_settings(session_factory)
+    assert await checkpoint_books(cache, writers, registry) == 1
+    await writers.orderbook.close()
+
+    # Deltas tagged with the new id rebuild from it, not from the older non-empty book
+    async with session_factory() as db:
+        repo = OrderBookRepository(db)
+        await repo.write_levels_batch(
+            [
+                _row(
+                    OBSide.ask,
+                    "101",
+                    "2",
+                    t0 + timedelta(hours=1),
+                    update_id=6,
+                    checkpoint_id=book.checkpoint_id,
+                ),
+            ],
+        )
+        latest = await repo.get_book_at("BTC/USDT")
+        assert latest["bids"] == []
+        assert latest["asks"] == [(Decimal("101"), Decimal("2"))]
+
+
+async def test_checkpoints_capture_every_book_before_enqueueing() -> None:
+    t0 = datetime(2026, 1, 1, tzinfo=UTC)
+    cache = MarketCache()
+    for symbol in ("BTC/USDT", "ETH/USDT"):
+        cache.book(symbol).apply_snapshot([(Decimal(100), Decimal(1))], [], 5, t0)
+    registry: Any = SimpleNamespace(get={"BTC/USDT": 1, "ETH/USDT": 2}.get)
+    enqueued: list[tuple[int, datetime, list[Any]]] = []
+
+    class Writers:
+        async def put_levels(
+            self, inst_id: int, ts: datetime, bids: Any, *args: Any, **kw: Any
+        ) -> None:
+            if not enqueued:
+                # A delta lands on the other book while the first checkpoint is enqueued
+                cache.book("ETH/USDT").apply_delta([(Decimal(99), Decimal(2))], [], 6, t0)
+                await asyncio.sleep(0)
+            enqueued.append((inst_id, ts, bids))
+
+    writers: Any = Writers()
+    assert await checkpoint_books(cache, writers, registry) == 2
+    # Its checkpoint is the book as of its timestamp; the delta is replayed on top of it
+    assert enqueued[1][0] == 2
+    assert enqueued[1][2] == [(Decimal(100), Decimal(1))]
+    assert enqueued[0][1] <= enqueued[1][1]
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.models import OBSide
+from app.db.packing import pack_levels, required_scale, unpack_levels
+from app.db.repositories.instruments import InstrumentsRepository
+from app.db.repositories.orderbook import OrderBookRepository
+
+
+def test_pack_roundtrip_and_scale_widening() -> None:
+    levels = [("65000.1", "0.000123"), (Decimal("64999.9"), Decimal("0"))]
+    blob = pack_levels(levels, 2, 6)
+    assert len(blob) == 32
+    assert unpack_levels(blob, 2, 6) == [
+        (Decimal("65000.1"), Decimal("0.000123")),
+        (Decimal("64999.9"), Decimal(0)),
+    ]
+    assert required_scale(["0.1", "0.000000001"], 2) == 9
+    with pytest.raises(ValueError):
+        pack_levels([("0.001", "1")], 2, 0)
+
+
+async def test_packed_book_rebuilds_from_checkpoint(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    t0 = datetime(2026, 1, 1, tzinfo=UTC)
+    t1 = t0 + timedelta(seconds=1)
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        repo = OrderBookRepository(db, storage_mode="packed")
+        await repo.write_packed_batch(
+            [
+                {
+                    "instrument_id": 1,
+                    "ts": t0,
+                    "bids": [("100", "1")],
+                    "asks": [("101", "1")],
+                    "snapshot_id": "cp1",
+                    "price_scale": 1,
+                    "qty_scale": 1,
+                },
+                {
+                    "instrument_id": 1,
+                    "ts": t1,
+                    "bids": [("100", "0"), ("99.95", "5")],
+                    "asks": [],
+                    "update_id": 2,
+                    "checkpoint_id": "cp1",
+                    "price_scale": 1,
+                    "qty_scale": 1,
+                },
+            ],
+        )
+
+        at_t0 = await repo.get_book_at("BTC/USDT", t0)
+        assert at_t0["bids"] == [(Decimal("100"), Decimal("1"))]
+        assert at_t0["asks"] == [(Decimal("101"), Decimal("1"))]
+        latest = await repo.get_book_at("BTC/USDT")
+        assert latest["bids"] == [(Decimal("99.95"), Decimal("5"))]
+        assert latest["asks"] == [(Decimal("101"), Decimal("1"))]
+
+
+async def test_history_survives_storage_mode_switch(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    t0 = datetime(2026, 1, 1, tzinfo=UTC)
+    t1 = t0 + timedelta(minutes=1)
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        await OrderBookRepository(db, storage_mode="rows").write_levels_batch(
+            [
+                {
+                    "instrument_id": 1,
+                    "ts": t0,
+                    "side": OBSide.bid,
+                    "px": Decimal("100"),
+                    "qty": Decimal("1"),
+                    "snapshot_id": "rows-cp",
+                },
+            ],
+        )
+        packed = OrderBookRepository(db, storage_mode="packed")
+        await packed.write_packed_batch(
+            [
+                {
+                    "instrument_id": 1,
+                    "ts": t1,
+                    "bids": [("99", "2")],
+                    "asks": [],
+                    "snapshot_id": "packed-cp",
+                    "price_scale": 0,
+                    "qty_scale": 0,
+                },
+            ],
+        )
+
+        # Either configured mode reads both layouts
+        for mode in ("rows", "packed"):
+            repo = OrderBookRepository(db, storage_mode=mode)
+            assert (await repo.get_book_at("BTC/USDT", t0))["bids"] == [
+                (Decimal("100"), Decimal("1")),
+            ]
+            assert (await repo.get_book_at("BTC/USDT"))["bids"] == [(Decimal("99"), Decimal("2"))]
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import UTC, date, datetime
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db import partitions
+from app.db.partitions import (
+    Partition,
+    expired_partitions,
+    parse_partition,
+    partition_for,
+    partitions_before,
+    partitions_between,
+    wanted_partitions,
+)
+from app.workers.partitions import maintain_partitions
+
+
+def test_partition_ranges_and_names() -> None:
+    day = partition_for("trade_rt", "day", date(2026, 2, 28))
+    assert (day.name, day.start, day.end) == (
+        "trade_rt_p20260228",
+        date(2026, 2, 28),
+        date(2026, 3, 1),
+    )
+    month = partition_for("ohlcv_1m", "month", date(2026, 12, 15))
+    assert (month.name, month.start, month.end) == (
+        "ohlcv_1m_p202612",
+        date(2026, 12, 1),
+        date(2027, 1, 1),
+    )
+    assert parse_partition("trade_rt", "day", "trade_rt_p20260228") == day
+    assert parse_partition("trade_rt", "day", "ticker_rt_p20260228") is None
+
+    ahead = wanted_partitions("ticker_rt", "day", date(2026, 1, 30), ahead_days=3)
+    assert [p.name for p in ahead][-1] == "ticker_rt_p20260202"
+    assert len(ahead) == 4
+
+    parts = [partition_for("ticker_rt", "day", date(2026, 1, d)) for d in range(1, 11)]
+    expired = expired_partitions(parts, date(2026, 1, 10), retain_days=7)
+    assert [p.name for p in expired] == ["ticker_rt_p20260101", "ticker_rt_p20260102"]
+    assert expired_partitions(parts, date(2026, 1, 10), retain_days=0) == []
+    # Raw ticker partitions wait for the rollup watermark to pass their upper bound
+    watermark = datetime(2026, 1, 2, 0, 30, tzinfo=UTC)
+    assert [p.name for p in partitions_before(expired, watermark)] == ["ticker_rt_p20260101"]
+    assert partitions_before(expired, None) == []
+
+
+async def test_maintenance_is_a_noop_without_postgres() -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    assert await maintain_partitions(engine) == {}
+    await engine.dispose()
+
+
+async def test_history_inserts_create_missing_partitions(monkeypatch: pytest.MonkeyPatch) -> None:
+    created: list[str] = []
+    committed: list[bool] = []
+
+    class Engine:
+        @asynccontextmanager
+        async def begin(self) -> AsyncIterator[Any]:
+            # DDL gets its own transaction, never the caller's insert transaction
+            yield SimpleNamespace(execute=execute)
+            committed.append(True)
+
+    async def execute(*args: Any) -> None:
+        pass
+
+    async def is_partitioned(conn: Any, table: str) -> bool:
+        return True
+
+    async def list_partitions(conn: Any, table: str, period: str) -> list[Partition]:
+        return [partition_for(table, period, date(2026, 1, 2))]
+
+    async def create_partition(conn: Any, p: Partition) -> None:
+        created.append(p.name)
+
+    clock = [1000.0]
+    monkeypatch.setattr(partitions, "is_partitioned", is_partitioned)
+    monkeypatch.setattr(partitions, "list_partitions", list_partitions)
+    monkeypatch.setattr(partitions, "create_partition", create_partition)
+    monkeypatch.setattr(partitions, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(partitions, "_seen", {})
+
+    first, last = datetime(2026, 1, 1, 23, tzinfo=UTC), datetime(2026, 1, 3, 1, tzinfo=UTC)
+    assert [p.name for p in partitions_between("trade_rt", "day", first.date(), last.date())] == [
+        "trade_rt_p20260101",
+        "trade_rt_p20260102",
+        "trade_rt_p20260103",
+    ]
+    engine: Any = Engine()
+    assert await partitions.ensure_partitions(engine, "trade_rt", first, last) == 2
+    assert created == ["trade_rt_p20260101", "trade_rt_p20260103"]
+    assert committed == [True]
+    # Remembered after the commit, so the next batch skips the catalog
+    assert await partitions.ensure_partitions(engine, "trade_rt", first, last) == 0
+    assert committed == [True]
+    # ...until the entries expire: another process may have dropped one meanwhile
+    clock[0] += partitions.SEEN_TTL_SEC
+    assert await partitions.ensure_partitions(engine, "trade_rt", first, last) == 2
+    assert len(committed) == 2
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.models import TickerRollup, TickerRT
+from app.db.repositories.coverage import CoverageRepository
+from app.db.repositories.instruments import InstrumentsRepository
+from app.db.repositories.ohlcv import OhlcvRepository
+from app.db.repositories.tickers import TickersRepository
+from app.services.market_data.gaps import find_gaps
+from app.workers import retention
+
+
+def _tick(ts: datetime, last: str) -> dict[str, object]:
+    px = Decimal(last)
+    return {
+        "instrument_id": 1,
+        "ts": ts,
+        "last": px,
+        "bid": px - 1,
+        "ask": px + 1,
+        "mid": px,
+        "spread_bps": Decimal(2),
+    }
+
+
+async def test_rollup_then_purge_respects_watermark(
+    session_factory: async_sessionmaker[AsyncSession],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(retention.settings, "retention", "ticker_rt=1")
+    monkeypatch.setattr(retention.settings, "retention_batch_rows", 2)
+    t0 = datetime(2026, 1, 1, tzinfo=UTC)
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        await TickersRepository(db).insert_tickers_batch(
+            [
+                _tick(t0, "100"),
+                _tick(t0 + timedelta(milliseconds=500), "105"),
+                _tick(t0 + timedelta(seconds=30), "95"),
+                _tick(t0 + timedelta(minutes=1, seconds=5), "101"),
+                _tick(t0 + timedelta(days=3), "110"),
+            ],
+        )
+
+    # Only the first two minutes are complete at this point
+    assert await retention.rollup_tickers(
+        session_factory, now=t0 + timedelta(minutes=2, seconds=30)
+    )
+    async with session_factory() as db:
+        minute = (
+            await db.scalars(
+                select(TickerRollup).where(TickerRollup.interval == "1m").order_by(TickerRollup.ts),
+            )
+        ).all()
+        assert [(m.open, m.high, m.low, m.close, m.samples) for m in minute] == [
+            (100, 105, 95, 95, 3),
+            (101, 101, 101, 101, 1),
+        ]
+        assert (
+            await db.scalar(
+                select(func.count()).select_from(TickerRollup).where(TickerRollup.interval == "1s"),
+            )
+            == 3
+        )
+
+    # Everything before day 3 has expired, but only rolled-up rows may go
+    deleted = await retention.purge_expired(session_factory, now=t0 + timedelta(days=3))
+    assert deleted == {"ticker_rt": 4}
+    async with session_factory() as db:
+        assert await db.scalar(select(func.count()).select_from(TickerRT)) == 1
+
+
+async def test_rollup_intervals_expire_separately(
+    session_factory: async_sessionmaker[AsyncSession],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(retention.settings, "retention", "ticker_rollup_1s=1,ticker_rollup_1m=30")
+    t0 = datetime(2026, 1, 1, tzinfo=UTC)
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        await TickersRepository(db).insert_tickers_batch(
+            [_tick(t0 + timedelta(seconds=s), "100") for s in (0, 1, 2)],
+        )
+    await retention.rollup_tickers(session_factory, now=t0 + timedelta(minutes=2))
+
+    deleted = await retention.purge_expired(session_factory, now=t0 + timedelta(days=2))
+    assert deleted == {"ticker_rollup_1s": 3}
+    async with session_factory() as db:
+        left = (await db.scalars(select(TickerRollup.interval))).all()
+    assert left == ["1m"]
+
+
+async def test_purged_candles_become_gaps_again(
+    session_factory: async_sessionmaker[AsyncSession],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(retention.settings, "retention", "ohlcv_1m=1")
+    t0 = datetime(2026, 1, 1, tzinfo=UTC)
+    px = Decimal(100)
+    candle = {"open": px, "high": px, "low": px, "close": px, "volume_base": px}
+    candles = [{**candle, "ts": t0 + timedelta(minutes=i)} for i in range(10)]
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT"}])
+        await OhlcvRepository(db).insert_ohlcv_rows(1, candles)
+
+    # The cutoff falls inside the covered range, which is clipped rather than dropped
+    now = t0 + timedelta(days=1, minutes=4)
+    assert await retention.purge_expired(session_factory, now=now) == {"ohlcv_1m": 4}
+    async with session_factory() as db:
+        assert await find_gaps(db, 1, t0, t0 + timedelta(minutes=10)) == [
+            (t0, t0 + timedelta(minutes=4)),
+        ]
+    assert await retention.purge_expired(session_factory, now=now + timedelta(hours=1)) == {
+        "ohlcv_1m": 6,
+    }
+    async with session_factory() as db:
+        assert await CoverageRepository(db).ranges(1, t0, t0 + timedelta(days=1)) == []
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db import session
+
+
+async def test_read_url_gets_its_own_engine(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    for name in ("_engine", "_session_maker", "_read_engine", "_read_session_maker"):
+        monkeypatch.setattr(session, name, None)
+
+    # Without DATABASE_READ_URL reads share the primary pool
+    monkeypatch.setattr(settings, "database_read_url", "")
+    assert session.get_read_session_factory() is session.get_session_factory()
+    assert set(session.engines()) == {"primary"}
+
+    monkeypatch.setattr(
+        settings, "database_read_url", f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}"
+    )
+    read_factory = session.get_read_session_factory()
+    assert read_factory is not session.get_session_factory()
+    async with read_factory() as db:
+        assert await db.scalar(text("SELECT 1")) == 1
+        stats = session.pool_stats()
+        assert stats["read"]["checked_out"] == 1
+    assert session.pool_stats()["read"]["checked_out"] == 0
+    await session.dispose_engines()
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.services.market_data.write_behind import WriteBehindQueue
+
+
+async def test_flushes_on_row_count_and_on_close(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    batches: list[list[int]] = []
+
+    async def flush(_: AsyncSession, rows: list[int]) -> None:
+        batches.append(list(rows))
+
+    q: WriteBehindQueue[int] = WriteBehindQueue(
+        "test",
+        session_factory,
+        flush,
+        max_rows=3,
+        max_delay_ms=10_000,
+        max_queue=100,
+    )
+    q.start()
+    await q.put_many([1, 2, 3, 4])
+    await asyncio.sleep(0.01)
+    assert batches == [[1, 2, 3]]
+
+    await q.close()
+    assert batches == [[1, 2, 3], [4]]
+    assert q.stats.written == 4
+
+
+async def test_flushes_after_delay(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    batches: list[list[int]] = []
+
+    async def flush(_: AsyncSession, rows: list[int]) -> None:
+        batches.append(list(rows))
+
+    q: WriteBehindQueue[int] = WriteBehindQueue(
+        "test",
+        session_factory,
+        flush,
+        max_rows=100,
+        max_delay_ms=20,
+        max_queue=100,
+    )
+    q.start()
+    await q.put(1)
+    await asyncio.sleep(0.1)
+    assert batches == [[1]]
+    await q.close()
+
+
+async def test_drops_and_counts_when_full(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    async def flush(_: AsyncSession, rows: list[int]) -> None:
+        return None
+
+    q: WriteBehindQueue[int] = WriteBehindQueue(
+        "test",
+        session_factory,
+        flush,
+        max_rows=10,
+        max_delay_ms=10,
+        max_queue=2,
+        drop_when_full=True,
+    )
+    # Not started: nothing drains the queue, so the third row overflows
+    await q.put_many([1, 2, 3])
+    assert q.stats.dropped == 1
+    await q.close()
+    assert q.stats.written == 2
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.repositories.instruments import InstrumentsRepository
+from app.services.market_data.cache import MarketCache
+from app.services.market_data.instrument_registry import InstrumentRegistry
+from app.services.market_data.write_behind import MarketDataWriters
+from app.services.market_data.ws_bybit import BybitWs, shard_symbols, topics_for
+
+
+def test_topics_cover_every_stream() -> None:
+    assert topics_for(["BTC/USDT"], 50) == [
+        "tickers.BTCUSDT",
+        "orderbook.50.BTCUSDT",
+        "publicTrade.BTCUSDT",
+    ]
+
+
+async def test_dispatch_routes_frames_by_topic(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    registry = InstrumentRegistry(venue="bybit")
+    async with session_factory() as db:
+        await InstrumentsRepository(db).upsert_many([{"symbol": "BTC/USDT", "venue": "bybit"}])
+        await registry.refresh(db)
+    cache = MarketCache()
+    writers = MarketDataWriters.from_settings(session_factory)
+    ws = BybitWs(cache, writers, registry)
+
+    await ws._dispatch({"success": True, "op": "subscribe"})
+    await ws._dispatch(
+        {
+            "topic": "orderbook.50.BTCUSDT",
+            "type": "snapshot",
+            "data": {"s": "BTCUSDT", "b": [["100", "1"]], "a": [["101", "2"]], "u": 7},
+        },
+    )
+    await ws._dispatch(
+        {
+            "topic": "orderbook.50.BTCUSDT",
+            "type": "delta",
+            "data": {"s": "BTCUSDT", "b": [["100", "0"], ["99", "3"]], "a": [], "u": 8},
+        },
+    )
+    await ws._dispatch(
+        {
+            "topic": "publicTrade.BTCUSDT",
+            "data": [{"s": "BTCUSDT", "p": "100.5", "q": "0.1", "S": "Buy", "T": 1, "i": "t1"}],
+        },
+    )
+    await ws._dispatch(
+        {
+            "topic": "tickers.BTCUSDT",
+            "data": {
+                "symbol": "BTCUSDT",
+                "bid1Price": "99",
+                "ask1Price": "101",
+                "lastPrice": "100",
+            },
+        },
+    )
+
+    assert cache.orderbooks["BTC/USDT"].best_bid() == (Decimal("99"), Decimal("3"))
+    assert cache.tickers["BTC/USDT"].mid == Decimal("100")
+    assert writers.orderbook.qsize() == 4
+    assert writers.trades.qsize() == 1
+    assert writers.tickers.qsize() == 1
+
+
+def test_shards_spread_symbols_round_robin() -> None:
+    symbols = [f"S{i}/USDT" for i in range(5)]
+    shards = shard_symbols(symbols, 2)
+    assert shards == [["S0/USDT", "S2/USDT", "S4/USDT"], ["S1/USDT", "S3/USDT"]]
+    assert shard_symbols(symbols[:1], 4) == [["S0/USDT"]]
+    assert shard_symbols([], 3) == []